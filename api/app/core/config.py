@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import json
 from functools import lru_cache
-from typing import Sequence
+from typing import Literal, Sequence
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -26,6 +26,13 @@ class Settings(BaseSettings):
     s3_access_key: str = "minioadmin"
     s3_secret_key: str = "minioadmin"
     s3_bucket: str = "portfolio-uploads"
+    # "s3" talks to the endpoint above; "local" keeps objects under storage_local_dir
+    # (single host, no MinIO needed).
+    storage_backend: Literal["s3", "local"] = "s3"
+    storage_local_dir: str = "./data/objects"
+    # Objects released by deleted batches stay in storage this long before a sweep
+    # removes them, so runs already reading them can finish.
+    storage_release_grace_seconds: float = 600.0
 
     cors_allow_origins: Sequence[str] | str = (
         "http://localhost:3000",
@@ -41,6 +48,52 @@ class Settings(BaseSettings):
     pro_runs_per_day: int = 20
     enterprise_runs_per_day: int = 1000
 
+    # Uploads are parsed ``ingest_chunk_rows`` rows at a time and streamed to storage
+    # in parts of ``ingest_part_bytes`` (S3's 5 MiB minimum applies), so ingest memory
+    # does not grow with file size. Larger intermediate artifacts spill to disk.
+    ingest_chunk_rows: int = 50_000
+    ingest_part_bytes: int = 8 * 1024 * 1024
+    # Files of a batch are parsed and stored concurrently; in-flight files bound memory.
+    ingest_workers: int = 8
+    ingest_max_in_flight: int = 8
+
+    # Read-through cache for stored objects: an in-memory tier and, when
+    # storage_cache_dir is set, an mmap-served disk tier. Objects never change
+    # once written, so cached copies never go stale.
+    storage_cache_memory_bytes: int = 128 * 1024 * 1024
+    storage_cache_dir: str | None = None
+    storage_cache_disk_bytes: int = 4 * 1024 * 1024 * 1024
+    storage_cache_policy: Literal["lru", "fifo"] = "lru"
+
+    # Portfolio runs fetch files on a thread pool; parsing moves to a pre-warmed
+    # process pool when portfolio_cpu_workers > 0 (otherwise it runs on the fetch threads).
+    portfolio_io_workers: int = 16
+    portfolio_cpu_workers: int = 2
+    portfolio_max_in_flight: int = 32
+    # Whole runs execute off the event loop on a bounded pool; requests beyond
+    # workers + queue are rejected with 429.
+    portfolio_run_workers: int = 4
+    portfolio_run_queue: int = 8
+    portfolio_result_cache_bytes: int = 256 * 1024 * 1024
+    portfolio_index_cache_bytes: int = 512 * 1024 * 1024
+    # Aligned daily returns and shrunk covariance per batch window, reused by every
+    # allocation request on that window.
+    portfolio_allocation_cache_bytes: int = 256 * 1024 * 1024
+    # Monte Carlo paths are simulated in chunks of at most this many bytes of
+    # working arrays, each chunk on the shared process pool.
+    montecarlo_chunk_bytes: int = 64 * 1024 * 1024
+    montecarlo_max_paths: int = 100_000
+    contribution_max_subsets: int = 64
+
+    # Asynchronous backtest jobs. Unset keeps the queue in the app database
+    # (db/migrations/004 and 012); any other SQLAlchemy URL moves it elsewhere.
+    backtest_jobs_url: str | None = None
+    backtest_workers: int = 2
+    backtest_poll_interval: float = 1.0
+    backtest_max_attempts: int = 3
+    backtest_backoff_seconds: float = 5.0
+    backtest_lease_seconds: float = 900.0
+
     @classmethod
     def settings_customise_sources(
         cls,
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import date
+from functools import lru_cache
 
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
@@ -9,8 +10,9 @@ from . import db
 from .core.config import settings
 from .models import tables
 from .services.auth import UserService
-from .services.backtests import BacktestService
+from .services.backtests import BacktestService, BacktestWorkerPool
 from .services.feedback import FeedbackService
+from .services.runpool import PortfolioRunPool
 
 
 PLAN_LIMITS: dict[str, tuple[int, int]] = {
@@ -105,17 +107,35 @@ _user_service.seed_user(
     password="CorrectPassword123!",
     name="Demo User",
 )
-_backtest_service = BacktestService()
 _feedback_service = FeedbackService()
+_portfolio_run_pool = PortfolioRunPool(
+    max_workers=settings.portfolio_run_workers,
+    max_queued=settings.portfolio_run_queue,
+)
 
 
 def get_user_service() -> UserService:
     return _user_service
 
 
+@lru_cache
 def get_backtest_service() -> BacktestService:
-    return _backtest_service
+    # Built on first use so importing the app never opens the job store.
+    return BacktestService()
+
+
+@lru_cache
+def get_backtest_workers() -> BacktestWorkerPool:
+    return BacktestWorkerPool(
+        get_backtest_service().url,
+        workers=settings.backtest_workers,
+        poll_interval=settings.backtest_poll_interval,
+    )
 
 
 def get_feedback_service() -> FeedbackService:
     return _feedback_service
+
+
+def get_portfolio_run_pool() -> PortfolioRunPool:
+    return _portfolio_run_pool
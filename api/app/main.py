@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
@@ -9,14 +11,29 @@ from slowapi.middleware import SlowAPIMiddleware
 from .core.config import settings
 from .core.logging import RequestLoggingMiddleware, configure_logging
 from .core.ratelimit import limiter
+from .deps import get_backtest_workers, get_portfolio_run_pool
 from .routers import uploads, portfolio, users, sessions, backtests, feedback, billing, analytics
+from .services.pipeline import shutdown_process_pool, warm_process_pool
 
 configure_logging(settings.api_log_level)
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Fork the parsing workers before any request threads exist.
+    warm_process_pool()
+    get_backtest_workers().start()
+    yield
+    get_backtest_workers().stop()
+    get_portfolio_run_pool().shutdown()
+    shutdown_process_pool()
+
+
 app = FastAPI(
     title="Portfolio Backtester API",
     description="Aggregate TradingView strategy CSV exports into equal-weight portfolios.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
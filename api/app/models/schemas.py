@@ -5,6 +5,8 @@ from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 
+from ..core.config import settings
+
 
 class FileUploadSummary(BaseModel):
     fileId: str = Field(alias="fileId")
@@ -66,11 +68,16 @@ class TradeRow(BaseModel):
 
 
 class BacktestRequest(BaseModel):
-    strategy: str
-    symbols: list[str]
+    # Jobs replay the batch's uploaded trades over start_date..end_date; strategy is
+    # only echoed back as a label, symbols and parameters are stored but not used.
+    strategy: str = Field(description="Label echoed back with the job; the batch's trades decide the run")
+    symbols: list[str] = Field(description="Ignored; every ticker of the batch is run")
     start_date: date
     end_date: date
-    parameters: dict[str, float | int | str | None] = Field(default_factory=dict)
+    parameters: dict[str, float | int | str | None] = Field(default_factory=dict, description="Ignored")
+    batchId: str | None = Field(default=None, description="Uploaded batch to run as a portfolio job; required")
+    totalCapital: float | None = None
+    currency: str = "USD"
 
 
 class BacktestResult(BaseModel):
@@ -79,6 +86,14 @@ class BacktestResult(BaseModel):
     strategy: str | None = None
 
 
+class BacktestStatus(BacktestResult):
+    attempts: int = 0
+    error: str | None = None
+    result: dict | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
 class FeedbackIn(BaseModel):
     message: str = Field(min_length=1)
     rating: int | None = Field(default=None, ge=1, le=5)
@@ -93,6 +108,15 @@ class PortfolioRunRequest(BaseModel):
     totalCapital: float
     currency: str = "USD"
     dateRange: tuple[datetime | None, datetime | None] | None = Field(default=None, description="Optional inclusive date range filter")
+    maxPositions: int | None = Field(
+        default=None,
+        ge=1,
+        description="Trade all tickers from one cash balance with at most this many open positions",
+    )
+    weights: dict[str, float] | None = Field(
+        default=None,
+        description="Capital weight per ticker, normalized to sum to one; unlisted tickers are left out",
+    )
 
 
 class KPISection(BaseModel):
@@ -102,16 +126,156 @@ class KPISection(BaseModel):
 
 class EquityPoint(BaseModel):
     timestamp: datetime
-    value: float
+    # Non-finite values serialize to JSON null, so persisted runs must accept None.
+    value: float | None
 
 
 class PortfolioRunResponse(BaseModel):
     equityCurve: list[EquityPoint]
     buyHoldCurve: list[EquityPoint]
     drawdown: list[EquityPoint]
-    kpis: dict[str, float | int]
+    kpis: dict[str, float | int | None]
     sections: dict[str, KPISection]
-    tradesTable: list[dict[str, str | float | int]]
+    tradesCount: int = 0
+    # Opaque cursor for GET /api/portfolio/{batchId}/trades over this run's window.
+    tradesCursor: str | None = None
+
+
+class TradeRecord(BaseModel):
+    ticker: str
+    tradeNumber: int
+    direction: str
+    entryTime: datetime
+    exitTime: datetime
+    netPnl: float
+    positionSize: float
+    returnPct: float
+    runup: float
+    drawdown: float
+
+
+class TradePageResponse(BaseModel):
+    items: list[TradeRecord]
+    total: int
+    nextCursor: str | None = None
+
+
+class TickerWindowSummary(BaseModel):
+    ticker: str
+    trades: int
+    wins: int
+    pnl: float
+    finalEquity: float
+
+
+class PortfolioWindowSummary(BaseModel):
+    batchId: str
+    totalCapital: float
+    dateRange: tuple[datetime | None, datetime | None]
+    trades: int
+    wins: int
+    pnl: float
+    finalEquity: float
+    tickers: list[TickerWindowSummary]
+
+
+class MonteCarloRequest(BaseModel):
+    batchId: str
+    totalCapital: float = Field(gt=0)
+    dateRange: tuple[datetime | None, datetime | None] | None = Field(default=None, description="Optional inclusive date range filter")
+    method: Literal["bootstrap", "shuffle"] = Field(
+        default="bootstrap",
+        description="Draw each ticker's trades with replacement, or reorder them (final equity is then fixed)",
+    )
+    # Every path keeps three float64 results, so the count is capped to bound memory.
+    paths: int = Field(default=10_000, ge=1, le=settings.montecarlo_max_paths)
+    seed: int | None = Field(default=None, ge=0, description="Repeat a previous result; a random seed is returned when omitted")
+
+
+class MonteCarloResponse(BaseModel):
+    batchId: str
+    totalCapital: float
+    method: Literal["bootstrap", "shuffle"]
+    paths: int
+    trades: int
+    seed: int
+    finalEquity: dict[str, float]
+    maxDrawdownPct: dict[str, float]
+    timeToRecoverDays: dict[str, float] = Field(description="Longest time below a prior peak, counted to the window end if never regained")
+    probabilityOfLoss: float
+
+
+class AllocationRequest(BaseModel):
+    batchId: str
+    totalCapital: float
+    currency: str = "USD"
+    dateRange: tuple[datetime | None, datetime | None] | None = Field(default=None, description="Optional inclusive date range filter")
+    method: Literal["inverseVol", "riskParity", "maxSharpe"] = "riskParity"
+
+
+class AllocationResponse(BaseModel):
+    method: Literal["inverseVol", "riskParity", "maxSharpe"]
+    weights: dict[str, float]
+    riskContributions: dict[str, float]
+    shrinkage: float = Field(description="Ledoit-Wolf intensity applied to the sample covariance")
+    expectedReturnPct: float = Field(description="Annualized, from the window's daily returns")
+    volatilityPct: float = Field(description="Annualized, from the shrunk covariance")
+    run: PortfolioRunResponse
+
+
+class ContributionRequest(BaseModel):
+    batchId: str
+    totalCapital: float = Field(gt=0)
+    dateRange: tuple[datetime | None, datetime | None] | None = Field(default=None, description="Optional inclusive date range filter")
+    leaveOneOut: bool = Field(default=True, description="Also evaluate the batch without each ticker in turn")
+    subsets: list[list[str]] = Field(default_factory=list, description="Ticker subsets to evaluate as portfolios of their own")
+
+
+class ContributionPortfolio(BaseModel):
+    kind: Literal["full", "leaveOneOut", "subset"]
+    tickers: list[str] | None = Field(default=None, description="Held tickers; omitted for leave-one-out portfolios")
+    excluded: str | None = Field(default=None, description="The ticker a leave-one-out portfolio drops")
+    trades: int
+    pnl: float
+    finalEquity: float
+    totalReturnPct: float | None
+    maxDrawdownAbs: float | None
+    maxDrawdownPct: float | None
+    sharpe: float
+    sortino: float
+    drawdownPct: list[float | None]
+
+
+class ContributionResponse(BaseModel):
+    batchId: str
+    totalCapital: float
+    timestamps: list[datetime]
+    portfolios: list[ContributionPortfolio] = Field(description="The full batch first, then leave-one-out portfolios, then subsets")
+
+
+class RollingWindow(BaseModel):
+    window: int
+    sharpe: list[float | None]
+    sortino: list[float | None]
+    returnPct: list[float | None]
+    drawdownPct: list[float | None] = Field(description="Drop below the highest equity within the window")
+
+
+class WalkForwardSegment(BaseModel):
+    start: datetime
+    end: datetime
+    points: int
+    returnPct: float | None
+    sharpe: float
+    sortino: float
+    maxDrawdownPct: float | None
+
+
+class RollingAnalyticsResponse(BaseModel):
+    runId: str
+    timestamps: list[datetime]
+    windows: list[RollingWindow]
+    segments: list[WalkForwardSegment]
 
 
 class PortfolioRunPersisted(PortfolioRunResponse):
@@ -120,7 +284,27 @@ class PortfolioRunPersisted(PortfolioRunResponse):
     currency: str
     totalCapital: float
     dateRange: tuple[datetime | None, datetime | None] | None
+    maxPositions: int | None = None
+    weights: dict[str, float] | None = None
+    createdAt: datetime
+
+
+class PortfolioRunSummary(BaseModel):
+    runId: str
+    batchId: str
+    currency: str
+    totalCapital: float
+    dateRange: tuple[datetime | None, datetime | None] | None
+    maxPositions: int | None = None
+    weights: dict[str, float] | None = None
     createdAt: datetime
+    kpis: dict[str, float | int | None]
+    tradesCount: int
+
+
+class PortfolioRunPage(BaseModel):
+    items: list[PortfolioRunSummary]
+    nextCursor: str | None = None
 
 
 class CheckoutSessionRequest(BaseModel):
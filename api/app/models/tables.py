@@ -4,13 +4,16 @@ from datetime import datetime, date
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     Date,
     DateTime,
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -59,6 +62,8 @@ class UploadFileRecord(Base):
     export_date: Mapped[date]
     filename: Mapped[str] = mapped_column(String(255))
     object_key: Mapped[str] = mapped_column(String(255))
+    artifact_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    content_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     rows_parsed: Mapped[int] = mapped_column(Integer)
     rows_skipped: Mapped[int] = mapped_column(Integer)
     warnings: Mapped[list[str]] = mapped_column(JSON, default=list)
@@ -67,6 +72,32 @@ class UploadFileRecord(Base):
     batch: Mapped[Batch] = relationship(back_populates="files")
 
 
+class StoredObject(Base):
+    """An upload's bytes and trades artifact, stored once per content hash.
+
+    ``ref_count`` counts the ``UploadFileRecord`` rows pointing at the objects;
+    they are queued as ``PendingDelete`` rows when it drops to zero.
+    """
+
+    content_sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    object_key: Mapped[str] = mapped_column(String(255))
+    artifact_key: Mapped[str] = mapped_column(String(255))
+    size_bytes: Mapped[int] = mapped_column(BigInteger)
+    rows_parsed: Mapped[int] = mapped_column(Integer)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class PendingDelete(Base):
+    """A storage key no batch references any more, deleted once its grace period is over.
+
+    An ingest that stores the same content again removes the row instead.
+    """
+
+    object_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    released_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
 class PortfolioRun(Base):
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     batch_id: Mapped[str] = mapped_column(ForeignKey("batch.id", ondelete="CASCADE"))
@@ -74,12 +105,48 @@ class PortfolioRun(Base):
     total_capital: Mapped[float] = mapped_column(Float)
     date_start: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     date_end: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Set for shared-capital runs; None splits capital evenly across tickers.
+    max_positions: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Per-ticker capital weights; None splits capital evenly.
+    weights: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    cache_key: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     metrics: Mapped[dict] = mapped_column(JSON)
     equity_curve: Mapped[list[dict]] = mapped_column(JSON)
+    curve_pyramid: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Listing reads only these summary columns; curves live in the compressed blob.
+    kpis: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    trades_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    curves_blob: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     batch: Mapped[Batch] = relationship(back_populates="runs")
 
+    __table_args__ = (Index("ix_portfoliorun_batch_created", "batch_id", "created_at", "id"),)
+
+
+class BacktestJob(Base):
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    strategy: Mapped[str] = mapped_column(String(255))
+    symbols: Mapped[list[str]] = mapped_column(JSON, default=list)
+    start_date: Mapped[date] = mapped_column(Date)
+    end_date: Mapped[date] = mapped_column(Date)
+    parameters: Mapped[dict] = mapped_column(JSON, default=dict)
+    # The job store may live in its own database, so the owner is a plain id, not a foreign key.
+    user_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
+    batch_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    total_capital: Mapped[float | None] = mapped_column(Float, nullable=True)
+    currency: Mapped[str] = mapped_column(String(8), default="USD")
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
 
 class UsageLog(Base):
     __tablename__ = "usage_log"
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
 
 from ..core.ratelimit import limiter
-from ..deps import get_backtest_service
-from ..models.schemas import BacktestRequest, BacktestResult
+from ..deps import get_backtest_service, get_current_user, get_db_session, track_run
+from ..models import tables
+from ..models.schemas import BacktestRequest, BacktestResult, BacktestStatus
 from ..services.backtests import BacktestService
 
 router = APIRouter()
@@ -14,15 +16,48 @@ def create_backtest(
     payload: BacktestRequest,
     request: Request,
     service: BacktestService = Depends(get_backtest_service),
+    db_session: Session = Depends(get_db_session),
+    user: tables.User = Depends(get_current_user),
 ) -> BacktestResult:
-    if not payload.symbols:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one symbol is required")
+    if payload.batchId is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A batchId of uploaded trades is required")
     if payload.start_date > payload.end_date:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date must be before end date")
+    batch = db_session.get(tables.Batch, payload.batchId)
+    if batch is None or batch.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    # Queued jobs count against the daily run quota like interactive runs.
+    track_run(user, db_session)
     job = service.create(
         strategy=payload.strategy,
         symbols=payload.symbols,
         start_date=payload.start_date,
         end_date=payload.end_date,
+        parameters=payload.parameters,
+        batch_id=payload.batchId,
+        user_id=user.id,
+        total_capital=payload.totalCapital,
+        currency=payload.currency,
     )
     return BacktestResult(backtest_id=job.id, status=job.status, strategy=job.strategy)
+
+
+@router.get("/{backtest_id}", response_model=BacktestStatus)
+def get_backtest(
+    backtest_id: str,
+    service: BacktestService = Depends(get_backtest_service),
+    user: tables.User = Depends(get_current_user),
+) -> BacktestStatus:
+    job = service.get(backtest_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Backtest not found")
+    return BacktestStatus(
+        backtest_id=job.id,
+        status=job.status,
+        strategy=job.strategy,
+        attempts=job.attempts,
+        error=job.error,
+        result=job.result,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
@@ -1,61 +1,451 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
+from datetime import datetime
+from typing import Iterator, Literal
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
 from .. import deps
+from ..core.config import settings
 from ..models import tables
-from ..models.schemas import PortfolioRunPersisted, PortfolioRunRequest, PortfolioRunResponse
-from ..services.portfolio import run_portfolio
+from ..models.schemas import (
+    AllocationRequest,
+    AllocationResponse,
+    ContributionRequest,
+    ContributionResponse,
+    MonteCarloRequest,
+    MonteCarloResponse,
+    PortfolioRunPage,
+    PortfolioRunPersisted,
+    PortfolioRunRequest,
+    PortfolioRunResponse,
+    PortfolioRunSummary,
+    PortfolioWindowSummary,
+    RollingAnalyticsResponse,
+    TickerWindowSummary,
+    TradePageResponse,
+)
+from ..services.allocation import optimize_allocation
+from ..services.columnar import ARROW_STREAM_MEDIA_TYPE, encode_run, encode_run_json, stream_trades
+from ..services.contribution import contribution_analysis, encode_contribution_json
+from ..services.montecarlo import monte_carlo
+from ..services.portfolio import (
+    compute_run,
+    get_run,
+    list_runs,
+    load_trade_index,
+    result_cache_stats,
+    summarize_window,
+)
+from ..services.rolling import encode_rolling_json, rolling_analytics
+from ..services.runpool import PoolSaturated, PortfolioRunPool
+from ..services.storage import storage_service
+from ..services.trade_index import to_ns
+from ..services.trade_table import SortKey, TradeQuery, iter_trade_columns, iter_trades, page_trades
+from ..services.trades import Direction
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 router = APIRouter()
 
 
+def _accepts(request: Request, media_type: str) -> bool:
+    return media_type in request.headers.get("accept", "")
+
+
+def _run_and_commit(
+    db_session: Session,
+    user: tables.User,
+    payload: PortfolioRunRequest,
+    points: int | None = None,
+    arrow: bool = False,
+) -> Response:
+    deps.track_run(user, db_session)
+    try:
+        run = compute_run(db_session, user, payload)
+        db_session.commit()
+    except ValueError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    if arrow:
+        body = encode_run(run.summary, run.curves, run.pyramid, points)
+        return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE)
+    # The bytes were encoded once when the run was computed and already match the schema.
+    return Response(content=run.json(points), media_type="application/json")
+
+
 @router.post("/run", response_model=PortfolioRunResponse)
 async def run_portfolio_endpoint(
+    request: Request,
     payload: PortfolioRunRequest,
+    points: int | None = Query(default=None, ge=3, description="Maximum points per curve (LTTB downsampled)"),
     db_session: Session = Depends(deps.get_db_session),
     user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
 ):
+    # The run and its database work block, so they execute on the bounded run pool
+    # and the event loop stays free for health checks and uploads. Clients that send
+    # ``Accept: application/vnd.apache.arrow.stream`` get the curves as typed columns.
+    arrow = _accepts(request, ARROW_STREAM_MEDIA_TYPE)
+    try:
+        return await run_pool.run(_run_and_commit, db_session, user, payload, points, arrow)
+    except PoolSaturated as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(exc),
+            headers={"Retry-After": "5"},
+        ) from exc
+
+
+def _optimize_and_commit(db_session: Session, user: tables.User, payload: AllocationRequest) -> Response:
     deps.track_run(user, db_session)
     try:
-        response = run_portfolio(db_session, user, payload)
+        allocation, run = optimize_allocation(db_session, user, payload)
         db_session.commit()
+    except LookupError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
         db_session.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
-    return response
+    head = orjson.dumps({
+        "method": allocation.method,
+        "weights": allocation.weights,
+        "riskContributions": allocation.risk_contributions,
+        "shrinkage": allocation.shrinkage,
+        "expectedReturnPct": allocation.expected_return_pct,
+        "volatilityPct": allocation.volatility_pct,
+    })
+    # Splice in the run's response bytes, which were encoded once when it was computed.
+    return Response(content=head[:-1] + b',"run":' + run.body + b"}", media_type="application/json")
+
+
+@router.post("/optimize", response_model=AllocationResponse)
+async def optimize_portfolio_endpoint(
+    payload: AllocationRequest,
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
+):
+    """Weight tickers by inverse volatility, risk parity or max Sharpe, then run the weighted portfolio."""
+
+    try:
+        return await run_pool.run(_optimize_and_commit, db_session, user, payload)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+
+def _monte_carlo_and_commit(db_session: Session, user: tables.User, payload: MonteCarloRequest) -> MonteCarloResponse:
+    deps.track_run(user, db_session)
+    start, end = payload.dateRange or (None, None)
+    try:
+        result = monte_carlo(
+            db_session,
+            user,
+            payload.batchId,
+            payload.totalCapital,
+            start,
+            end,
+            payload.method,
+            payload.paths,
+            payload.seed,
+        )
+        db_session.commit()
+    except LookupError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    metrics = result.metrics
+    return MonteCarloResponse(
+        batchId=payload.batchId,
+        totalCapital=result.total_capital,
+        method=result.method,
+        paths=result.paths,
+        trades=result.trades,
+        seed=result.seed,
+        finalEquity=result.percentiles(metrics.final_equity),
+        maxDrawdownPct=result.percentiles(metrics.max_drawdown_pct),
+        timeToRecoverDays=result.percentiles(metrics.recovery_days),
+        probabilityOfLoss=result.probability_of_loss,
+    )
+
+
+@router.post("/montecarlo", response_model=MonteCarloResponse)
+async def run_monte_carlo_endpoint(
+    payload: MonteCarloRequest,
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
+):
+    """Percentiles of final equity, max drawdown and time-to-recover over resampled trade paths."""
+
+    try:
+        return await run_pool.run(_monte_carlo_and_commit, db_session, user, payload)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+
+def _contribution_and_commit(
+    db_session: Session,
+    user: tables.User,
+    payload: ContributionRequest,
+    points: int | None = None,
+) -> Response:
+    deps.track_run(user, db_session)
+    start, end = payload.dateRange or (None, None)
+    try:
+        result = contribution_analysis(
+            db_session,
+            user,
+            payload.batchId,
+            payload.totalCapital,
+            start,
+            end,
+            payload.subsets,
+            payload.leaveOneOut,
+        )
+        db_session.commit()
+    except LookupError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return Response(content=encode_contribution_json(payload.batchId, result, points), media_type="application/json")
+
+
+@router.post("/contribution", response_model=ContributionResponse)
+async def run_contribution_endpoint(
+    payload: ContributionRequest,
+    points: int | None = Query(default=None, ge=3, description="Maximum points per drawdown curve (deepest value per bucket)"),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
+):
+    """KPIs and drawdowns of the batch without each ticker and of chosen ticker subsets."""
+
+    if len(payload.subsets) > settings.contribution_max_subsets:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.contribution_max_subsets} subsets per request",
+        )
+    try:
+        return await run_pool.run(_contribution_and_commit, db_session, user, payload, points)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+
+@router.get("/cache/stats")
+def get_result_cache_stats(user=Depends(deps.get_current_user)) -> dict:
+    return {**result_cache_stats(), "storage": storage_service.stats()}
 
 
-@router.get("/{batch_id}", response_model=list[PortfolioRunPersisted])
-async def get_portfolio_runs(
+@router.get("/{batch_id}/window", response_model=PortfolioWindowSummary)
+async def get_portfolio_window(
     batch_id: str = Path(..., description="Batch identifier"),
+    start: datetime | None = Query(default=None, description="Inclusive window start (trade exit time)"),
+    end: datetime | None = Query(default=None, description="Inclusive window end (trade exit time)"),
+    total_capital: float | None = Query(default=None, alias="totalCapital"),
     db_session: Session = Depends(deps.get_db_session),
     user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
 ):
-    batch = db_session.get(tables.Batch, batch_id)
-    if not batch or batch.user_id != user.id:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    try:
+        capital, stats = await run_pool.run(summarize_window, db_session, user, batch_id, total_capital, start, end)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    runs = (
-        db_session.query(tables.PortfolioRun)
-        .filter(tables.PortfolioRun.batch_id == batch_id)
-        .order_by(tables.PortfolioRun.created_at.desc())
-        .all()
+    return PortfolioWindowSummary(
+        batchId=batch_id,
+        totalCapital=capital,
+        dateRange=(start, end),
+        trades=sum(item.trades for item in stats),
+        wins=sum(item.wins for item in stats),
+        pnl=sum(item.pnl for item in stats),
+        finalEquity=sum(item.final_equity for item in stats),
+        tickers=[
+            TickerWindowSummary(
+                ticker=item.ticker,
+                trades=item.trades,
+                wins=item.wins,
+                pnl=item.pnl,
+                finalEquity=item.final_equity,
+            )
+            for item in stats
+        ],
     )
-    responses: list[PortfolioRunPersisted] = []
-    for run in runs:
-        metrics = run.metrics
-        if isinstance(metrics, str):
-            raise HTTPException(status_code=500, detail="Stored metrics malformed")
-        validated = PortfolioRunPersisted(
-            runId=run.id,
-            batchId=run.batch_id,
-            currency=run.currency,
-            totalCapital=run.total_capital,
-            dateRange=(run.date_start, run.date_end),
-            createdAt=run.created_at,
-            **metrics,
+
+
+@router.get("/{batch_id}/trades", response_model=TradePageResponse)
+async def get_portfolio_trades(
+    request: Request,
+    batch_id: str = Path(..., description="Batch identifier"),
+    cursor: str | None = Query(default=None, description="Cursor from a run response or a previous page"),
+    start: datetime | None = Query(default=None, description="Inclusive window start (trade exit time)"),
+    end: datetime | None = Query(default=None, description="Inclusive window end (trade exit time)"),
+    ticker: list[str] = Query(default=[]),
+    direction: Literal["Long", "Short"] | None = Query(default=None),
+    pnl: Literal["positive", "negative"] | None = Query(default=None),
+    sort: SortKey = Query(default="exitTime"),
+    order: Literal["asc", "desc"] = Query(default="asc"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+    run_pool: PortfolioRunPool = Depends(deps.get_portfolio_run_pool),
+):
+    """Trades of a batch, one page at a time or streamed as NDJSON or Arrow.
+
+    A cursor carries the window, filters, sort and position, so follow-up requests
+    only pass ``cursor``. Send ``Accept: application/x-ndjson`` or
+    ``application/vnd.apache.arrow.stream`` to stream every remaining trade instead
+    of a single page.
+    """
+
+    try:
+        if cursor:
+            query = TradeQuery.from_cursor(cursor)
+            if query.batch_id != batch_id:
+                raise ValueError("Cursor belongs to a different batch")
+        else:
+            query = TradeQuery(
+                batch_id=batch_id,
+                start=start,
+                end=end,
+                tickers=tuple(ticker),
+                direction=Direction[direction.upper()] if direction else None,
+                pnl=pnl,
+                sort=sort,
+                descending=order == "desc",
+            )
+        index = await run_pool.run(load_trade_index, db_session, user, batch_id)
+    except PoolSaturated as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    if _accepts(request, ARROW_STREAM_MEDIA_TYPE):
+        chunks = iter_trade_columns(index, query, chunk_size=10_000)
+        return StreamingResponse(stream_trades(index, chunks), media_type=ARROW_STREAM_MEDIA_TYPE)
+    if _accepts(request, NDJSON_MEDIA_TYPE):
+        def lines() -> Iterator[bytes]:
+            for chunk in iter_trades(index, query):
+                yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    page = page_trades(index, query, limit)
+    return TradePageResponse(items=page.rows, total=page.total, nextCursor=page.next_cursor)
+
+
+@router.get("/{batch_id}/runs/{run_id}", response_model=PortfolioRunPersisted)
+def get_portfolio_run(
+    request: Request,
+    batch_id: str = Path(..., description="Batch identifier"),
+    run_id: str = Path(..., description="Run identifier"),
+    points: int | None = Query(default=None, ge=3, description="Maximum points per curve (LTTB downsampled)"),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+):
+    try:
+        run, stored = get_run(db_session, user, batch_id, run_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    if _accepts(request, ARROW_STREAM_MEDIA_TYPE):
+        body = encode_run(stored.summary, stored.curves, stored.pyramid, points)
+        return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE)
+    stored_fields = {
+        "runId": run.id,
+        "batchId": run.batch_id,
+        "currency": run.currency,
+        "totalCapital": run.total_capital,
+        "dateRange": (run.date_start, run.date_end),
+        "maxPositions": run.max_positions,
+        "weights": run.weights,
+        "createdAt": run.created_at,
+    }
+    body = encode_run_json({**stored.summary, **stored_fields}, stored.curves, stored.pyramid, points)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{batch_id}/runs/{run_id}/rolling", response_model=RollingAnalyticsResponse)
+def get_portfolio_run_rolling(
+    batch_id: str = Path(..., description="Batch identifier"),
+    run_id: str = Path(..., description="Run identifier"),
+    windows: list[int] = Query(default=[63, 252], description="Trailing windows in business days"),
+    splits: list[datetime] = Query(default=[], description="Walk-forward segment boundaries"),
+    segment_days: int | None = Query(default=None, alias="segmentDays", ge=2, description="Also split every N business days"),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+):
+    """Rolling Sharpe, Sortino, return and drawdown of a stored run, plus walk-forward segment metrics."""
+
+    if not windows or len(windows) > 8 or min(windows) < 2:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass between one and eight windows of at least 2 days",
         )
-        responses.append(validated)
-    return responses
+    try:
+        run, stored = get_run(db_session, user, batch_id, run_id)
+        curves = stored.curves
+        series, segments = rolling_analytics(
+            curves.timestamp_ns,
+            curves.equity,
+            windows,
+            [to_ns(split, 0) for split in splits],
+            segment_days,
+        )
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    body = encode_rolling_json(run.id, curves.timestamp_ns, series, segments)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{batch_id}", response_model=PortfolioRunPage)
+def get_portfolio_runs(
+    batch_id: str = Path(..., description="Batch identifier"),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None, description="nextCursor from the previous page"),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+):
+    """Run summaries for a batch, newest first; fetch curves via ``/{batch_id}/runs/{run_id}``."""
+
+    try:
+        rows, next_cursor = list_runs(db_session, user, batch_id, limit, cursor)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return PortfolioRunPage(
+        items=[
+            PortfolioRunSummary(
+                runId=row.id,
+                batchId=row.batch_id,
+                currency=row.currency,
+                totalCapital=row.total_capital,
+                dateRange=(row.date_start, row.date_end),
+                maxPositions=row.max_positions,
+                weights=row.weights,
+                createdAt=row.created_at,
+                kpis=row.kpis or {},
+                tradesCount=row.trades_count or 0,
+            )
+            for row in rows
+        ],
+        nextCursor=next_cursor,
+    )
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Response, UploadFile, status
 from sqlalchemy.orm import Session
 
 from .. import deps
+from ..core.config import settings
 from ..models.schemas import UploadResponse
-from ..services.ingest import ingest_files
+from ..services.ingest import delete_batch, ingest_files, sweep_released
 
 router = APIRouter()
 
@@ -41,3 +42,22 @@ async def upload_files(
             for report in reports
         ],
     )
+
+
+@router.delete("/{batch_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_upload_batch(
+    batch_id: str = Path(..., description="Batch identifier"),
+    db_session: Session = Depends(deps.get_db_session),
+    user=Depends(deps.get_current_user),
+):
+    try:
+        delete_batch(db_session, user, batch_id)
+        db_session.commit()
+    except LookupError as exc:
+        db_session.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+    # Released objects are deleted from storage once their grace period is over.
+    sweep_released(db_session, settings.storage_release_grace_seconds)
+    db_session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models import tables
+from ..models.schemas import AllocationRequest, PortfolioRunRequest
+from .cache import ByteBudgetLRU
+from .portfolio import (
+    CachedRun,
+    _content_fingerprint,
+    _load_batch_index,
+    _user_batch,
+    compute_run,
+    unit_equity_columns,
+)
+from .trade_index import BatchIndex
+
+AllocationMethod = Literal["inverseVol", "riskParity", "maxSharpe"]
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class ReturnModel:
+    """Daily ticker returns on the batch's aligned calendar, with their shrunk covariance.
+
+    Independent of capital and weights, so one model serves every optimization
+    of a batch window. Tickers whose returns never move are ``inactive`` and
+    left out of the solvers.
+    """
+
+    tickers: list[str]
+    returns: np.ndarray  # days x tickers
+    mean: np.ndarray  # of the active tickers, annualized
+    covariance: np.ndarray  # of the active tickers, annualized and shrunk
+    shrinkage: float
+    active: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.returns.nbytes + self.mean.nbytes + self.covariance.nbytes + self.active.nbytes
+
+    @classmethod
+    def build(cls, index: BatchIndex, start: datetime | None, end: datetime | None) -> ReturnModel:
+        _, equity = unit_equity_columns(index, start, end)
+        if len(equity) < 3:
+            raise ValueError("Not enough trading days in the window to estimate returns")
+        previous = equity[:-1]
+        # Days before a ticker starts (zero equity) count as flat.
+        returns = np.divide(equity[1:], previous, out=np.ones_like(previous), where=previous > 0) - 1
+        active = returns.std(axis=0) > 0
+        if not active.any():
+            raise ValueError("No ticker's equity moves in the window")
+        covariance, shrinkage = shrunk_covariance(returns[:, active])
+        return cls(
+            tickers=[ticker.ticker for ticker in index.tickers],
+            returns=returns,
+            mean=returns[:, active].mean(axis=0) * TRADING_DAYS,
+            covariance=covariance * TRADING_DAYS,
+            shrinkage=shrinkage,
+            active=active,
+        )
+
+
+@dataclass
+class Allocation:
+    method: AllocationMethod
+    weights: dict[str, float]
+    shrinkage: float
+    expected_return_pct: float
+    volatility_pct: float
+    risk_contributions: dict[str, float]
+
+
+model_cache: ByteBudgetLRU[str, ReturnModel] = ByteBudgetLRU(settings.portfolio_allocation_cache_bytes)
+
+
+def shrunk_covariance(returns: np.ndarray) -> tuple[np.ndarray, float]:
+    """Ledoit-Wolf covariance of ``returns`` (days x assets), shrunk towards a scaled identity.
+
+    Returns the covariance and the shrinkage intensity in ``[0, 1]``; every step
+    is a matrix product, so 500 assets over ten years is a fraction of a second.
+    """
+
+    days, assets = returns.shape
+    centred = returns - returns.mean(axis=0)
+    sample = centred.T @ centred / days
+    target = np.trace(sample) / assets
+    squared = centred**2
+    # Estimated variance of the sample covariance entries vs. their distance from the target.
+    spread = (squared.T @ squared).sum() / days - (sample**2).sum()
+    distance = ((sample - target * np.eye(assets)) ** 2).sum()
+    shrinkage = 0.0 if distance == 0 else float(np.clip(spread / days / distance, 0.0, 1.0))
+    covariance = (1 - shrinkage) * sample
+    covariance[np.diag_indices(assets)] += shrinkage * target
+    return covariance, shrinkage
+
+
+def inverse_volatility(covariance: np.ndarray) -> np.ndarray:
+    weights = 1 / np.sqrt(np.diag(covariance))
+    return weights / weights.sum()
+
+
+def risk_parity(covariance: np.ndarray, iterations: int = 100, tolerance: float = 1e-12) -> np.ndarray:
+    """Weights whose contributions ``w_i (Σw)_i`` to portfolio variance are equal.
+
+    Newton's method on the convex ``½yᵀΣy - mean(log y)``, whose minimum satisfies
+    ``y_i (Σy)_i = 1/n``; each step is one dense solve. Normalizing ``y`` gives the weights.
+    """
+
+    n = len(covariance)
+    budget = np.full(n, 1 / n)
+    y = inverse_volatility(covariance) / np.sqrt(n)
+
+    def objective(point: np.ndarray) -> float:
+        return float(0.5 * point @ covariance @ point - budget @ np.log(point))
+
+    value = objective(y)
+    for _ in range(iterations):
+        gradient = covariance @ y - budget / y
+        hessian = covariance + np.diag(budget / y**2)
+        step = np.linalg.solve(hessian, gradient)
+        decrement = float(gradient @ step)
+        if decrement / 2 <= tolerance:
+            break
+        # Backtrack to stay in the positive orthant and decrease the objective.
+        scale = 1.0
+        shrinking = step > 0
+        if shrinking.any():
+            scale = min(1.0, 0.99 * float((y[shrinking] / step[shrinking]).min()))
+        while True:
+            candidate = y - scale * step
+            candidate_value = objective(candidate)
+            if candidate_value <= value - 0.25 * scale * decrement or scale < 1e-12:
+                break
+            scale /= 2
+        y, value = candidate, candidate_value
+    return y / y.sum()
+
+
+def _project_simplex(point: np.ndarray) -> np.ndarray:
+    """Euclidean projection onto ``{w >= 0, sum(w) = 1}`` (sort-based, O(n log n))."""
+
+    ordered = np.sort(point)[::-1]
+    cumulative = np.cumsum(ordered) - 1
+    rank = np.arange(1, len(point) + 1)
+    last = np.flatnonzero(ordered - cumulative / rank > 0)[-1]
+    return np.maximum(point - cumulative[last] / (last + 1), 0.0)
+
+
+def max_sharpe(mean: np.ndarray, covariance: np.ndarray, iterations: int = 10_000, tolerance: float = 1e-10) -> np.ndarray:
+    """Long-only weights with the highest ``μᵀw / sqrt(wᵀΣw)``.
+
+    Projected gradient ascent on the simplex with backtracking. The Sharpe ratio is
+    pseudo-concave where ``μᵀw > 0``, so the stationary point it reaches is the
+    global maximum.
+    """
+
+    if not (mean > 0).any():
+        raise ValueError("No ticker has a positive mean return in the window, so max-Sharpe weights are undefined")
+
+    def sharpe(weights: np.ndarray) -> tuple[float, np.ndarray]:
+        risk = covariance @ weights
+        volatility = float(np.sqrt(weights @ risk))
+        excess = float(mean @ weights)
+        return excess / volatility, mean / volatility - excess * risk / volatility**3
+
+    weights = inverse_volatility(covariance)
+    value, gradient = sharpe(weights)
+    step = 1.0 / max(float(np.abs(gradient).max()), 1e-12)
+    for _ in range(iterations):
+        candidate = _project_simplex(weights + step * gradient)
+        candidate_value, candidate_gradient = sharpe(candidate)
+        if candidate_value < value:
+            step /= 2
+            if step < 1e-14:
+                break
+            continue
+        moved = float(np.abs(candidate - weights).max())
+        weights, value, gradient = candidate, candidate_value, candidate_gradient
+        if moved <= tolerance:
+            break
+        step *= 2
+    return weights
+
+
+_SOLVERS = {
+    "inverseVol": lambda model: inverse_volatility(model.covariance),
+    "riskParity": lambda model: risk_parity(model.covariance),
+    "maxSharpe": lambda model: max_sharpe(model.mean, model.covariance),
+}
+
+
+def solve_allocation(model: ReturnModel, method: AllocationMethod) -> Allocation:
+    active_weights = _SOLVERS[method](model)
+    weights = np.zeros(len(model.tickers))
+    weights[model.active] = active_weights
+    risk = model.covariance @ active_weights
+    variance = float(active_weights @ risk)
+    contributions = np.zeros(len(model.tickers))
+    contributions[model.active] = active_weights * risk / variance
+    return Allocation(
+        method=method,
+        weights=dict(zip(model.tickers, weights.tolist())),
+        shrinkage=model.shrinkage,
+        expected_return_pct=float(model.mean @ active_weights) * 100,
+        volatility_pct=float(np.sqrt(variance)) * 100,
+        risk_contributions=dict(zip(model.tickers, contributions.tolist())),
+    )
+
+
+def return_model(batch: tables.Batch, start: datetime | None, end: datetime | None) -> ReturnModel:
+    """The batch window's return model, cached by batch contents and window."""
+
+    key = hashlib.sha256(
+        json.dumps([_content_fingerprint(batch), [value.isoformat() if value else None for value in (start, end)]]).encode()
+    ).hexdigest()
+    model = model_cache.get(key)
+    if model is None:
+        model = ReturnModel.build(_load_batch_index(batch), start, end)
+        model_cache.put(key, model, size=model.nbytes)
+    return model
+
+
+def optimize_allocation(db: Session, user: tables.User, request: AllocationRequest) -> tuple[Allocation, CachedRun]:
+    """Solve for ticker weights, then run the portfolio with capital split by them."""
+
+    batch = _user_batch(db, user, request.batchId)
+    start, end = request.dateRange or (None, None)
+    allocation = solve_allocation(return_model(batch, start, end), request.method)
+    run = compute_run(
+        db,
+        user,
+        PortfolioRunRequest(
+            batchId=request.batchId,
+            totalCapital=request.totalCapital,
+            currency=request.currency,
+            dateRange=request.dateRange,
+            weights={ticker: weight for ticker, weight in allocation.weights.items() if weight > 0},
+        ),
+    )
+    return allocation, run
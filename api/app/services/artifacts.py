@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import tempfile
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+TRADES_ARTIFACT_SUFFIX = ".arrow"
+TRADES_ARTIFACT_CONTENT_TYPE = "application/vnd.apache.arrow.file"
+
+
+def trades_artifact_key(object_key: str) -> str:
+    return f"{object_key}{TRADES_ARTIFACT_SUFFIX}"
+
+
+class TradesArtifactWriter:
+    """Builds a trades artifact from CSV chunks as they are parsed.
+
+    The artifact is one uncompressed Arrow IPC file, so readers can map it straight
+    into Arrow buffers without an inflate step. Each chunk is spooled as its own
+    Arrow stream because chunk dtypes can differ (an all-empty chunk parses as
+    float, a later one as int). ``finish`` casts every chunk to the promoted
+    schema, so the artifact decodes to the same dtypes as a whole-file
+    ``read_csv``. A column whose chunks parse to types that don't promote (numbers
+    in one chunk, text in another) becomes text, as it would in a single read; its
+    numeric cells are then written in Arrow's number formatting rather than as the
+    original text. Only one chunk is held in memory at a time; spools larger than
+    ``max_memory`` move to disk.
+    """
+
+    def __init__(self, max_memory: int) -> None:
+        self._max_memory = max_memory
+        self._spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._segments: list[tuple[int, int]] = []
+        self._schema: pa.Schema | None = None
+        self._text_columns: set[str] = set()
+
+    def add(self, df: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+        for position, column in enumerate(table.columns):
+            name = table.field(position).name
+            if len(table) and column.null_count == len(table):
+                # All-null columns say nothing about the column's type; let other chunks decide.
+                table = table.set_column(position, name, pa.nulls(len(table)))
+            elif name in self._text_columns:
+                table = table.set_column(position, name, column.cast(pa.large_string()))
+        self._schema = table.schema if self._schema is None else self._unify(table.schema)
+        start = self._spool.tell()
+        with pa.ipc.new_stream(self._spool, table.schema) as writer:
+            writer.write_table(table)
+        self._segments.append((start, self._spool.tell() - start))
+
+    def _unify(self, schema: pa.Schema) -> pa.Schema:
+        try:
+            return pa.unify_schemas([self._schema, schema], promote_options="permissive")
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            pass
+        fields = []
+        for field in self._schema:
+            try:
+                pa.unify_schemas([pa.schema([field]), pa.schema([schema.field(field.name)])], promote_options="permissive")
+            except (pa.ArrowTypeError, pa.ArrowInvalid):
+                self._text_columns.add(field.name)
+                field = field.with_type(pa.large_string())
+            fields.append(field)
+        # Earlier chunks keep their spooled types until ``finish`` casts them.
+        return pa.unify_schemas(
+            [pa.schema(fields), pa.schema([field.with_type(pa.large_string()) if field.name in self._text_columns else field for field in schema])],
+            promote_options="permissive",
+        )
+
+    def finish(self) -> BinaryIO:
+        """Return the artifact as a file positioned at its start; the caller closes it."""
+
+        if self._schema is None:
+            raise ValueError("No trades were added to the artifact")
+        # Columns empty in every chunk parse as float NaN in a single read_csv.
+        schema = pa.schema([field.with_type(pa.float64()) if pa.types.is_null(field.type) else field for field in self._schema])
+        output = tempfile.SpooledTemporaryFile(max_size=self._max_memory)
+        with pa.ipc.new_file(output, schema) as writer:
+            for start, length in self._segments:
+                self._spool.seek(start)
+                table = pa.ipc.open_stream(self._spool.read(length)).read_all()
+                writer.write_table(table.cast(schema))
+        self._spool.close()
+        output.seek(0)
+        return output
+
+
+def decode_trades_frame(payload) -> pd.DataFrame:
+    """Load a trades frame from its artifact, an uncompressed Arrow IPC file.
+
+    ``payload`` may be ``bytes`` or any buffer-protocol object such as an ``mmap``;
+    with no compression to inflate, Arrow reads it in place rather than copying it.
+    """
+
+    table = pa.ipc.open_file(pa.py_buffer(payload)).read_all()
+    df = table.to_pandas()
+    # Keep missing values identical to a fresh ``read_csv`` (NaN, not None).
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date
-from typing import Dict
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Callable
 from uuid import uuid4
 
+from sqlalchemy import create_engine, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import settings
+from ..models import tables
+from ..models.base import Base
+
+logger = logging.getLogger("api.backtests")
+
 
 @dataclass
 class BacktestJob:
@@ -14,19 +29,375 @@ class BacktestJob:
     start_date: date
     end_date: date
     status: str = "queued"
+    batch_id: str | None = None
+    user_id: str | None = None
+    attempts: int = 0
+    error: str | None = None
+    result: dict | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    parameters: dict = field(default_factory=dict)
+    total_capital: float | None = None
+    currency: str = "USD"
+
+    @classmethod
+    def from_row(cls, row: tables.BacktestJob) -> BacktestJob:
+        return cls(
+            id=row.id,
+            strategy=row.strategy,
+            symbols=list(row.symbols or []),
+            start_date=row.start_date,
+            end_date=row.end_date,
+            status=row.status,
+            batch_id=row.batch_id,
+            user_id=row.user_id,
+            attempts=row.attempts,
+            error=row.error,
+            result=row.result,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            parameters=dict(row.parameters or {}),
+            total_capital=row.total_capital,
+            currency=row.currency,
+        )
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix."""
 
 
 class BacktestService:
-    def __init__(self) -> None:
-        self._jobs: Dict[str, BacktestJob] = {}
+    """Job queue persisted through SQLAlchemy so every API and worker process shares it.
+
+    Jobs move ``queued -> running -> succeeded | failed``. A failed attempt is
+    re-queued with exponential backoff until ``max_attempts`` is reached, and a job
+    whose worker died mid-run becomes claimable again once its lease expires.
+    Workers renew the lease while a job runs, and only the worker holding the
+    lease may record its outcome, so a job reclaimed from a stalled worker is
+    never overwritten by it.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        *,
+        max_attempts: int | None = None,
+        backoff_seconds: float | None = None,
+        lease_seconds: float | None = None,
+    ) -> None:
+        self.url = url or settings.backtest_jobs_url or settings.sqlalchemy_database_url
+        self._engine = create_engine(self.url, future=True)
+        self._sessions = sessionmaker(bind=self._engine, autoflush=False, future=True)
+        self.max_attempts = max_attempts or settings.backtest_max_attempts
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.backtest_backoff_seconds
+        self.lease_seconds = lease_seconds or settings.backtest_lease_seconds
+        Base.metadata.create_all(self._engine, tables=[tables.BacktestJob.__table__])
 
-    def create(self, *, strategy: str, symbols: list[str], start_date: date, end_date: date) -> BacktestJob:
-        job = BacktestJob(id=str(uuid4()), strategy=strategy, symbols=symbols, start_date=start_date, end_date=end_date)
-        self._jobs[job.id] = job
-        return job
+    def create(
+        self,
+        *,
+        strategy: str,
+        symbols: list[str],
+        start_date: date,
+        end_date: date,
+        parameters: dict | None = None,
+        batch_id: str | None = None,
+        user_id: str | None = None,
+        total_capital: float | None = None,
+        currency: str = "USD",
+    ) -> BacktestJob:
+        now = datetime.utcnow()
+        row = tables.BacktestJob(
+            id=str(uuid4()),
+            strategy=strategy,
+            symbols=symbols,
+            start_date=start_date,
+            end_date=end_date,
+            parameters=parameters or {},
+            batch_id=batch_id,
+            user_id=user_id,
+            total_capital=total_capital,
+            currency=currency,
+            status="queued",
+            attempts=0,
+            max_attempts=self.max_attempts,
+            next_attempt_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        with self._sessions() as session:
+            session.add(row)
+            session.commit()
+            return BacktestJob.from_row(row)
 
     def get(self, job_id: str) -> BacktestJob | None:
-        return self._jobs.get(job_id)
+        with self._sessions() as session:
+            row = session.get(tables.BacktestJob, job_id)
+            return BacktestJob.from_row(row) if row else None
+
+    def claim(self, worker_id: str) -> BacktestJob | None:
+        """Atomically move the next due job to ``running`` for ``worker_id``."""
+
+        job_table = tables.BacktestJob
+        with self._sessions() as session:
+            now = datetime.utcnow()
+            candidates = session.scalars(
+                select(job_table.id)
+                .where(
+                    or_(
+                        (job_table.status == "queued") & (job_table.next_attempt_at <= now),
+                        (job_table.status == "running") & (job_table.locked_until < now),
+                    )
+                )
+                .order_by(job_table.next_attempt_at, job_table.created_at)
+                .limit(5)
+            ).all()
+            for job_id in candidates:
+                # Conditional update: only one worker can win the status transition.
+                claimed = session.execute(
+                    update(job_table)
+                    .where(
+                        job_table.id == job_id,
+                        or_(
+                            job_table.status == "queued",
+                            (job_table.status == "running") & (job_table.locked_until < now),
+                        ),
+                    )
+                    .values(
+                        status="running",
+                        locked_by=worker_id,
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                        updated_at=now,
+                    )
+                )
+                session.commit()
+                if claimed.rowcount == 1:
+                    return BacktestJob.from_row(session.get(job_table, job_id))
+        return None
+
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        """Extend ``worker_id``'s lease on a running job; ``False`` once it has lost the lease."""
+
+        job_table = tables.BacktestJob
+        now = datetime.utcnow()
+        with self._sessions() as session:
+            renewed = session.execute(
+                update(job_table)
+                .where(job_table.id == job_id, job_table.status == "running", job_table.locked_by == worker_id)
+                .values(locked_until=now + timedelta(seconds=self.lease_seconds), updated_at=now)
+            )
+            session.commit()
+            return renewed.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: dict) -> bool:
+        return self._finish(job_id, worker_id, status="succeeded", result=result, error=None)
+
+    def fail(self, job_id: str, worker_id: str, error: str, *, retry: bool = True) -> BacktestJob | None:
+        """Record a failed attempt, re-queueing with backoff while attempts remain.
+
+        Returns ``None`` when ``worker_id`` no longer holds the job's lease.
+        """
+
+        job_table = tables.BacktestJob
+        with self._sessions() as session:
+            row = session.get(job_table, job_id)
+            if row is None or row.status != "running" or row.locked_by != worker_id:
+                return None
+            now = datetime.utcnow()
+            attempts = row.attempts + 1
+            values = {"attempts": attempts, "error": error, "locked_by": None, "locked_until": None, "updated_at": now}
+            if retry and attempts < row.max_attempts:
+                values.update(status="queued", next_attempt_at=now + timedelta(seconds=self.backoff_seconds * 2 ** (attempts - 1)))
+            else:
+                values["status"] = "failed"
+            # Guarded like ``claim``: another worker may have taken the job since it was read.
+            updated = session.execute(
+                update(job_table)
+                .where(job_table.id == job_id, job_table.locked_by == worker_id, job_table.attempts == row.attempts)
+                .values(**values)
+            )
+            session.commit()
+            if updated.rowcount != 1:
+                return None
+            session.refresh(row)
+            return BacktestJob.from_row(row)
 
     def clear(self) -> None:
-        self._jobs.clear()
+        with self._sessions() as session:
+            session.query(tables.BacktestJob).delete()
+            session.commit()
+
+    def _finish(self, job_id: str, worker_id: str, *, status: str, result: dict | None, error: str | None) -> bool:
+        job_table = tables.BacktestJob
+        with self._sessions() as session:
+            finished = session.execute(
+                update(job_table)
+                .where(job_table.id == job_id, job_table.status == "running", job_table.locked_by == worker_id)
+                .values(
+                    attempts=job_table.attempts + 1,
+                    status=status,
+                    result=result,
+                    error=error,
+                    locked_by=None,
+                    locked_until=None,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            session.commit()
+            return finished.rowcount == 1
+
+
+class LeaseHeartbeat:
+    """Renews a claimed job's lease in the background while its handler runs."""
+
+    def __init__(self, service: BacktestService, job_id: str, worker_id: str, interval: float | None = None) -> None:
+        self._service = service
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._interval = interval if interval is not None else service.lease_seconds / 3
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job_id}", daemon=True)
+
+    def __enter__(self) -> LeaseHeartbeat:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                if not self._service.renew(self._job_id, self._worker_id):
+                    logger.warning("backtest.lease_lost", extra={"props": {"job_id": self._job_id, "worker": self._worker_id}})
+                    return
+            except Exception:  # noqa: BLE001 - retry on the next beat
+                logger.exception("backtest.lease_renewal_failed", extra={"props": {"job_id": self._job_id}})
+
+
+def execute_job(job: BacktestJob) -> dict:
+    """Run a queued job against its uploaded batch and return the stored result."""
+
+    from .. import db
+    from ..models.schemas import PortfolioRunRequest
+    from .portfolio import run_portfolio
+
+    if not job.batch_id:
+        raise PermanentJobError("Backtest jobs require a batchId of uploaded trades")
+
+    session: Session = db.SessionLocal()
+    try:
+        batch = session.get(tables.Batch, job.batch_id)
+        # Jobs only ever run as the user who queued them, against their own batch.
+        if batch is None or job.user_id is None or batch.user_id != job.user_id:
+            raise PermanentJobError("Batch not found")
+        request = PortfolioRunRequest(
+            batchId=job.batch_id,
+            totalCapital=job.total_capital or settings.total_capital_default,
+            currency=job.currency,
+            dateRange=(
+                datetime.combine(job.start_date, datetime.min.time()),
+                datetime.combine(job.end_date, datetime.max.time()),
+            ),
+        )
+        try:
+            response = run_portfolio(session, batch.user, request)
+        except ValueError as exc:
+            raise PermanentJobError(str(exc)) from exc
+        session.commit()
+        return {"kpis": response.kpis}
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def process_next(
+    service: BacktestService,
+    worker_id: str,
+    handler: Callable[[BacktestJob], dict] = execute_job,
+) -> bool:
+    """Claim and run a single job. Returns ``False`` when nothing was due."""
+
+    job = service.claim(worker_id)
+    if job is None:
+        return False
+    started = time.perf_counter()
+    try:
+        with LeaseHeartbeat(service, job.id, worker_id):
+            result = handler(job)
+    except PermanentJobError as exc:
+        updated = service.fail(job.id, worker_id, str(exc), retry=False)
+        outcome = updated.status if updated else "lease_lost"
+    except Exception as exc:  # noqa: BLE001 - any other failure is retried with backoff
+        logger.exception("backtest.attempt_failed", extra={"props": {"job_id": job.id}})
+        updated = service.fail(job.id, worker_id, str(exc))
+        outcome = updated.status if updated else "lease_lost"
+    else:
+        outcome = "succeeded" if service.complete(job.id, worker_id, result) else "lease_lost"
+    logger.info(
+        "backtest.processed",
+        extra={
+            "props": {
+                "job_id": job.id,
+                "worker": worker_id,
+                "status": outcome,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        },
+    )
+    return True
+
+
+def run_worker(url: str, stop: multiprocessing.synchronize.Event, poll_interval: float) -> None:
+    """Worker process loop: drain due jobs, then sleep until the next poll."""
+
+    from .. import db
+
+    db.engine.dispose(close=False)
+    # Job workers are daemon processes and cannot fork a parsing pool of their own.
+    settings.portfolio_cpu_workers = 0
+    service = BacktestService(url)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    while not stop.is_set():
+        try:
+            if process_next(service, worker_id):
+                continue
+        except Exception:  # noqa: BLE001 - keep the worker alive across store hiccups
+            logger.exception("backtest.worker_error", extra={"props": {"worker": worker_id}})
+        stop.wait(poll_interval)
+
+
+class BacktestWorkerPool:
+    """Fixed set of worker processes polling the shared job store."""
+
+    def __init__(self, url: str, workers: int, poll_interval: float = 1.0) -> None:
+        self._url = url
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._stop = multiprocessing.Event()
+        self._processes: list[multiprocessing.Process] = []
+
+    def start(self) -> None:
+        if self._processes:
+            return
+        self._stop.clear()
+        for index in range(self._workers):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(self._url, self._stop, self._poll_interval),
+                name=f"backtest-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
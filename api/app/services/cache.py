@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Generic, Hashable, Literal, TypeVar
+
+logger = logging.getLogger("api.cache")
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
+
+# "lru" refreshes an entry on every hit; "fifo" evicts in insertion order, which
+# suits scan-heavy workloads where a hit says little about future reuse.
+EvictionPolicy = Literal["lru", "fifo"]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class ByteBudgetLRU(Generic[KeyT, ValueT]):
+    """Thread-safe LRU bounded by the total byte size of its entries.
+
+    Callers pass each entry's size explicitly since values are usually parsed
+    objects whose footprint is best approximated by their serialized length.
+    Entries larger than the whole budget are not stored. ``policy`` picks the
+    eviction order (see ``EvictionPolicy``); it defaults to LRU.
+    """
+
+    def __init__(self, max_bytes: int, policy: EvictionPolicy = "lru") -> None:
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._entries: OrderedDict[KeyT, tuple[ValueT, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_bytes=max_bytes)
+
+    def get(self, key: KeyT) -> ValueT | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            if self._policy == "lru":
+                self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[0]
+
+    def peek(self, key: KeyT) -> ValueT | None:
+        """Look up ``key`` without counting a hit or miss or refreshing its position.
+
+        For opportunistic reuse by readers that would not fill the cache on a miss.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key: KeyT, value: ValueT, size: int) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._stats.bytes -= previous[1]
+            if size > self._max_bytes:
+                self._stats.entries = len(self._entries)
+                return
+            self._entries[key] = (value, size)
+            self._stats.bytes += size
+            while self._stats.bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._stats.bytes -= evicted_size
+                self._stats.evictions += 1
+            self._stats.entries = len(self._entries)
+
+    def pop(self, key: KeyT) -> ValueT | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._stats.bytes -= entry[1]
+            self._stats.entries = len(self._entries)
+            return entry[0]
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+    def clear(self) -> None:
+        """Drop every entry; hit/miss counters keep accumulating for monitoring."""
+
+        with self._lock:
+            self._entries.clear()
+            self._stats.entries = 0
+            self._stats.bytes = 0
+
+
+class DiskCache:
+    """Byte-budgeted cache of immutable blobs in a local directory, read via ``mmap``.
+
+    Files are sharded by the SHA-256 of their key and written atomically (temp
+    file plus rename), so concurrent readers never see partial files and other
+    processes can share the directory. Writes the disk refuses are logged and
+    skipped. Entries found on disk at start-up are indexed oldest first.
+    Evicting a file does not invalidate maps already handed out; the kernel
+    keeps the pages until they are closed.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], max_bytes: int, policy: EvictionPolicy = "lru") -> None:
+        self._root = Path(directory)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_bytes=max_bytes)
+        existing = sorted(
+            (path.stat().st_mtime, path.name, path.stat().st_size)
+            for path in self._root.glob("*/*")
+            if path.is_file() and not path.name.startswith(".")
+        )
+        for _, name, size in existing:
+            self._entries[name] = size
+            self._stats.bytes += size
+        self._stats.entries = len(self._entries)
+        self._evict()
+
+    def _path(self, name: str) -> Path:
+        return self._root / name[:2] / name
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> mmap.mmap | bytes | None:
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                self._stats.misses += 1
+                return None
+            if self._policy == "lru":
+                self._entries.move_to_end(name)
+            self._stats.hits += 1
+        try:
+            with open(self._path(name), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b""  # mmap cannot map empty files
+                return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            # Removed behind our back (another process evicted it); treat as a miss.
+            with self._lock:
+                self._forget(name)
+                self._stats.hits -= 1
+                self._stats.misses += 1
+            return None
+
+    def put(self, key: str, payload: bytes) -> None:
+        size = len(payload)
+        if size > self._max_bytes:
+            return
+        name = self._name(key)
+        path = self._path(name)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(handle, "wb") as temp:
+                    temp.write(payload)
+                os.replace(temp_path, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(temp_path)
+                raise
+        except OSError:
+            # A full or read-only cache disk only loses this tier; callers have the bytes.
+            logger.warning("cache.disk_write_failed", exc_info=True, extra={"props": {"key": key}})
+            return
+        with self._lock:
+            self._forget(name)
+            self._entries[name] = size
+            self._stats.bytes += size
+            self._stats.entries = len(self._entries)
+            self._evict()
+
+    def pop(self, key: str) -> None:
+        name = self._name(key)
+        with self._lock:
+            if self._forget(name):
+                self._path(name).unlink(missing_ok=True)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+    def _forget(self, name: str) -> bool:
+        size = self._entries.pop(name, None)
+        if size is None:
+            return False
+        self._stats.bytes -= size
+        self._stats.entries = len(self._entries)
+        return True
+
+    def _evict(self) -> None:
+        while self._stats.bytes > self._max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._path(name).unlink(missing_ok=True)
+            self._stats.bytes -= size
+            self._stats.evictions += 1
+        self._stats.entries = len(self._entries)
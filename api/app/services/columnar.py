@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+
+from ..models.schemas import PortfolioRunResponse
+from .downsample import CurvePyramid, select_points
+from .trade_index import BatchIndex
+from .trades import DIRECTION_LABELS
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Response-level fields travel as JSON in the schema metadata under this key.
+RUN_METADATA_KEY = b"portfolio.run"
+# Stored curve blobs are read rarely and whole, so favour size over decode speed.
+CURVE_BLOB_COMPRESSION = "zstd"
+
+# Response curve -> (RunCurves attribute, Arrow column).
+_CURVE_COLUMNS = {
+    "equityCurve": ("equity", "equity"),
+    "buyHoldCurve": ("buy_hold", "buyHold"),
+    "drawdown": ("drawdown", "drawdown"),
+}
+
+TRADE_SCHEMA = pa.schema(
+    [
+        ("ticker", pa.dictionary(pa.int32(), pa.string())),
+        ("tradeNumber", pa.int64()),
+        ("direction", pa.dictionary(pa.int8(), pa.string())),
+        ("entryTime", pa.timestamp("ns")),
+        ("exitTime", pa.timestamp("ns")),
+        ("netPnl", pa.float64()),
+        ("positionSize", pa.float64()),
+        ("returnPct", pa.float64()),
+        ("runup", pa.float64()),
+        ("drawdown", pa.float64()),
+    ]
+)
+
+
+@dataclass
+class RunCurves:
+    """A run's curves as NumPy buffers sharing one business-day index."""
+
+    timestamp_ns: np.ndarray
+    equity: np.ndarray
+    buy_hold: np.ndarray
+    drawdown: np.ndarray
+
+    @classmethod
+    def from_series(cls, equity: pd.Series, buy_hold: pd.Series, drawdown: pd.Series) -> RunCurves:
+        return cls(
+            timestamp_ns=equity.index.to_numpy(dtype="datetime64[ns]").view(np.int64),
+            equity=equity.to_numpy(dtype=float),
+            buy_hold=buy_hold.to_numpy(dtype=float),
+            drawdown=drawdown.to_numpy(dtype=float),
+        )
+
+    @classmethod
+    def from_response(cls, response: PortfolioRunResponse) -> RunCurves:
+        """Rebuild from a stored response, whose curves share the equity curve's index."""
+
+        stamps = pd.DatetimeIndex([point.timestamp for point in response.equityCurve])
+        if stamps.tz is not None:
+            stamps = stamps.tz_convert("UTC").tz_localize(None)
+        values = {
+            attribute: np.array([np.nan if p.value is None else p.value for p in getattr(response, curve)], dtype=float)
+            for curve, (attribute, _) in _CURVE_COLUMNS.items()
+        }
+        return cls(timestamp_ns=stamps.as_unit("ns").asi8, **values)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.timestamp_ns, self.equity, self.buy_hold, self.drawdown))
+
+    def values(self) -> dict[str, np.ndarray]:
+        """Full-resolution values keyed by response curve name, as ``build_pyramid`` takes them."""
+
+        return {curve: getattr(self, attribute) for curve, (attribute, _) in _CURVE_COLUMNS.items()}
+
+    def record_batch(self, rows: np.ndarray | None = None) -> pa.RecordBatch:
+        rows = np.arange(len(self.timestamp_ns)) if rows is None else rows
+        return pa.record_batch(
+            [
+                pa.array(self.timestamp_ns[rows].view("datetime64[ns]")),
+                *(pa.array(getattr(self, attribute)[rows]) for attribute, _ in _CURVE_COLUMNS.values()),
+            ],
+            names=["timestamp", *(column for _, column in _CURVE_COLUMNS.values())],
+        )
+
+
+def encode_curves(curves: RunCurves) -> bytes:
+    """Compressed Arrow IPC blob of a run's curves, for ``PortfolioRun.curves_blob``."""
+
+    options = pa.ipc.IpcWriteOptions(compression=CURVE_BLOB_COMPRESSION)
+    batch = curves.record_batch()
+    return b"".join(_ipc_stream(batch.schema, [batch], options))
+
+
+def decode_curves(blob: bytes) -> RunCurves:
+    table = pa.ipc.open_stream(pa.py_buffer(blob)).read_all()
+    return RunCurves(
+        timestamp_ns=table["timestamp"].to_numpy().view(np.int64),
+        **{attribute: table[column].to_numpy() for attribute, column in _CURVE_COLUMNS.values()},
+    )
+
+
+def _ipc_stream(
+    schema: pa.Schema,
+    batches: Iterable[pa.RecordBatch],
+    options: pa.ipc.IpcWriteOptions | None = None,
+) -> Iterator[bytes]:
+    """Arrow IPC stream bytes, yielded per record batch so large results can stream."""
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def encode_run_json(
+    summary: dict,
+    curves: RunCurves,
+    pyramid: CurvePyramid | None = None,
+    points: int | None = None,
+) -> bytes:
+    """Encode a run as ``PortfolioRunResponse`` JSON straight from the curve buffers.
+
+    ``summary`` holds the non-curve response fields as plain JSON values. The bytes
+    match ``PortfolioRunResponse.model_dump_json()`` (``tests/test_columnar.py``
+    checks this), so they can be served and stored without building the model.
+    With ``points``, each curve keeps its own downsampled selection.
+    """
+
+    stamps = np.datetime_as_string(curves.timestamp_ns.view("datetime64[ns]"), unit="s")
+    document: dict = {}
+    for curve, values in curves.values().items():
+        if points and points < len(values):
+            rows = select_points(values, pyramid or {}, curve, points)
+            curve_stamps, values = stamps[rows], values[rows]
+        else:
+            curve_stamps = stamps
+        document[curve] = [
+            {"timestamp": ts, "value": value} for ts, value in zip(curve_stamps.tolist(), values.tolist())
+        ]
+    document.update(summary)
+    return orjson.dumps(document)
+
+
+def encode_run(
+    summary: dict,
+    curves: RunCurves,
+    pyramid: CurvePyramid,
+    points: int | None = None,
+) -> bytes:
+    """Encode a run as an Arrow IPC stream: one row per curve point, KPIs in metadata.
+
+    With ``points``, rows are the union of each curve's downsampled points, so every
+    curve keeps its own shape-preserving selection (at most ``3 * points`` rows).
+    """
+
+    rows = np.arange(len(curves.timestamp_ns))
+    if points and points < len(rows):
+        selections = [
+            select_points(getattr(curves, attribute), pyramid, curve, points)
+            for curve, (attribute, _) in _CURVE_COLUMNS.items()
+        ]
+        rows = np.unique(np.concatenate(selections))
+    metadata = {RUN_METADATA_KEY: orjson.dumps(summary)}
+    batch = curves.record_batch(rows)
+    schema = batch.schema.with_metadata(metadata)
+    return b"".join(_ipc_stream(schema, [batch.replace_schema_metadata(metadata)]))
+
+
+def trade_record_batch(index: BatchIndex, columns: dict[str, np.ndarray]) -> pa.RecordBatch:
+    """Build a ``TRADE_SCHEMA`` batch straight from gathered trade columns."""
+
+    tickers = pa.array([ticker.ticker for ticker in index.tickers], type=pa.string())
+    if len(columns["ticker_pos"]) == 0:
+        return pa.RecordBatch.from_pylist([], schema=TRADE_SCHEMA)
+    return pa.record_batch(
+        [
+            pa.DictionaryArray.from_arrays(columns["ticker_pos"].astype(np.int32), tickers),
+            pa.array(columns["trade_number"]),
+            pa.DictionaryArray.from_arrays(columns["direction"], pa.array(DIRECTION_LABELS.tolist(), type=pa.string())),
+            pa.array(columns["entry_ns"].view("datetime64[ns]")),
+            pa.array(columns["exit_ns"].view("datetime64[ns]")),
+            pa.array(columns["net_pnl"]),
+            pa.array(columns["position_size"]),
+            pa.array(columns["trade_return_pct"] * 100),
+            pa.array(columns["runup"]),
+            pa.array(columns["drawdown"]),
+        ],
+        schema=TRADE_SCHEMA,
+    )
+
+
+def stream_trades(index: BatchIndex, chunks: Iterable[dict[str, np.ndarray]]) -> Iterator[bytes]:
+    """Arrow IPC stream of trade column chunks from ``trade_table.iter_trade_columns``."""
+
+    return _ipc_stream(TRADE_SCHEMA, (trade_record_batch(index, columns) for columns in chunks))
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal, Sequence
+
+import numpy as np
+import orjson
+from sqlalchemy.orm import Session
+
+from ..models import tables
+from .portfolio import _load_batch_index, _user_batch, unit_equity_columns
+
+VariantKind = Literal["full", "leaveOneOut", "subset"]
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class Variant:
+    """One portfolio of the analysis: the whole batch, the batch minus one ticker, or a subset."""
+
+    kind: VariantKind
+    tickers: list[str]  # held; capital is split evenly between them
+    excluded: str | None = None
+
+
+@dataclass
+class VariantKpis:
+    """Run KPIs of every variant, one array entry each."""
+
+    trades: np.ndarray
+    pnl: np.ndarray
+    final_equity: np.ndarray
+    total_return_pct: np.ndarray
+    max_drawdown_abs: np.ndarray
+    max_drawdown_pct: np.ndarray
+    sharpe: np.ndarray
+    sortino: np.ndarray
+
+
+@dataclass
+class ContributionResult:
+    total_capital: float
+    calendar_ns: np.ndarray
+    variants: list[Variant]
+    kpis: VariantKpis
+    drawdown_pct: np.ndarray  # days x variants; NaN before a variant's first trade
+
+
+@dataclass
+class VariantPlan:
+    """Which tickers each variant holds, kept as the cheapest way to sum their columns.
+
+    The full portfolio sums every column and each leave-one-out variant subtracts
+    one column from that total, so all N of them cost O(days x N) together.
+    Only the requested subsets need a matrix product.
+    """
+
+    tickers: list[str]
+    leave_one_out: bool
+    members: np.ndarray  # tickers x subsets, 0/1
+
+    @classmethod
+    def build(cls, tickers: list[str], subsets: Sequence[Sequence[str]], leave_one_out: bool) -> VariantPlan:
+        position = {ticker: i for i, ticker in enumerate(tickers)}
+        members = np.zeros((len(tickers), len(subsets)))
+        for column, subset in enumerate(subsets):
+            unknown = sorted(set(subset) - set(position))
+            if unknown:
+                raise ValueError(f"Subset names tickers not in the batch: {', '.join(unknown)}")
+            if not subset:
+                raise ValueError("Subsets must hold at least one ticker")
+            members[[position[ticker] for ticker in subset], column] = 1.0
+        return cls(tickers=tickers, leave_one_out=leave_one_out and len(tickers) > 1, members=members)
+
+    def variants(self) -> list[Variant]:
+        variants = [Variant("full", list(self.tickers))]
+        if self.leave_one_out:
+            variants.extend(
+                Variant("leaveOneOut", [other for other in self.tickers if other != ticker], excluded=ticker)
+                for ticker in self.tickers
+            )
+        for column in self.members.T:
+            variants.append(Variant("subset", [ticker for ticker, held in zip(self.tickers, column) if held]))
+        return variants
+
+    def sums(self, values: np.ndarray) -> np.ndarray:
+        """Sum ``values`` (last axis = tickers) over each variant's tickers, variants last."""
+
+        total = values.sum(axis=-1, keepdims=True)
+        parts = [total]
+        if self.leave_one_out:
+            parts.append(total - values)
+        if self.members.shape[1]:
+            parts.append(values @ self.members)
+        return np.concatenate(parts, axis=-1)
+
+
+def _moments(returns: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-column count, mean and sample standard deviation of the ``valid`` returns."""
+
+    count = valid.sum(axis=0)
+    mean = np.divide(np.where(valid, returns, 0.0).sum(axis=0), count, out=np.zeros(returns.shape[1]), where=count > 0)
+    spread = (np.where(valid, returns - mean, 0.0) ** 2).sum(axis=0)
+    variance = np.divide(spread, count - 1, out=np.zeros(returns.shape[1]), where=count > 1)
+    return count, mean, np.sqrt(variance)
+
+
+def curve_kpis(equity: np.ndarray) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Return, drawdown and ratio KPIs of every column of a days x variants equity matrix.
+
+    Each column is measured from its first non-zero day, as a run of just those
+    tickers would be, with the same definitions as a run's KPIs and Sharpe and
+    Sortino ratios. Also returns the drawdown curves in percent.
+    """
+
+    days, width = equity.shape
+    started = np.logical_or.accumulate(equity != 0, axis=0)
+    values = np.where(started, equity, np.nan)
+    first = values[started.argmax(axis=0), np.arange(width)]
+    peak = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = equity[-1] / first - 1
+        drawdown = values / peak - 1
+        returns = values[1:] / values[:-1] - 1
+    total_return = np.where((days > 1) & np.isfinite(growth), growth * 100, 0.0)
+
+    valid = np.isfinite(returns)
+    count, mean, std = _moments(returns, valid)
+    down_count, _, down_std = _moments(returns, valid & (returns < 0))
+    scale = math.sqrt(TRADING_DAYS)
+    sharpe = np.divide(mean * scale, std, out=np.zeros(width), where=(count > 1) & (std > 0))
+    sortino = np.divide(mean * scale, down_std, out=np.zeros(width), where=(down_count > 1) & (down_std > 0))
+    kpis = {
+        "final_equity": equity[-1],
+        "total_return_pct": total_return,
+        "max_drawdown_abs": np.fmin.reduce(values - peak, axis=0, initial=0.0),
+        "max_drawdown_pct": np.fmin.reduce(drawdown, axis=0, initial=0.0) * 100,
+        "sharpe": sharpe,
+        "sortino": sortino,
+    }
+    return kpis, drawdown * 100
+
+
+def analyze_contributions(
+    tickers: list[str],
+    unit_equity: np.ndarray,
+    trades: np.ndarray,
+    pnl: np.ndarray,
+    calendar_ns: np.ndarray,
+    total_capital: float,
+    subsets: Sequence[Sequence[str]] = (),
+    leave_one_out: bool = True,
+) -> ContributionResult:
+    """KPIs and drawdowns of the full portfolio, each leave-one-out portfolio and each subset.
+
+    ``unit_equity`` holds each ticker's equity from one unit of capital (days x
+    tickers). Every variant splits ``total_capital`` evenly between its tickers,
+    so its curve is its tickers' column sum times ``total_capital / held``.
+    """
+
+    if not len(calendar_ns):
+        raise ValueError("No trades in the selected window")
+    plan = VariantPlan.build(tickers, subsets, leave_one_out)
+    held = plan.sums(np.ones(len(tickers)))
+    equity = plan.sums(unit_equity) * (total_capital / held)
+    kpis, drawdown_pct = curve_kpis(equity)
+    return ContributionResult(
+        total_capital=total_capital,
+        calendar_ns=calendar_ns,
+        variants=plan.variants(),
+        kpis=VariantKpis(trades=plan.sums(trades).astype(np.int64), pnl=plan.sums(pnl), **kpis),
+        drawdown_pct=drawdown_pct,
+    )
+
+
+def contribution_analysis(
+    db: Session,
+    user: tables.User,
+    batch_id: str,
+    total_capital: float,
+    start: datetime | None,
+    end: datetime | None,
+    subsets: Sequence[Sequence[str]] = (),
+    leave_one_out: bool = True,
+) -> ContributionResult:
+    """Contribution analysis of a batch window from one pass over its cached trade index."""
+
+    index = _load_batch_index(_user_batch(db, user, batch_id))
+    calendar_ns, unit_equity = unit_equity_columns(index, start, end)
+    stats = index.window_stats(start, end, 1.0)
+    return analyze_contributions(
+        [ticker.ticker for ticker in index.tickers],
+        unit_equity,
+        np.array([item.trades for item in stats], dtype=float),
+        np.array([item.pnl for item in stats], dtype=float),
+        calendar_ns.view(np.int64),
+        total_capital,
+        subsets,
+        leave_one_out,
+    )
+
+
+def bucket_drawdowns(
+    calendar_ns: np.ndarray,
+    drawdown_pct: np.ndarray,
+    points: int | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """At most ``points`` rows of every drawdown curve: the deepest value of each run of days.
+
+    Buckets are shared by all variants, so the curves keep one timeline, and each
+    bucket is stamped with its first day. Taking the minimum keeps every trough.
+    """
+
+    days = len(calendar_ns)
+    if not points or points >= days:
+        return calendar_ns, drawdown_pct
+    starts = np.unique(np.linspace(0, days, points, endpoint=False).astype(np.int64))
+    return calendar_ns[starts], np.fmin.reduceat(drawdown_pct, starts, axis=0)
+
+
+def encode_contribution_json(batch_id: str, result: ContributionResult, points: int | None = None) -> bytes:
+    """``ContributionResponse`` JSON, with NaN drawdowns (before a variant starts) as null."""
+
+    calendar_ns, drawdown_pct = bucket_drawdowns(result.calendar_ns, result.drawdown_pct, points)
+    kpis = result.kpis
+    columns = {
+        "trades": kpis.trades.tolist(),
+        "pnl": kpis.pnl.tolist(),
+        "finalEquity": kpis.final_equity.tolist(),
+        "totalReturnPct": kpis.total_return_pct.tolist(),
+        "maxDrawdownAbs": kpis.max_drawdown_abs.tolist(),
+        "maxDrawdownPct": kpis.max_drawdown_pct.tolist(),
+        "sharpe": kpis.sharpe.tolist(),
+        "sortino": kpis.sortino.tolist(),
+    }
+    curves = drawdown_pct.T.tolist()
+    document = {
+        "batchId": batch_id,
+        "totalCapital": result.total_capital,
+        "timestamps": np.datetime_as_string(calendar_ns.view("datetime64[ns]"), unit="s").tolist(),
+        "portfolios": [
+            {
+                "kind": variant.kind,
+                # Leave-one-out variants name the dropped ticker instead of repeating the rest.
+                "tickers": None if variant.kind == "leaveOneOut" else variant.tickers,
+                "excluded": variant.excluded,
+                **{field: values[i] for field, values in columns.items()},
+                "drawdownPct": curves[i],
+            }
+            for i, variant in enumerate(result.variants)
+        ],
+    }
+    # orjson writes NaN and infinities as null.
+    return orjson.dumps(document)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Mapping, Sequence
+
+import numpy as np
+
+# Point budgets precomputed for every run; each level is reduced from the next finer one.
+PYRAMID_LEVELS = (250, 1000, 4000)
+CURVES = ("equityCurve", "buyHoldCurve", "drawdown")
+
+# {level: {curve: indices into the full-resolution curve}}
+CurvePyramid = dict[str, dict[str, list[int]]]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-triangle-three-buckets: indices of ``threshold`` shape-preserving points.
+
+    The first and last points are always kept. Interior points are split into
+    ``threshold - 2`` buckets and each bucket keeps the point forming the largest
+    triangle with the previously kept point and the mean of the next bucket.
+    Non-finite values never win a bucket unless the whole bucket is non-finite.
+    """
+
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(y)
+    x_prefix = np.concatenate(([0.0], np.cumsum(x))).tolist()
+    y_prefix = np.concatenate(([0.0], np.cumsum(np.where(finite, y, 0.0)))).tolist()
+    count_prefix = np.concatenate(([0], np.cumsum(finite))).tolist()
+    edges = ((np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1).tolist()
+    edges[-1] = n - 1
+    edges.append(n)
+    xs, ys, ok = x.tolist(), y.tolist(), finite.tolist()
+
+    # Buckets are a handful of points each, so plain floats beat per-bucket array ops.
+    selected = [0]
+    px, py = xs[0], ys[0] if ok[0] else 0.0
+    for bucket in range(threshold - 2):
+        lo, hi, next_hi = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        finite_next = count_prefix[next_hi] - count_prefix[hi]
+        avg_x = (x_prefix[next_hi] - x_prefix[hi]) / (next_hi - hi)
+        avg_y = (y_prefix[next_hi] - y_prefix[hi]) / finite_next if finite_next else 0.0
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            if ok[i]:
+                area = abs((px - avg_x) * (ys[i] - py) - (px - xs[i]) * (avg_y - py))
+                if area > best_area:
+                    best, best_area = i, area
+        selected.append(best)
+        px, py = xs[best], ys[best] if ok[best] else 0.0
+    selected.append(n - 1)
+    return np.asarray(selected, dtype=np.int64)
+
+
+def build_pyramid(values: Mapping[str, np.ndarray], levels: Sequence[int] = PYRAMID_LEVELS) -> CurvePyramid:
+    """LTTB indices for each level shorter than the curves, coarsest reduced from finer ones.
+
+    ``values`` maps each response curve name to its full-resolution values.
+    """
+
+    pyramid: CurvePyramid = {}
+    for curve in CURVES:
+        y = values[curve]
+        # Curves are evenly spaced business days, so the point position is the x axis.
+        kept = np.arange(len(y))
+        for level in sorted(levels, reverse=True):
+            if level >= len(kept):
+                continue
+            kept = kept[lttb(kept, y[kept], level)]
+            pyramid.setdefault(str(level), {})[curve] = kept.tolist()
+    return pyramid
+
+
+def select_points(values: np.ndarray, pyramid: CurvePyramid, curve: str, points: int) -> np.ndarray:
+    """Indices of at most ``points`` points of ``curve``, whose full values are ``values``.
+
+    Starts from the smallest precomputed level that still has ``points`` points, so
+    only that level (not the full history) is reduced at request time.
+    """
+
+    if points >= len(values):
+        return np.arange(len(values))
+    candidates = [
+        pyramid[level][curve]
+        for level in sorted(pyramid, key=int)
+        if int(level) >= points and curve in pyramid[level]
+    ]
+    base = np.asarray(candidates[0] if candidates else range(len(values)), dtype=np.int64)
+    return base[lttb(base, values[base], points)]
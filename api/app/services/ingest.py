@@ -1,19 +1,32 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import io
+import logging
+import threading
 import uuid
-from datetime import datetime
-from typing import Iterable
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterable
 
+import numpy as np
 import pandas as pd
 from fastapi import UploadFile
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..models import tables
 from ..models.schemas import FileIngestReport
-from .storage import StorageError, storage_service
+from .artifacts import TRADES_ARTIFACT_CONTENT_TYPE, TradesArtifactWriter, trades_artifact_key
+from .pipeline import run_pipeline
+from .storage import ObjectWriter, StorageError, storage_service
+
+logger = logging.getLogger("api.ingest")
 
 REQUIRED_COLUMNS = [
     "Trade #",
@@ -28,6 +41,9 @@ REQUIRED_COLUMNS = [
     "Cumulative P&L",
 ]
 
+# Rows repeating these columns are the same trade leg and counted once.
+DEDUPE_COLUMNS = ["Trade #", "Date/Time", "Signal"]
+
 
 ## Map column aliases to their canonical headers.
 COLUMN_ALIASES: dict[str, str] = {
@@ -110,69 +126,366 @@ def validate_columns(df: pd.DataFrame) -> None:
         raise ValueError(f"Missing required columns: {', '.join(missing)}")
 
 
-def ingest_files(db: Session, user: tables.User, files: Iterable[UploadFile]) -> tuple[tables.Batch, list[FileIngestReport]]:
-    batch_id = str(uuid.uuid4())
-    first_strategy: str | None = None
-    batch = tables.Batch(id=batch_id, user_id=user.id, strategy_name="")
-    db.add(batch)
+def content_object_key(content_sha256: str) -> str:
+    """Storage key of an upload's bytes; identical uploads share it and its artifact."""
+
+    return f"objects/{content_sha256[:2]}/{content_sha256}.csv"
+
+
+def _hash_upload(upload: UploadFile) -> str:
+    """SHA-256 of an upload, read in ``ingest_part_bytes`` blocks and rewound."""
+
+    digest = hashlib.sha256()
+    while block := upload.file.read(settings.ingest_part_bytes):
+        digest.update(block)
+    upload.file.seek(0)
+    return digest.hexdigest()
 
-    reports: list[FileIngestReport] = []
 
+class _TeeReader(io.RawIOBase):
+    """Binary reader over an upload that forwards every byte it reads to ``sink``."""
+
+    def __init__(self, source: BinaryIO, sink: ObjectWriter) -> None:
+        self._source = source
+        self._sink = sink
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._source.read(len(buffer))
+        self._sink.write(data)
+        buffer[: len(data)] = data
+        return len(data)
+
+    def drain(self) -> None:
+        while self.readinto(bytearray(64 * 1024)):
+            pass
+
+
+def _stream_upload(upload: UploadFile, object_key: str) -> tuple[BinaryIO, int]:
+    """Parse ``upload`` chunk by chunk while streaming its bytes to ``object_key``.
+
+    Returns the spooled trades artifact and the number of distinct trade legs.
+    Headers are validated on the first chunk, before any later rows are read. At
+    most one parse chunk and one storage part are held in memory; the trades
+    artifact spools to disk once it outgrows a part. Duplicate rows are counted
+    through 8-byte row hashes, the only per-row state kept for the whole file.
+    """
+
+    writer = storage_service.open_writer(object_key, part_size=settings.ingest_part_bytes)
+    reader = _TeeReader(upload.file, writer)
+    artifact = TradesArtifactWriter(max_memory=settings.ingest_part_bytes)
+    row_hashes: list[np.ndarray] = []
     try:
-        storage_service.ensure_bucket()
-    except StorageError as exc:
-        raise ValueError(str(exc)) from exc
+        for position, chunk in enumerate(pd.read_csv(reader, chunksize=settings.ingest_chunk_rows)):
+            chunk = normalize_columns(chunk)
+            if position == 0:
+                validate_columns(chunk)
+            artifact.add(chunk)
+            row_hashes.append(pd.util.hash_pandas_object(chunk[DEDUPE_COLUMNS], index=False).to_numpy())
+        reader.drain()
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return artifact.finish(), len(np.unique(np.concatenate(row_hashes)))
+
+
+@dataclass
+class _PendingFile:
+    upload: UploadFile
+    strategy: str
+    ticker: str
+    export_date: datetime
+    content_sha256: str = ""
+
+    @property
+    def object_key(self) -> str:
+        return content_object_key(self.content_sha256)
+
+    @property
+    def artifact_key(self) -> str:
+        return trades_artifact_key(self.object_key)
+
+
+def _pin_stored(db: Session, counts: Counter[str]) -> dict[str, tables.StoredObject]:
+    """Take this batch's references on content that is already stored.
+
+    Each conditional increment locks its row until the transaction ends, so a
+    concurrent ``delete_batch`` either sees the new references or has already
+    released the row. Released content (``ref_count`` at zero, or gone) is not
+    pinned and gets stored afresh.
+    """
+
+    stored_object = tables.StoredObject
+    pinned = [
+        content_sha256
+        for content_sha256, count in counts.items()
+        if db.execute(
+            update(stored_object)
+            .where(stored_object.content_sha256 == content_sha256, stored_object.ref_count > 0)
+            .values(ref_count=stored_object.ref_count + count)
+        ).rowcount
+    ]
+    return {stored.content_sha256: stored for stored in db.query(stored_object).filter(stored_object.content_sha256.in_(pinned))}
+
+
+def is_referenced(db: Session, key: str) -> bool:
+    """Whether a content-addressed storage key belongs to a stored object again."""
+
+    content_sha256 = key.rsplit("/", 1)[-1].split(".", 1)[0]
+    return db.get(tables.StoredObject, content_sha256) is not None
+
+
+def _add_references(db: Session, objects: dict[str, tables.StoredObject], counts: Counter[str]) -> None:
+    """Insert or bump the ``StoredObject`` rows of a batch's uploads in one statement.
+
+    The upsert keeps concurrent ingests of the same new content from colliding on
+    the primary key; whichever inserts first wins and the other adds its count.
+    """
+
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    rows = [
+        {
+            "content_sha256": sha,
+            "object_key": objects[sha].object_key,
+            "artifact_key": objects[sha].artifact_key,
+            "size_bytes": objects[sha].size_bytes,
+            "rows_parsed": objects[sha].rows_parsed,
+            "ref_count": count,
+        }
+        for sha, count in counts.items()
+    ]
+    statement = insert(tables.StoredObject).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[tables.StoredObject.content_sha256],
+        set_={"ref_count": tables.StoredObject.ref_count + statement.excluded.ref_count},
+    )
+    db.execute(statement)
+
+
+def _release(db: Session, keys: list[str]) -> None:
+    """Queue storage keys for deletion by :func:`sweep_released`."""
+
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    statement = insert(tables.PendingDelete).values([{"object_key": key, "released_at": now} for key in dict.fromkeys(keys)])
+    db.execute(statement.on_conflict_do_update(index_elements=[tables.PendingDelete.object_key], set_={"released_at": now}))
+
+
+def _claim_released(db: Session, keys: list[str]) -> None:
+    """Take back keys waiting for deletion before they are written again.
+
+    Deleting the rows locks them until the ingest commits, and a sweep holds the
+    rows it is deleting until its objects are gone, so whichever runs second
+    sees the other's outcome and no freshly written object is swept.
+    """
 
+    db.execute(delete(tables.PendingDelete).where(tables.PendingDelete.object_key.in_(keys)))
+
+
+def sweep_released(db: Session, grace_seconds: float) -> list[str]:
+    """Delete objects released more than ``grace_seconds`` ago; returns the deleted keys.
+
+    Their rows stay locked until the caller commits. Keys that fail to delete are
+    kept for the next sweep.
+    """
+
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    due = db.scalars(
+        select(tables.PendingDelete.object_key)
+        .where(tables.PendingDelete.released_at <= cutoff)
+        .with_for_update(skip_locked=True)
+    ).all()
+    swept: list[str] = []
+    for key in due:
+        try:
+            storage_service.delete_object(key)
+        except StorageError:
+            logger.warning("ingest.sweep_failed", extra={"props": {"key": key}})
+            continue
+        swept.append(key)
+    if swept:
+        db.execute(delete(tables.PendingDelete).where(tables.PendingDelete.object_key.in_(swept)))
+    return swept
+
+
+def ingest_files(db: Session, user: tables.User, files: Iterable[UploadFile]) -> tuple[tables.Batch, list[FileIngestReport]]:
+    """Validate and store a batch of uploads; reports come back in upload order.
+
+    Filenames are checked up front and every upload is hashed. Content that is
+    already stored (by any batch or user) is referenced instead of written or
+    parsed again. New content is parsed and streamed to storage on
+    ``ingest_workers`` threads with at most ``ingest_max_in_flight`` in progress,
+    and the batch's records are inserted together. If any file fails, objects
+    written for the batch are deleted and nothing is added to the session.
+    """
+
+    batch_id = str(uuid.uuid4())
+    pending: list[_PendingFile] = []
     for upload in files:
-        file_bytes = upload.file.read()
-        buffer = io.BytesIO(file_bytes)
-        df = pd.read_csv(buffer)
-        df = normalize_columns(df)
-        validate_columns(df)
         strategy, ticker, export_date = parse_filename(upload.filename)
-        if first_strategy is None:
-            first_strategy = strategy
-            batch.strategy_name = strategy
-        elif strategy != first_strategy:
+        if pending and strategy != pending[0].strategy:
             raise ValueError("All files in a batch must belong to the same strategy")
+        pending.append(_PendingFile(upload, strategy, ticker, export_date))
+
+    hashes, _ = run_pipeline(
+        [item.upload for item in pending],
+        _hash_upload,
+        lambda upload, digest: digest,
+        io_workers=settings.ingest_workers,
+        max_in_flight=settings.ingest_max_in_flight,
+    )
+    for item, digest in zip(pending, hashes):
+        item.content_sha256 = digest
+
+    objects = _pin_stored(db, Counter(hashes))
+    pinned = set(objects)
+    # One upload per new content hash is parsed and stored; repeats reuse its result.
+    fresh = list({item.content_sha256: item for item in reversed(pending) if item.content_sha256 not in objects}.values())[::-1]
 
-        df = df.drop_duplicates(subset=["Trade #", "Date/Time", "Signal"])  # dedupe duplicates
-        rows_parsed = len(df)
-        rows_skipped = 0
-        warnings: list[str] = []
+    if fresh:
+        _claim_released(db, [key for item in fresh for key in (item.object_key, item.artifact_key)])
+        try:
+            storage_service.ensure_bucket()
+        except StorageError as exc:
+            raise ValueError(str(exc)) from exc
+
+    written: list[str] = []
+    written_lock = threading.Lock()
+
+    def parse(item: _PendingFile) -> tuple[BinaryIO, int]:
+        try:
+            parsed = _stream_upload(item.upload, item.object_key)
+        except StorageError as exc:
+            raise ValueError(str(exc)) from exc
+        with written_lock:
+            written.append(item.object_key)
+        return parsed
 
-        object_key = f"{batch_id}/{uuid.uuid4()}-{upload.filename}"
+    def store_artifact(item: _PendingFile, parsed: tuple[BinaryIO, int]) -> tables.StoredObject:
+        artifact, rows_parsed = parsed
         try:
-            storage_service.put_object(object_key, io.BytesIO(file_bytes))
+            with artifact:
+                storage_service.put_object(item.artifact_key, artifact, content_type=TRADES_ARTIFACT_CONTENT_TYPE)
         except StorageError as exc:
             raise ValueError(str(exc)) from exc
+        with written_lock:
+            written.append(item.artifact_key)
+        item.upload.file.seek(0, io.SEEK_END)
+        return tables.StoredObject(
+            content_sha256=item.content_sha256,
+            object_key=item.object_key,
+            artifact_key=item.artifact_key,
+            size_bytes=item.upload.file.tell(),
+            rows_parsed=rows_parsed,
+        )
+
+    try:
+        stored, timings = run_pipeline(
+            fresh,
+            parse,
+            store_artifact,
+            io_workers=settings.ingest_workers,
+            max_in_flight=settings.ingest_max_in_flight,
+        )
+    except BaseException:
+        for key in written:
+            # Content-addressed keys may have been stored meanwhile by a concurrent
+            # ingest of the same bytes; leave those in place.
+            if is_referenced(db, key):
+                continue
+            try:
+                storage_service.delete_object(key)
+            except StorageError:
+                logger.warning("ingest.cleanup_failed", extra={"props": {"batch_id": batch_id, "key": key}})
+        raise
+    objects.update((row.content_sha256, row) for row in stored)
+    logger.info(
+        "ingest.stored",
+        extra={"props": {"batch_id": batch_id, "reused": len(pending) - len(fresh), **timings.as_dict()}},
+    )
 
+    batch = tables.Batch(id=batch_id, user_id=user.id, strategy_name=pending[0].strategy if pending else "")
+    records: list[tables.UploadFileRecord] = []
+    reports: list[FileIngestReport] = []
+    for item in pending:
+        stored_object = objects[item.content_sha256]
         record = tables.UploadFileRecord(
             id=str(uuid.uuid4()),
             batch_id=batch_id,
-            ticker=ticker,
-            strategy=strategy,
-            export_date=export_date.date(),
-            filename=upload.filename,
-            object_key=object_key,
-            rows_parsed=rows_parsed,
-            rows_skipped=rows_skipped,
-            warnings=warnings,
+            ticker=item.ticker,
+            strategy=item.strategy,
+            export_date=item.export_date.date(),
+            filename=item.upload.filename,
+            object_key=stored_object.object_key,
+            artifact_key=stored_object.artifact_key,
+            content_sha256=item.content_sha256,
+            rows_parsed=stored_object.rows_parsed,
+            rows_skipped=0,
+            warnings=[],
         )
-        db.add(record)
-
+        records.append(record)
         reports.append(
             FileIngestReport(
                 file_id=record.id,
-                ticker=ticker,
-                strategy=strategy,
+                ticker=record.ticker,
+                strategy=record.strategy,
                 export_date=record.export_date,
-                rows_parsed=rows_parsed,
-                rows_skipped=rows_skipped,
-                warnings=warnings,
+                rows_parsed=record.rows_parsed,
+                rows_skipped=record.rows_skipped,
+                warnings=record.warnings,
             )
         )
 
+    db.add(batch)
+    # Records share one mapper and carry their own keys, so the flush sends them
+    # as a single multi-row INSERT.
+    db.add_all(records)
+    new_references = Counter(item.content_sha256 for item in pending if item.content_sha256 not in pinned)
+    if new_references:
+        _add_references(db, objects, new_references)
     db.flush()
 
     return batch, reports
+
+
+def delete_batch(db: Session, user: tables.User, batch_id: str) -> list[str]:
+    """Delete a batch and drop its references to stored uploads.
+
+    Storage keys no batch references any more are queued for
+    :func:`sweep_released` and returned; nothing is deleted from storage here.
+    The decrements lock the rows, and only rows still unreferenced when they are
+    deleted are released, so content pinned by a concurrent ingest is kept.
+    Uploads from before content addressing own their keys outright.
+    """
+
+    batch: tables.Batch | None = db.get(tables.Batch, batch_id)
+    if batch is None or batch.user_id != user.id:
+        raise LookupError("Batch not found")
+
+    released: list[str] = []
+    counts = Counter(record.content_sha256 for record in batch.files if record.content_sha256)
+    for record in batch.files:
+        if not record.content_sha256:
+            released.extend(key for key in (record.object_key, record.artifact_key) if key)
+    for content_sha256, count in counts.items():
+        db.execute(
+            update(tables.StoredObject)
+            .where(tables.StoredObject.content_sha256 == content_sha256)
+            .values(ref_count=tables.StoredObject.ref_count - count)
+        )
+    if counts:
+        orphaned = db.execute(
+            delete(tables.StoredObject)
+            .where(tables.StoredObject.content_sha256.in_(counts), tables.StoredObject.ref_count <= 0)
+            .returning(tables.StoredObject.object_key, tables.StoredObject.artifact_key)
+        )
+        for object_key, artifact_key in orphaned:
+            released.extend([object_key, artifact_key])
+    if released:
+        _release(db, released)
+    db.delete(batch)
+    db.flush()
+    return released
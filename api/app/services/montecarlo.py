@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import secrets
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models import tables
+from .pipeline import get_process_pool
+from .portfolio import load_trade_index
+from .trade_index import BatchIndex
+
+ResampleMethod = Literal["bootstrap", "shuffle"]
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# 8-byte arrays alive per path and trade while a chunk is simulated: equity, its
+# running peak, drawdown ratios, peak times and their running max, time underwater.
+_ARRAYS_PER_CELL = 6
+
+
+@dataclass
+class TradeSchedule:
+    """Every ticker's trade returns in a window, placed on the portfolio's exit timeline.
+
+    ``slots[i]`` holds the positions (in global exit order) of ticker ``i``'s
+    trades. Resampling reorders or redraws a ticker's returns but keeps its
+    slots, so each path trades at the same moments as the real run.
+    """
+
+    returns: list[np.ndarray]
+    slots: list[np.ndarray]
+    times_ns: np.ndarray  # start of the window, then every exit in order
+    per_ticker_capital: float
+    total_capital: float
+
+    @classmethod
+    def from_index(
+        cls,
+        index: BatchIndex,
+        start: datetime | None,
+        end: datetime | None,
+        total_capital: float,
+    ) -> TradeSchedule:
+        returns: list[np.ndarray] = []
+        exits: list[np.ndarray] = []
+        first_entry = np.iinfo(np.int64).max
+        for ticker in index.tickers:
+            lo, hi = ticker.bounds(start, end)
+            if hi > lo:
+                returns.append(ticker.columns["trade_return_pct"][lo:hi].astype(float))
+                exits.append(ticker.exit_ns[lo:hi])
+                first_entry = min(first_entry, int(ticker.columns["entry_ns"][lo:hi].min()))
+        if not returns:
+            raise ValueError("No trades in the selected window")
+
+        order = np.argsort(np.concatenate(exits), kind="stable")
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        offsets = np.cumsum([0] + [len(r) for r in returns])
+        return cls(
+            returns=returns,
+            slots=[position[offsets[i] : offsets[i + 1]] for i in range(len(returns))],
+            times_ns=np.concatenate(([first_entry], np.concatenate(exits)[order])),
+            per_ticker_capital=total_capital / len(index.tickers),
+            total_capital=total_capital,
+        )
+
+    @property
+    def trade_count(self) -> int:
+        return len(self.times_ns) - 1
+
+
+@dataclass
+class PathMetrics:
+    final_equity: np.ndarray
+    max_drawdown_pct: np.ndarray
+    recovery_days: np.ndarray
+
+    @classmethod
+    def concat(cls, parts: list[PathMetrics]) -> PathMetrics:
+        return cls(
+            final_equity=np.concatenate([part.final_equity for part in parts]),
+            max_drawdown_pct=np.concatenate([part.max_drawdown_pct for part in parts]),
+            recovery_days=np.concatenate([part.recovery_days for part in parts]),
+        )
+
+
+@dataclass
+class MonteCarloResult:
+    paths: int
+    trades: int
+    method: ResampleMethod
+    seed: int
+    total_capital: float
+    metrics: PathMetrics
+
+    def percentiles(self, values: np.ndarray) -> dict[str, float]:
+        return {f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+    @property
+    def probability_of_loss(self) -> float:
+        return float(np.mean(self.metrics.final_equity < self.total_capital))
+
+
+def _resample(rng: np.random.Generator, returns: np.ndarray, paths: int, method: ResampleMethod) -> np.ndarray:
+    """A ``trades x paths`` array of the ticker's returns, redrawn or reordered per path."""
+
+    if method == "bootstrap":
+        return returns[rng.integers(0, len(returns), size=(len(returns), paths))]
+    return rng.permuted(np.broadcast_to(returns[:, None], (len(returns), paths)), axis=0)
+
+
+def simulate_chunk(
+    schedule: TradeSchedule,
+    method: ResampleMethod,
+    paths: int,
+    seed: np.random.SeedSequence,
+) -> PathMetrics:
+    """Simulate ``paths`` resampled equity paths as one ``trades x paths`` array.
+
+    Each ticker compounds its own capital, so a trade's P&L is the ticker's
+    equity before the trade times its return; the portfolio curve is the total
+    capital plus the running sum of P&L over the exit timeline. Trades run down
+    the rows so placing a ticker's trades on the timeline copies whole rows.
+    """
+
+    rng = np.random.default_rng(seed)
+    n = schedule.trade_count
+    equity = np.empty((n + 1, paths))
+    equity[0] = schedule.total_capital
+    for returns, slots in zip(schedule.returns, schedule.slots):
+        sampled = _resample(rng, returns, paths, method)
+        before = np.empty_like(sampled)
+        before[0] = schedule.per_ticker_capital
+        np.cumprod(1 + sampled[:-1], axis=0, out=before[1:])
+        before[1:] *= schedule.per_ticker_capital
+        equity[slots + 1] = before * sampled
+    np.cumsum(equity, axis=0, out=equity)
+
+    peak = np.maximum.accumulate(equity, axis=0)
+    # The peak starts at the (positive) total capital, so it never divides by zero.
+    max_drawdown = (equity / peak).min(axis=0) - 1
+    # Exit times are sorted, so the running max of the times at which the path sat
+    # on a peak is the time of its latest peak; the time since then is underwater.
+    times = schedule.times_ns[:, None]
+    last_peak_ns = np.maximum.accumulate(np.where(equity >= peak, times, times[0]), axis=0)
+    underwater_ns = times - last_peak_ns
+    return PathMetrics(
+        final_equity=equity[-1].copy(),
+        max_drawdown_pct=max_drawdown * 100,
+        recovery_days=underwater_ns.max(axis=0) / 86_400e9,
+    )
+
+
+def _chunk_sizes(paths: int, trades: int, chunk_bytes: int) -> list[int]:
+    per_chunk = max(1, chunk_bytes // (_ARRAYS_PER_CELL * 8 * (trades + 1)))
+    sizes = [per_chunk] * (paths // per_chunk)
+    if paths % per_chunk:
+        sizes.append(paths % per_chunk)
+    return sizes
+
+
+def run_monte_carlo(
+    schedule: TradeSchedule,
+    method: ResampleMethod,
+    paths: int,
+    seed: int | None = None,
+    executor: Executor | None = None,
+    chunk_bytes: int | None = None,
+) -> MonteCarloResult:
+    """Resample the schedule's trades into ``paths`` equity paths, chunk by chunk.
+
+    Every chunk draws from its own child of ``SeedSequence(seed)``, so a seed
+    gives the same result whether chunks run inline or across ``executor``.
+    """
+
+    if paths > settings.montecarlo_max_paths:
+        raise ValueError(f"At most {settings.montecarlo_max_paths} paths per request")
+    seed = secrets.randbits(63) if seed is None else seed
+    sizes = _chunk_sizes(paths, schedule.trade_count, chunk_bytes or settings.montecarlo_chunk_bytes)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if executor is None:
+        parts = [simulate_chunk(schedule, method, size, child) for size, child in zip(sizes, seeds)]
+    else:
+        futures = [executor.submit(simulate_chunk, schedule, method, size, child) for size, child in zip(sizes, seeds)]
+        parts = [future.result() for future in futures]
+    return MonteCarloResult(
+        paths=paths,
+        trades=schedule.trade_count,
+        method=method,
+        seed=seed,
+        total_capital=schedule.total_capital,
+        metrics=PathMetrics.concat(parts),
+    )
+
+
+def monte_carlo(
+    db: Session,
+    user: tables.User,
+    batch_id: str,
+    total_capital: float,
+    date_start: datetime | None,
+    date_end: datetime | None,
+    method: ResampleMethod,
+    paths: int,
+    seed: int | None,
+) -> MonteCarloResult:
+    """Distribution of outcomes from resampling the batch's trades in a window.
+
+    Uses the batch's cached trade index and fans chunks out to the shared
+    process pool when one is configured.
+    """
+
+    schedule = TradeSchedule.from_index(load_trade_index(db, user, batch_id), date_start, date_end, total_capital)
+    return run_monte_carlo(schedule, method, paths, seed, executor=get_process_pool())
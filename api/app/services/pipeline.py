@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Sequence, TypeVar
+
+from ..core.config import settings
+
+ItemT = TypeVar("ItemT")
+PayloadT = TypeVar("PayloadT")
+ResultT = TypeVar("ResultT")
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+
+
+@dataclass
+class StageTimings:
+    """Per-item wall time of each pipeline stage, in item order."""
+
+    fetch_seconds: list[float] = field(default_factory=list)
+    process_seconds: list[float] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {
+            "files": len(self.fetch_seconds),
+            "fetch_total_ms": round(sum(self.fetch_seconds) * 1000, 2),
+            "fetch_max_ms": round(max(self.fetch_seconds, default=0.0) * 1000, 2),
+            "process_total_ms": round(sum(self.process_seconds) * 1000, 2),
+            "process_max_ms": round(max(self.process_seconds, default=0.0) * 1000, 2),
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+        }
+
+
+def _initialize_worker() -> None:
+    # Pay the heavy imports once per worker instead of on the first request it serves.
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401
+
+    from . import portfolio  # noqa: F401
+
+
+def _noop() -> None:
+    return None
+
+
+def get_process_pool() -> ProcessPoolExecutor | None:
+    """Return the shared process pool for CPU-bound stages, or ``None`` if disabled."""
+
+    global _process_pool
+    if settings.portfolio_cpu_workers <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.portfolio_cpu_workers,
+                initializer=_initialize_worker,
+            )
+        return _process_pool
+
+
+def warm_process_pool() -> None:
+    """Start every worker of the shared process pool ahead of the first run."""
+
+    pool = get_process_pool()
+    if pool is None:
+        return
+    for future in [pool.submit(_noop) for _ in range(settings.portfolio_cpu_workers)]:
+        future.result()
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+def run_pipeline(
+    items: Sequence[ItemT],
+    fetch: Callable[[ItemT], PayloadT],
+    process: Callable[[ItemT, PayloadT], ResultT],
+    *,
+    io_workers: int | None = None,
+    max_in_flight: int | None = None,
+    cpu_executor: Executor | None = None,
+) -> tuple[list[ResultT], StageTimings]:
+    """Fetch and process ``items`` concurrently, returning results in input order.
+
+    ``fetch`` runs on a thread pool since it is dominated by object-storage round
+    trips. ``process`` runs on ``cpu_executor`` when one is given (it must then be
+    picklable for a process pool) and inline on the fetching thread otherwise. At
+    most ``max_in_flight`` items are held between the start of their fetch and the
+    end of their processing, which bounds the payload bytes kept in memory.
+    """
+
+    io_workers = io_workers or settings.portfolio_io_workers
+    max_in_flight = max_in_flight or settings.portfolio_max_in_flight
+
+    count = len(items)
+    results: list[ResultT | None] = [None] * count
+    timings = StageTimings(fetch_seconds=[0.0] * count, process_seconds=[0.0] * count)
+    slots = threading.BoundedSemaphore(max(1, max_in_flight))
+    failed = threading.Event()
+
+    def run_one(index: int) -> None:
+        try:
+            item = items[index]
+            started = time.perf_counter()
+            payload = fetch(item)
+            fetched = time.perf_counter()
+            if cpu_executor is not None:
+                results[index] = cpu_executor.submit(process, item, payload).result()
+            else:
+                results[index] = process(item, payload)
+            timings.fetch_seconds[index] = fetched - started
+            timings.process_seconds[index] = time.perf_counter() - fetched
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    futures: list[Future[None]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(io_workers, count or 1))) as pool:
+        for index in range(count):
+            slots.acquire()
+            if failed.is_set():
+                slots.release()
+                break
+            futures.append(pool.submit(run_one, index))
+        for future in futures:
+            future.result()
+    timings.wall_seconds = time.perf_counter() - start
+    return results, timings  # type: ignore[return-value]
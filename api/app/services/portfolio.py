@@ -1,134 +1,238 @@
 from __future__ import annotations
 
+import base64
+import hashlib
 import io
 import json
+import logging
 import math
-import statistics
+import threading
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import cached_property, partial
 from typing import Iterable, Sequence
 
 import numpy as np
+import orjson
 import pandas as pd
-from dateutil import parser
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..models import tables
 from ..models.schemas import PortfolioRunRequest, PortfolioRunResponse
-from .storage import storage_service
+from .artifacts import decode_trades_frame
+from .cache import ByteBudgetLRU
 from .ingest import normalize_columns
+from .pipeline import get_process_pool, run_pipeline
+from .simulator import EventSchedule, simulate_shared_capital
+from .storage import StorageError, storage_service
+from .trade_index import BatchIndex, TickerIndex, WindowStats
+from .columnar import RunCurves, decode_curves, encode_curves, encode_run_json
+from .downsample import CURVES, CurvePyramid, build_pyramid
+from .trade_table import TradeQuery
+from .trades import (
+    NormalizedTrade,
+    TradeFrame,
+    TradeStats,
+    extract_trade_columns,
+    trade_stats,
+    trades_from_columns,
+)
+
+logger = logging.getLogger("api.portfolio")
+
+# Bump when the response shape changes so persisted runs of the old shape aren't served.
+RESULT_SCHEMA_VERSION = 3
+# Response fields stored in ``PortfolioRun.metrics``; the curves go to ``curves_blob``.
+_SUMMARY_FIELDS = tuple(field for field in PortfolioRunResponse.model_fields if field not in CURVES)
+# In-process tier of the run result cache; persisted PortfolioRun rows are the second tier.
+result_cache: ByteBudgetLRU[str, CachedRun] = ByteBudgetLRU(settings.portfolio_result_cache_bytes)
+_persisted_hits = 0
+_persisted_hits_lock = threading.Lock()
+# Parsed, prefix-summed trades per batch; date-range changes only re-slice these.
+index_cache: ByteBudgetLRU[str, BatchIndex] = ByteBudgetLRU(settings.portfolio_index_cache_bytes)
 
 
 @dataclass
-class NormalizedTrade:
-    ticker: str
-    trade_number: int
-    entry_time: datetime
-    exit_time: datetime
-    net_pnl: float
-    position_size: float
-    trade_return_pct: float
-    runup: float
-    drawdown: float
-    direction: str
+class CachedRun:
+    """A computed run: its JSON summary, NumPy curves, curve pyramid and response bytes.
+
+    ``body`` is the full-resolution ``PortfolioRunResponse`` JSON, encoded once and
+    served as-is; the pydantic model is only built for in-process callers.
+    """
+
+    summary: dict
+    curves: RunCurves
+    pyramid: CurvePyramid
+    body: bytes
+
+    @classmethod
+    def build(cls, summary: dict, curves: RunCurves, pyramid: CurvePyramid) -> CachedRun:
+        return cls(summary, curves, pyramid, encode_run_json(summary, curves))
+
+    @cached_property
+    def response(self) -> PortfolioRunResponse:
+        return PortfolioRunResponse.model_validate_json(self.body)
+
+    def json(self, points: int | None = None) -> bytes:
+        """Response bytes, with each curve reduced to at most ``points`` points."""
 
-    @property
-    def duration_days(self) -> float:
-        return max((self.exit_time - self.entry_time).total_seconds() / 86_400, 1e-9)
+        if not points or points >= len(self.curves.timestamp_ns):
+            return self.body
+        return encode_run_json(self.summary, self.curves, self.pyramid, points)
 
 
 @dataclass
 class EquitySeries:
     ticker: str
     equity: pd.Series
-    trades: list[NormalizedTrade]
+    trades: TradeFrame
 
 
-def _read_csv(key: str) -> pd.DataFrame:
-    raw = storage_service.get_object(key)
+@dataclass(frozen=True)
+class TradeSource:
+    ticker: str
+    object_key: str
+    artifact_key: str | None = None
+
+    @classmethod
+    def from_record(cls, record: tables.UploadFileRecord) -> TradeSource:
+        return cls(ticker=record.ticker, object_key=record.object_key, artifact_key=record.artifact_key)
+
+
+def _parse_csv(raw: bytes) -> pd.DataFrame:
     df = pd.read_csv(io.BytesIO(raw))
     return normalize_columns(df)
 
 
+def _fetch_payload(source: TradeSource, zero_copy: bool = False) -> tuple[bytes, bool]:
+    """Fetch a source's trades, preferring the columnar artifact written at ingest.
+
+    Returns the raw payload and whether it is an Arrow artifact (``False`` for CSV).
+    With ``zero_copy`` the payload may be a map of the locally cached object, which
+    only works when it is parsed in this process (maps cannot be pickled).
+    """
+
+    get = storage_service.get_buffer if zero_copy else storage_service.get_object
+    if source.artifact_key:
+        try:
+            return get(source.artifact_key), True
+        except StorageError:
+            pass
+    return get(source.object_key), False
+
+
 def _extract_trades(ticker: str, df: pd.DataFrame) -> list[NormalizedTrade]:
-    trades: list[NormalizedTrade] = []
-    grouped = df.groupby("Trade #")
-    for trade_number, group in grouped:
-        group_sorted = group.sort_values("Date/Time")
-        entry_row = group_sorted.iloc[0]
-        exit_row = group_sorted.iloc[-1]
-        entry_time = parser.parse(str(entry_row["Date/Time"]))
-        exit_time = parser.parse(str(exit_row["Date/Time"]))
-        position_candidates = group_sorted.get("Position size")
-        position_size = float(position_candidates.replace(0, np.nan).dropna().iloc[0]) if not position_candidates.replace(0, np.nan).dropna().empty else 0.0
-        net_pnl = float(exit_row["Net P&L"])
-        runup = float(exit_row.get("Run-up", 0))
-        drawdown = float(exit_row.get("Drawdown", 0))
-        direction = str(exit_row.get("Type (Long/Short)", "Long"))
-
-        trade_return_pct: float
-        if position_size and abs(position_size) > 1e-9:
-            trade_return_pct = net_pnl / position_size
-        else:
-            magnitude = max(abs(runup), abs(drawdown), 1e-6)
-            estimated_position = abs(net_pnl) / magnitude
-            position_size = estimated_position
-            trade_return_pct = net_pnl / position_size if position_size else 0.0
-
-        trades.append(
-            NormalizedTrade(
-                ticker=ticker,
-                trade_number=int(trade_number),
-                entry_time=entry_time,
-                exit_time=exit_time,
-                net_pnl=net_pnl,
-                position_size=position_size,
-                trade_return_pct=trade_return_pct,
-                runup=runup,
-                drawdown=drawdown,
-                direction=direction,
-            )
-        )
-    trades.sort(key=lambda t: t.exit_time)
-    return trades
+    return trades_from_columns(ticker, extract_trade_columns(df))
 
 
-def _build_equity_series(trades: Sequence[NormalizedTrade], initial_capital: float) -> pd.Series:
-    if not trades:
-        return pd.Series(dtype=float)
+def _business_day_labels(stamps: np.ndarray) -> np.ndarray:
+    """Business-day bin label of each timestamp: its date, rolled back off weekends.
 
-    equity_points: list[tuple[datetime, float]] = []
-    capital = initial_capital
-    for trade in trades:
-        capital *= 1 + trade.trade_return_pct
-        equity_points.append((trade.exit_time, capital))
+    Matches the labels ``Series.resample("B")`` assigns.
+    """
 
-    data = pd.Series({ts: val for ts, val in equity_points}).sort_index()
-    start = trades[0].entry_time
-    if start not in data.index:
-        data.loc[start] = initial_capital
-    data = data.sort_index()
-    return data
+    days = stamps.astype("datetime64[D]")
+    weekday = (days.view(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    return days - np.where(weekday >= 5, weekday - 4, 0).astype("timedelta64[D]")
 
 
-def _align_daily(equity_series: Sequence[EquitySeries]) -> pd.Series:
-    if not equity_series:
-        return pd.Series(dtype=float)
-    frames = []
+def _union_calendar(ranges: list[tuple[np.datetime64, np.datetime64]]) -> np.ndarray:
+    """Business days covered by any of the inclusive ``(first, last)`` label ranges."""
+
+    merged: list[list[np.datetime64]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + np.timedelta64(1, "D"):
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    days = np.concatenate([np.arange(first, last + np.timedelta64(1, "D"), dtype="datetime64[D]") for first, last in merged])
+    return days[(days.view(np.int64) + 3) % 7 < 5]
+
+
+def _equity_steps(
+    equity_series: Sequence[EquitySeries],
+) -> tuple[list[tuple[np.ndarray, np.ndarray] | None], np.ndarray]:
+    """Each series' calendar-visible equity changes and the shared business-day calendar.
+
+    Steps are ``None`` for empty series. Values stamped after the last label's
+    midnight never reach the calendar, so they are dropped here.
+    """
+
+    steps: list[tuple[np.ndarray, np.ndarray] | None] = []
+    ranges: list[tuple[np.datetime64, np.datetime64]] = []
     for series in equity_series:
-        s = series.equity.copy()
-        if s.empty:
+        if series.equity.empty:
+            steps.append(None)
             continue
-        s.index = pd.to_datetime(s.index)
-        s = s.resample("B").ffill()
-        frames.append(s.rename(series.ticker))
-    if not frames:
+        stamps = pd.DatetimeIndex(series.equity.index).to_numpy(dtype="datetime64[ns]")
+        labels = _business_day_labels(stamps[[0, -1]])
+        visible = stamps <= labels[1].astype("datetime64[ns]")
+        steps.append((stamps[visible], series.equity.to_numpy(dtype=float)[visible]))
+        ranges.append((labels[0], labels[1]))
+    if not ranges:
+        return steps, np.empty(0, dtype="datetime64[ns]")
+    return steps, _union_calendar(ranges).astype("datetime64[ns]")
+
+
+def _align_daily(equity_series: Sequence[EquitySeries]) -> pd.Series:
+    """Sum every ticker's equity on a shared business-day calendar.
+
+    Each ticker contributes, on every business day from its first label on, its
+    last equity value at or before that day (zero before it starts, held flat
+    after it ends). Rather than resampling each ticker and summing a wide frame,
+    every equity change is placed on the calendar with ``searchsorted`` and the
+    per-day increments of all tickers are accumulated into a single array, so
+    memory is O(days + trades) instead of O(days x tickers).
+    """
+
+    steps, calendar_ns = _equity_steps(equity_series)
+    if not len(calendar_ns):
         return pd.Series(dtype=float)
-    combined = pd.concat(frames, axis=1).ffill()
-    portfolio = combined.sum(axis=1)
-    return portfolio
+
+    positions: list[np.ndarray] = []
+    increments: list[np.ndarray] = []
+    for step in steps:
+        if step is not None:
+            stamps, values = step
+            positions.append(np.searchsorted(calendar_ns, stamps, side="left"))
+            increments.append(np.diff(values, prepend=0.0))
+
+    daily = np.bincount(np.concatenate(positions), weights=np.concatenate(increments), minlength=len(calendar_ns))
+    return pd.Series(np.cumsum(daily[: len(calendar_ns)]), index=pd.DatetimeIndex(calendar_ns))
+
+
+def align_daily_columns(equity_series: Sequence[EquitySeries]) -> tuple[np.ndarray, np.ndarray]:
+    """Every series' equity on the shared business-day calendar, one column each.
+
+    Uses the same calendar and day rule as ``_align_daily``, so the columns sum to
+    its curve. Returns the calendar (``datetime64[ns]``) and a days x series array.
+    """
+
+    steps, calendar_ns = _equity_steps(equity_series)
+    columns = np.zeros((len(calendar_ns), len(steps)))
+    for column, step in enumerate(steps):
+        if step is not None:
+            stamps, values = step
+            last = np.searchsorted(stamps, calendar_ns, side="right") - 1
+            columns[:, column] = np.where(last >= 0, values[np.maximum(last, 0)], 0.0)
+    return calendar_ns, columns
+
+
+def unit_equity_columns(index: BatchIndex, start: datetime | None, end: datetime | None) -> tuple[np.ndarray, np.ndarray]:
+    """Each ticker's equity from one unit of capital, aligned as by ``align_daily_columns``.
+
+    Equity compounds per ticker, so scaling a column by a ticker's capital gives
+    its equity in any run of the window.
+    """
+
+    series = []
+    for ticker in index.tickers:
+        lo, hi = ticker.bounds(start, end)
+        series.append(EquitySeries(ticker.ticker, ticker.equity(lo, hi, 1.0), ticker.frame(lo, hi)))
+    return align_daily_columns(series)
 
 
 def _compute_drawdown(series: pd.Series) -> pd.Series:
@@ -144,14 +248,11 @@ def _buy_hold_curve(portfolio: pd.Series) -> pd.Series:
     return portfolio.iloc[0] * returns
 
 
-def _summarize_metrics(trades: list[NormalizedTrade], portfolio_curve: pd.Series, currency: str) -> dict[str, float | int]:
-    total_trades = len(trades)
-    total_pnl = sum(t.net_pnl for t in trades)
-    wins = [t for t in trades if t.net_pnl > 0]
-    losses = [t for t in trades if t.net_pnl <= 0]
-    profitable_pct = (len(wins) / total_trades * 100) if total_trades else 0
-    gross_profit = sum(t.net_pnl for t in wins)
-    gross_loss = sum(t.net_pnl for t in losses)
+def _summarize_metrics(stats: TradeStats, portfolio_curve: pd.Series, currency: str) -> dict[str, float | int]:
+    total_trades = stats.total_trades
+    profitable_pct = (stats.winning_trades / total_trades * 100) if total_trades else 0
+    gross_profit = stats.gross_profit
+    gross_loss = stats.gross_loss
     profit_factor = abs(gross_profit / gross_loss) if gross_loss != 0 else float("inf") if gross_profit > 0 else 0
     max_drawdown_abs = float((portfolio_curve - portfolio_curve.cummax()).min())
     max_drawdown_pct = float(((portfolio_curve / portfolio_curve.cummax()) - 1).min()) * 100
@@ -161,7 +262,7 @@ def _summarize_metrics(trades: list[NormalizedTrade], portfolio_curve: pd.Series
         total_return_pct = 0
 
     kpis = {
-        "total_pnl": total_pnl,
+        "total_pnl": stats.total_pnl,
         "total_return_pct": total_return_pct,
         "max_drawdown_abs": max_drawdown_abs,
         "max_drawdown_pct": max_drawdown_pct,
@@ -172,32 +273,25 @@ def _summarize_metrics(trades: list[NormalizedTrade], portfolio_curve: pd.Series
     return kpis
 
 
-def _annualized_metrics(trades: Sequence[NormalizedTrade]) -> dict[str, float]:
-    if not trades:
+def _annualized_metrics(trades: TradeStats | TradeFrame | Sequence[NormalizedTrade]) -> dict[str, float]:
+    if not isinstance(trades, TradeStats):
+        trades = trade_stats(trades if isinstance(trades, TradeFrame) else TradeFrame.from_trades(trades))
+    if not trades.total_trades:
         return {"annualized_return_pct": 0.0, "avg_trade_duration_days": 0.0, "total_trade_days": 0.0}
-    avg_return = statistics.fmean(t.trade_return_pct for t in trades)
-    avg_days = statistics.fmean(t.duration_days for t in trades)
+    avg_days = trades.avg_days
     trades_per_year = 365.0 / avg_days if avg_days else 0
-    annualized = (1 + avg_return) ** trades_per_year - 1 if trades_per_year else 0
-    total_days = sum(t.duration_days for t in trades)
+    annualized = (1 + trades.avg_return) ** trades_per_year - 1 if trades_per_year else 0
     return {
         "annualized_return_pct": annualized * 100,
         "avg_trade_duration_days": avg_days,
-        "total_trade_days": total_days,
+        "total_trade_days": trades.total_days,
     }
 
 
-def _build_sections(kpis: dict[str, float | int], trades: list[NormalizedTrade], portfolio_curve: pd.Series) -> dict[str, dict]:
-    wins = [t for t in trades if t.net_pnl > 0]
-    losses = [t for t in trades if t.net_pnl <= 0]
-    avg_win = statistics.fmean(t.net_pnl for t in wins) if wins else 0
-    avg_loss = statistics.fmean(t.net_pnl for t in losses) if losses else 0
-    avg_win_pct = statistics.fmean(t.trade_return_pct for t in wins) * 100 if wins else 0
-    avg_loss_pct = statistics.fmean(t.trade_return_pct for t in losses) * 100 if losses else 0
+def _build_sections(kpis: dict[str, float | int], stats: TradeStats, portfolio_curve: pd.Series) -> dict[str, dict]:
+    avg_win = stats.avg_win
+    avg_loss = stats.avg_loss
     ratio = (avg_win / abs(avg_loss)) if avg_loss else float("inf") if avg_win > 0 else 0
-    avg_trade_pct = statistics.fmean(t.trade_return_pct for t in trades) * 100 if trades else 0
-    avg_trade_abs = statistics.fmean(t.net_pnl for t in trades) if trades else 0
-    avg_bars = statistics.fmean(t.duration_days for t in trades) if trades else 0
 
     overview = {
         "title": "Overview",
@@ -217,13 +311,13 @@ def _build_sections(kpis: dict[str, float | int], trades: list[NormalizedTrade],
         "metrics": [
             {"label": "Open P&L", "value": 0},
             {"label": "Net profit", "value": kpis["total_pnl"]},
-            {"label": "Gross profit", "value": sum(t.net_pnl for t in wins)},
-            {"label": "Gross loss", "value": sum(t.net_pnl for t in losses)},
+            {"label": "Gross profit", "value": stats.gross_profit},
+            {"label": "Gross loss", "value": stats.gross_loss},
             {"label": "Commission paid", "value": 0},
             {"label": "Buy & hold return", "value": buy_hold_value},
             {"label": "Max equity run-up", "value": max_runup},
             {"label": "Max equity drawdown", "value": kpis["max_drawdown_abs"]},
-            {"label": "Max contracts held", "value": 1},
+            {"label": "Max contracts held", "value": kpis["max_concurrent_positions"]},
         ],
     }
 
@@ -231,21 +325,21 @@ def _build_sections(kpis: dict[str, float | int], trades: list[NormalizedTrade],
         "title": "Trades analysis",
         "metrics": [
             {"label": "Total trades", "value": kpis["total_trades"]},
-            {"label": "Winning trades", "value": len(wins)},
-            {"label": "Losing trades", "value": len(losses)},
+            {"label": "Winning trades", "value": stats.winning_trades},
+            {"label": "Losing trades", "value": stats.losing_trades},
             {"label": "% Profitable", "value": kpis["profitable_trades_pct"]},
-            {"label": "Avg trade", "value": avg_trade_abs},
-            {"label": "Avg trade %", "value": avg_trade_pct},
+            {"label": "Avg trade", "value": stats.avg_pnl},
+            {"label": "Avg trade %", "value": stats.avg_return * 100},
             {"label": "Avg winning trade", "value": avg_win},
             {"label": "Avg losing trade", "value": avg_loss},
             {"label": "Ratio avg win / avg loss", "value": ratio},
-            {"label": "Largest win", "value": max((t.net_pnl for t in wins), default=0)},
-            {"label": "Largest loss", "value": min((t.net_pnl for t in losses), default=0)},
-            {"label": "Largest win %", "value": max((t.trade_return_pct for t in wins), default=0) * 100},
-            {"label": "Largest loss %", "value": min((t.trade_return_pct for t in losses), default=0) * 100},
-            {"label": "Avg # bars in trades", "value": avg_bars},
-            {"label": "Avg # bars winning", "value": statistics.fmean(t.duration_days for t in wins) if wins else 0},
-            {"label": "Avg # bars losing", "value": statistics.fmean(t.duration_days for t in losses) if losses else 0},
+            {"label": "Largest win", "value": stats.largest_win},
+            {"label": "Largest loss", "value": stats.largest_loss},
+            {"label": "Largest win %", "value": stats.largest_win_pct},
+            {"label": "Largest loss %", "value": stats.largest_loss_pct},
+            {"label": "Avg # bars in trades", "value": stats.avg_days},
+            {"label": "Avg # bars winning", "value": stats.avg_days_win},
+            {"label": "Avg # bars losing", "value": stats.avg_days_loss},
         ],
     }
 
@@ -295,7 +389,160 @@ def _sortino_ratio(series: pd.Series, risk_free: float = 0.0) -> float:
     return (returns.mean() - risk_free / 252) / downside_std * math.sqrt(252)
 
 
-def run_portfolio(db: Session, user: tables.User, request: PortfolioRunRequest) -> PortfolioRunResponse:
+def _process_payload(source: TradeSource, fetched: tuple[bytes, bool]) -> TickerIndex:
+    """Parse one ticker's payload into its trade index.
+
+    Kept at module level so it can be shipped to a process pool.
+    """
+
+    payload, is_artifact = fetched
+    df = decode_trades_frame(payload) if is_artifact else _parse_csv(payload)
+    return TickerIndex.build(source.ticker, df)
+
+
+def _batch_fingerprint(batch: tables.Batch) -> dict[str, object]:
+    return {"batch": batch.id, "files": sorted(record.object_key for record in batch.files)}
+
+
+def _content_fingerprint(batch: tables.Batch) -> list[list[str]]:
+    # Uploads are content-addressed, so batches holding the same files for the same
+    # tickers share one trade index.
+    return [[record.ticker, record.object_key] for record in batch.files]
+
+
+def _load_batch_index(batch: tables.Batch) -> BatchIndex:
+    """Return the batch's trade index, building it from storage on a cache miss."""
+
+    index_key = hashlib.sha256(json.dumps(_content_fingerprint(batch)).encode()).hexdigest()
+    index = index_cache.get(index_key)
+    if index is not None:
+        return index
+    cpu_executor = get_process_pool()
+    tickers, timings = run_pipeline(
+        [TradeSource.from_record(record) for record in batch.files],
+        partial(_fetch_payload, zero_copy=cpu_executor is None),
+        _process_payload,
+        cpu_executor=cpu_executor,
+    )
+    logger.info("portfolio.loaded", extra={"props": {"batch_id": batch.id, **timings.as_dict()}})
+    index = BatchIndex(tickers=tickers)
+    index_cache.put(index_key, index, size=index.nbytes)
+    return index
+
+
+def _ticker_capital(tickers: Sequence[str], total_capital: float, weights: dict[str, float] | None) -> list[float]:
+    """Starting capital of each ticker: an even split, or ``weights`` normalized to sum to one."""
+
+    if weights is None:
+        return [total_capital / len(tickers)] * len(tickers)
+    unknown = sorted(set(weights) - set(tickers))
+    if unknown:
+        raise ValueError(f"Weights name tickers not in the batch: {', '.join(unknown)}")
+    raw = np.array([weights.get(ticker, 0.0) for ticker in tickers], dtype=float)
+    if (raw < 0).any() or not raw.sum() > 0:
+        raise ValueError("Weights must be non-negative with a positive total")
+    return (total_capital * raw / raw.sum()).tolist()
+
+
+def _result_cache_key(
+    batch: tables.Batch,
+    total_capital: float,
+    currency: str,
+    date_start: datetime | None,
+    date_end: datetime | None,
+    max_positions: int | None = None,
+    weights: dict[str, float] | None = None,
+) -> str:
+    """Fingerprint a run by its batch contents and normalized request parameters."""
+
+    fingerprint = {
+        "schema": RESULT_SCHEMA_VERSION,
+        **_batch_fingerprint(batch),
+        "totalCapital": float(total_capital),
+        "currency": currency.upper(),
+        "dateRange": [value.isoformat() if value else None for value in (date_start, date_end)],
+        "maxPositions": max_positions,
+        "weights": weights,
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+def _cached_response(db: Session, batch_id: str, cache_key: str) -> CachedRun | None:
+    global _persisted_hits
+
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    run = (
+        db.query(tables.PortfolioRun)
+        .filter(tables.PortfolioRun.batch_id == batch_id, tables.PortfolioRun.cache_key == cache_key)
+        .order_by(tables.PortfolioRun.created_at.desc())
+        .first()
+    )
+    if run is None or not isinstance(run.metrics, dict):
+        return None
+    cached = _stored_run(run)
+    result_cache.put(cache_key, cached, size=_cached_size(cached))
+    with _persisted_hits_lock:
+        _persisted_hits += 1
+    return cached
+
+
+def _stored_run(run: tables.PortfolioRun) -> CachedRun:
+    if run.curves_blob is not None:
+        # ``metrics`` was written from the same summary the response bytes were built from.
+        curves = decode_curves(run.curves_blob)
+        summary = {field: run.metrics[field] for field in _SUMMARY_FIELDS if field in run.metrics}
+    else:
+        # Runs stored before curve blobs keep their curves inside ``metrics``.
+        response = PortfolioRunResponse.model_validate(run.metrics)
+        curves = RunCurves.from_response(response)
+        summary = json.loads(response.model_dump_json(exclude=set(CURVES)))
+    return CachedRun.build(summary, curves, run.curve_pyramid or build_pyramid(curves.values()))
+
+
+def _cached_size(run: CachedRun) -> int:
+    # The response bytes plus the curve buffers; the pydantic model is built lazily
+    # and only by in-process callers.
+    return len(run.body) + run.curves.nbytes
+
+
+def _json_summary(**fields: object) -> dict:
+    """Plain JSON values (NaN/inf as None, NumPy scalars as Python numbers) of ``fields``."""
+
+    return orjson.loads(orjson.dumps(fields, option=orjson.OPT_SERIALIZE_NUMPY))
+
+
+def result_cache_stats() -> dict[str, float | int]:
+    """Hit/miss counters for both cache tiers, for monitoring."""
+
+    memory = result_cache.stats()
+    with _persisted_hits_lock:
+        persisted_hits = _persisted_hits
+    return {
+        "memory": memory.as_dict(),
+        "persisted_hits": persisted_hits,
+        "misses": memory.misses - persisted_hits,
+    }
+
+
+def run_portfolio(
+    db: Session,
+    user: tables.User,
+    request: PortfolioRunRequest,
+    points: int | None = None,
+) -> PortfolioRunResponse:
+    """Run (or fetch the cached run of) a batch; ``points`` caps each curve's length."""
+
+    run = compute_run(db, user, request)
+    if not points:
+        return run.response
+    return PortfolioRunResponse.model_validate_json(run.json(points))
+
+
+def compute_run(db: Session, user: tables.User, request: PortfolioRunRequest) -> CachedRun:
+    """The full-resolution run with its curve pyramid and NumPy curves, cached."""
+
     batch: tables.Batch | None = db.get(tables.Batch, request.batchId)
     if batch is None:
         raise ValueError("Batch not found")
@@ -305,57 +552,76 @@ def run_portfolio(db: Session, user: tables.User, request: PortfolioRunRequest)
         raise ValueError("Batch has no files")
 
     total_capital = request.totalCapital or settings.total_capital_default
-    per_ticker_capital = total_capital / len(records)
+    if request.weights is not None and request.maxPositions:
+        raise ValueError("Weights apply only when capital is split per ticker")
+    ticker_capital = _ticker_capital([record.ticker for record in records], total_capital, request.weights)
 
     date_start, date_end = (request.dateRange or (None, None))
 
-    equity_series: list[EquitySeries] = []
-    all_trades: list[NormalizedTrade] = []
-    trades_table: list[dict[str, str | float | int]] = []
-
-    for record in records:
-        df = _read_csv(record.object_key)
-        trades = _extract_trades(record.ticker, df)
-        if date_start or date_end:
-            trades = [
-                t
-                for t in trades
-                if (date_start is None or t.exit_time >= date_start) and (date_end is None or t.exit_time <= date_end)
-            ]
-        equity = _build_equity_series(trades, per_ticker_capital)
-        equity_series.append(EquitySeries(ticker=record.ticker, equity=equity, trades=trades))
-        all_trades.extend(trades)
-
-        # rebuild trades table from df to keep original columns but apply filters
-        df_filtered = df.copy()
-        if date_start or date_end:
-            df_filtered = df_filtered[(pd.to_datetime(df_filtered["Date/Time"]) >= (date_start or pd.Timestamp.min)) & (pd.to_datetime(df_filtered["Date/Time"]) <= (date_end or pd.Timestamp.max))]
-        trades_table.extend(df_filtered.to_dict(orient="records"))
+    cache_key = _result_cache_key(
+        batch, total_capital, request.currency, date_start, date_end, request.maxPositions, request.weights
+    )
+    cached = _cached_response(db, batch.id, cache_key)
+    if cached is not None:
+        return cached
+
+    index = _load_batch_index(batch)
+    if request.weights is not None:
+        # Unweighted tickers take no part in the run.
+        held = [i for i, capital in enumerate(ticker_capital) if capital > 0]
+        index = BatchIndex([index.tickers[i] for i in held])
+        ticker_capital = [ticker_capital[i] for i in held]
+    schedule = EventSchedule.from_index(index, date_start, date_end)
+    position_kpis: dict[str, float | int] = {}
+    if request.maxPositions:
+        shared = simulate_shared_capital(schedule, total_capital, request.maxPositions)
+        equity_series = [EquitySeries(ticker="portfolio", equity=shared.equity, trades=shared.frame)]
+        trades = shared.frame
+        open_positions = shared.open_positions
+        avg_exposure, max_exposure = shared.exposure_pct()
+        position_kpis = {
+            "skipped_trades": shared.skipped_trades,
+            "avg_exposure_pct": avg_exposure,
+            "max_exposure_pct": max_exposure,
+        }
+    else:
+        equity_series = []
+        for ticker, capital in zip(index.tickers, ticker_capital):
+            lo, hi = ticker.bounds(date_start, date_end)
+            equity = ticker.equity(lo, hi, capital)
+            equity_series.append(EquitySeries(ticker=ticker.ticker, equity=equity, trades=ticker.frame(lo, hi)))
+        trades = schedule.frame
+        open_positions = schedule.open_positions()
+    position_kpis["max_concurrent_positions"] = int(open_positions.max(initial=0))
 
     portfolio_curve = _align_daily(equity_series)
     drawdown = _compute_drawdown(portfolio_curve)
     buy_hold = _buy_hold_curve(portfolio_curve)
 
-    kpis = _summarize_metrics(all_trades, portfolio_curve, request.currency)
-    annualized = _annualized_metrics(all_trades)
+    stats = trade_stats(trades)
+    kpis = _summarize_metrics(stats, portfolio_curve, request.currency)
+    kpis.update(position_kpis)
+    annualized = _annualized_metrics(stats)
     kpis.update({
         "annualized_return_pct": annualized["annualized_return_pct"],
         "avg_trade_duration_days": annualized["avg_trade_duration_days"],
         "total_trade_days": annualized["total_trade_days"],
     })
 
-    sections = _build_sections(kpis, all_trades, portfolio_curve)
+    sections = _build_sections(kpis, stats, portfolio_curve)
     sections["overview"]["metrics"].append({"label": "Annualized P&L %", "value": annualized["annualized_return_pct"]})
 
-    response = PortfolioRunResponse(
-        equityCurve=[{"timestamp": ts.to_pydatetime(), "value": float(val)} for ts, val in portfolio_curve.items()],
-        buyHoldCurve=[{"timestamp": ts.to_pydatetime(), "value": float(val)} for ts, val in buy_hold.items()],
-        drawdown=[{"timestamp": ts.to_pydatetime(), "value": float(val)} for ts, val in drawdown.items()],
+    curves = RunCurves.from_series(portfolio_curve, buy_hold, drawdown)
+    summary = _json_summary(
         kpis=kpis,
         sections=sections,
-        tradesTable=trades_table,
+        tradesCount=stats.total_trades,
+        tradesCursor=TradeQuery(batch_id=batch.id, start=date_start, end=date_end).cursor(),
     )
-
+    pyramid = build_pyramid(curves.values())
+    # The full curves live in ``curves_blob``; keep only the coarsest level as the preview.
+    coarsest = pyramid[min(pyramid, key=int)]["equityCurve"] if pyramid else np.arange(len(curves.equity))
+    preview_stamps = np.datetime_as_string(curves.timestamp_ns[coarsest].view("datetime64[ns]"), unit="s").tolist()
     run = tables.PortfolioRun(
         id=str(uuid.uuid4()),
         batch_id=batch.id,
@@ -363,10 +629,127 @@ def run_portfolio(db: Session, user: tables.User, request: PortfolioRunRequest)
         total_capital=total_capital,
         date_start=date_start,
         date_end=date_end,
-        metrics=json.loads(response.model_dump_json()),
-        equity_curve=[{"timestamp": r.timestamp.isoformat(), "value": r.value} for r in response.equityCurve],
+        max_positions=request.maxPositions,
+        weights=request.weights,
+        cache_key=cache_key,
+        metrics=summary,
+        kpis=summary["kpis"],
+        trades_count=summary["tradesCount"],
+        curves_blob=encode_curves(curves),
+        equity_curve=[
+            {"timestamp": stamp, "value": value if math.isfinite(value) else None}
+            for stamp, value in zip(preview_stamps, curves.equity[coarsest].tolist())
+        ],
+        curve_pyramid=pyramid,
     )
     db.add(run)
     db.flush()
+    cached = CachedRun.build(summary, curves, pyramid)
+    result_cache.put(cache_key, cached, size=_cached_size(cached))
+
+    return cached
+
+
+def summarize_window(
+    db: Session,
+    user: tables.User,
+    batch_id: str,
+    total_capital: float | None,
+    date_start: datetime | None,
+    date_end: datetime | None,
+) -> tuple[float, list[WindowStats]]:
+    """Per-ticker trade count, wins, P&L and ending equity for a date window.
+
+    Served from the batch's prefix-sum index, so each ticker costs two binary
+    searches once the index is cached.
+    """
+
+    batch = _user_batch(db, user, batch_id)
+    capital = total_capital or settings.total_capital_default
+    per_ticker_capital = capital / len(batch.files)
+    return capital, _load_batch_index(batch).window_stats(date_start, date_end, per_ticker_capital)
+
+
+def load_trade_index(db: Session, user: tables.User, batch_id: str) -> BatchIndex:
+    """The batch's cached trade index, for paging through its trades."""
+
+    return _load_batch_index(_user_batch(db, user, batch_id))
+
+
+def _user_batch(db: Session, user: tables.User, batch_id: str) -> tables.Batch:
+    batch: tables.Batch | None = db.get(tables.Batch, batch_id)
+    if batch is None or batch.user_id != user.id:
+        raise LookupError("Batch not found")
+    if not batch.files:
+        raise ValueError("Batch has no files")
+    return batch
+
+
+def get_run(db: Session, user: tables.User, batch_id: str, run_id: str) -> tuple[tables.PortfolioRun, CachedRun]:
+    """A stored run with its curves, decoded from the compressed blob."""
+
+    run: tables.PortfolioRun | None = db.get(tables.PortfolioRun, run_id)
+    if run is None or run.batch_id != batch_id or run.batch.user_id != user.id:
+        raise LookupError("Run not found")
+    if run.cache_key:
+        # Peek so fetching stored runs doesn't skew the run cache's hit rate.
+        cached = result_cache.peek(run.cache_key)
+        if cached is not None:
+            return run, cached
+    return run, _stored_run(run)
+
+
+def list_runs(
+    db: Session,
+    user: tables.User,
+    batch_id: str,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list, str | None]:
+    """Newest-first run summaries, keyset-paginated on ``(created_at, id)``.
+
+    Only summary columns are selected, so a page costs the same however large each
+    run's curves are.
+    """
+
+    batch: tables.Batch | None = db.get(tables.Batch, batch_id)
+    if batch is None or batch.user_id != user.id:
+        raise LookupError("Batch not found")
+    run_table = tables.PortfolioRun
+    query = db.query(
+        run_table.id,
+        run_table.batch_id,
+        run_table.currency,
+        run_table.total_capital,
+        run_table.date_start,
+        run_table.date_end,
+        run_table.max_positions,
+        run_table.weights,
+        run_table.created_at,
+        run_table.kpis,
+        run_table.trades_count,
+    ).filter(run_table.batch_id == batch_id)
+    if cursor:
+        created_at, run_id = _decode_run_cursor(cursor)
+        query = query.filter(
+            or_(
+                run_table.created_at < created_at,
+                and_(run_table.created_at == created_at, run_table.id < run_id),
+            )
+        )
+    rows = query.order_by(run_table.created_at.desc(), run_table.id.desc()).limit(limit + 1).all()
+    next_cursor = _encode_run_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _encode_run_cursor(created_at: datetime, run_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), run_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
 
-    return response
+def _decode_run_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(run_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed runs cursor") from exc
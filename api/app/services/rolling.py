@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import orjson
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class RollingSeries:
+    """Trailing-window statistics at every curve point; NaN until the window fills."""
+
+    window: int
+    sharpe: np.ndarray
+    sortino: np.ndarray
+    return_pct: np.ndarray
+    drawdown_pct: np.ndarray  # below the highest value within the window
+
+
+@dataclass
+class SegmentStats:
+    start: int  # first curve point of the segment
+    stop: int  # one past the last
+    return_pct: float
+    sharpe: float
+    sortino: float
+    max_drawdown_pct: float
+
+
+@dataclass
+class ReturnSums:
+    """Prefix sums of daily returns, so any run of returns costs O(1) to summarize.
+
+    Entry ``k`` of each array covers the returns into points ``1..k``. Returns are
+    centred on their mean (and downside returns on theirs) before squaring, which
+    keeps the variance from cancelling catastrophically over long curves.
+    Non-finite returns (after a zero or missing value) are left out, as the
+    whole-curve ratios do.
+    """
+
+    count: np.ndarray
+    total: np.ndarray
+    squares: np.ndarray
+    mean: float
+    down_count: np.ndarray
+    down_total: np.ndarray
+    down_squares: np.ndarray
+    down_mean: float
+
+    @classmethod
+    def build(cls, equity: np.ndarray) -> ReturnSums:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = equity[1:] / equity[:-1] - 1
+        valid = np.isfinite(returns)
+        down = valid & (returns < 0)
+        mean = float(returns[valid].mean()) if valid.any() else 0.0
+        down_mean = float(returns[down].mean()) if down.any() else 0.0
+        centred = np.where(valid, returns - mean, 0.0)
+        down_centred = np.where(down, returns - down_mean, 0.0)
+        return cls(
+            count=_prefix(valid.astype(float)),
+            total=_prefix(centred),
+            squares=_prefix(centred**2),
+            mean=mean,
+            down_count=_prefix(down.astype(float)),
+            down_total=_prefix(down_centred),
+            down_squares=_prefix(down_centred**2),
+            down_mean=down_mean,
+        )
+
+    def ratios(self, lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Annualized Sharpe and Sortino of the returns into points ``lo+1..hi``.
+
+        Matches the whole-curve ratios: zero when there are too few returns or no
+        spread, and Sortino divides by the spread of the losing days only.
+        """
+
+        count = self.count[hi] - self.count[lo]
+        total = self.total[hi] - self.total[lo]
+        mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0) + self.mean
+        std = _std(count, total, self.squares[hi] - self.squares[lo])
+        down_std = _std(
+            self.down_count[hi] - self.down_count[lo],
+            self.down_total[hi] - self.down_total[lo],
+            self.down_squares[hi] - self.down_squares[lo],
+        )
+        scale = math.sqrt(TRADING_DAYS)
+        sharpe = np.divide(mean * scale, std, out=np.zeros_like(mean), where=std > 0)
+        sortino = np.divide(mean * scale, down_std, out=np.zeros_like(mean), where=down_std > 0)
+        return sharpe, sortino
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    prefix = np.zeros(len(values) + 1)
+    np.cumsum(values, out=prefix[1:])
+    return prefix
+
+
+def _std(count: np.ndarray, total: np.ndarray, squares: np.ndarray) -> np.ndarray:
+    """Sample standard deviation from centred sums; zero below two values."""
+
+    spread = squares - np.divide(total**2, count, out=np.zeros_like(total), where=count > 0)
+    variance = np.divide(spread, count - 1, out=np.zeros_like(spread), where=count > 1)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def trailing_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Maximum of ``values[i - window : i + 1]`` at each ``i``, via a monotonic deque.
+
+    Each index enters and leaves the deque once, so the whole series is O(n)
+    however long the window. NaN values are skipped.
+    """
+
+    result = np.full(len(values), np.nan)
+    candidates: deque[int] = deque()
+    items = values.tolist()
+    for i, value in enumerate(items):
+        if candidates and candidates[0] < i - window:
+            candidates.popleft()
+        if value == value:
+            while candidates and items[candidates[-1]] <= value:
+                candidates.pop()
+            candidates.append(i)
+        if candidates:
+            result[i] = items[candidates[0]]
+    return result
+
+
+def rolling_series(equity: np.ndarray, sums: ReturnSums, window: int) -> RollingSeries:
+    """Statistics over the ``window`` daily returns ending at each point."""
+
+    n = len(equity)
+    hi = np.arange(window, n)
+    lo = hi - window
+    sharpe, sortino, return_pct = (np.full(n, np.nan) for _ in range(3))
+    sharpe[window:], sortino[window:] = sums.ratios(lo, hi)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct[window:] = (equity[hi] / equity[lo] - 1) * 100
+        drawdown_pct = (equity / trailing_max(equity, window) - 1) * 100
+    drawdown_pct[:window] = np.nan
+    return RollingSeries(window, sharpe, sortino, return_pct, drawdown_pct)
+
+
+def segment_bounds(timestamp_ns: np.ndarray, splits_ns: list[int], segment_points: int | None) -> list[int]:
+    """Curve positions where walk-forward segments start, always including 0."""
+
+    starts = {0}
+    starts.update(int(i) for i in np.searchsorted(timestamp_ns, splits_ns, side="left") if 0 < i < len(timestamp_ns))
+    if segment_points:
+        starts.update(range(0, len(timestamp_ns), segment_points))
+    return sorted(starts)
+
+
+def segment_stats(equity: np.ndarray, sums: ReturnSums, starts: list[int]) -> list[SegmentStats]:
+    """Return, ratios and max drawdown of each segment.
+
+    A segment is measured from the last point before it, so consecutive segments
+    split the curve's daily returns between them without gaps or overlap.
+    """
+
+    stops = [*starts[1:], len(equity)]
+    bases = np.array([max(start - 1, 0) for start in starts])
+    last = np.array(stops) - 1
+    sharpe, sortino = sums.ratios(bases, last)
+    segments: list[SegmentStats] = []
+    for i, (start, stop, base) in enumerate(zip(starts, stops, bases.tolist())):
+        values = equity[base:stop]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = float(np.nanmin(values / np.fmax.accumulate(values) - 1, initial=0.0))
+            growth = float(values[-1] / values[0] - 1)
+        segments.append(
+            SegmentStats(
+                start=start,
+                stop=stop,
+                return_pct=growth * 100,
+                sharpe=float(sharpe[i]),
+                sortino=float(sortino[i]),
+                max_drawdown_pct=drawdown * 100,
+            )
+        )
+    return segments
+
+
+def rolling_analytics(
+    timestamp_ns: np.ndarray,
+    equity: np.ndarray,
+    windows: list[int],
+    splits_ns: list[int],
+    segment_points: int | None = None,
+) -> tuple[list[RollingSeries], list[SegmentStats]]:
+    """Rolling statistics per window and walk-forward segment statistics.
+
+    Every window and segment reads the same prefix sums of daily returns, so the
+    cost is one pass over the curve plus O(1) per output value.
+    """
+
+    if not len(equity):
+        raise ValueError("Run has no equity curve")
+    sums = ReturnSums.build(equity)
+    series = [rolling_series(equity, sums, window) for window in windows]
+    return series, segment_stats(equity, sums, segment_bounds(timestamp_ns, splits_ns, segment_points))
+
+
+def encode_rolling_json(
+    run_id: str,
+    timestamp_ns: np.ndarray,
+    series: list[RollingSeries],
+    segments: list[SegmentStats],
+) -> bytes:
+    """``RollingAnalyticsResponse`` JSON, with NaN (unfilled windows) as null."""
+
+    stamps = np.datetime_as_string(timestamp_ns.view("datetime64[ns]"), unit="s")
+    document = {
+        "runId": run_id,
+        "timestamps": stamps.tolist(),
+        "windows": [
+            {
+                "window": item.window,
+                "sharpe": item.sharpe.tolist(),
+                "sortino": item.sortino.tolist(),
+                "returnPct": item.return_pct.tolist(),
+                "drawdownPct": item.drawdown_pct.tolist(),
+            }
+            for item in series
+        ],
+        "segments": [
+            {
+                "start": stamps[segment.start],
+                "end": stamps[segment.stop - 1],
+                "points": segment.stop - segment.start,
+                "returnPct": segment.return_pct,
+                "sharpe": segment.sharpe,
+                "sortino": segment.sortino,
+                "maxDrawdownPct": segment.max_drawdown_pct,
+            }
+            for segment in segments
+        ],
+    }
+    # orjson writes NaN and infinities as null.
+    return orjson.dumps(document)
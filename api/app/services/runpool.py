@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+ResultT = TypeVar("ResultT")
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when every run slot and queue position is taken."""
+
+
+class PortfolioRunPool:
+    """Bounded executor that keeps blocking portfolio runs off the event loop.
+
+    ``max_workers`` runs execute at once and up to ``max_queued`` more wait for a
+    worker; anything beyond that is rejected immediately so callers can shed load.
+
+    Runs execute on threads rather than processes because they work on the
+    request's SQLAlchemy session and ORM objects, which cannot cross a process
+    boundary. The CPU-heavy steps inside a run (parsing trade payloads, Monte
+    Carlo chunks) fan out to the pre-warmed process pool from
+    ``pipeline.get_process_pool``, and the NumPy kernels release the GIL.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int = 0) -> None:
+        self._max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._capacity = max_workers + max(0, max_queued)
+        self._slots = threading.BoundedSemaphore(self._capacity)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def submit(self, fn: Callable[..., ResultT], *args, **kwargs) -> Future[ResultT]:
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated("Portfolio workers are busy, retry shortly")
+        with self._lock:
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="portfolio-run")
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    async def run(self, fn: Callable[..., ResultT], *args, **kwargs) -> ResultT:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
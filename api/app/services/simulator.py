@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .trade_index import BatchIndex
+from .trades import TradeFrame
+
+# Event kinds, in the order they are processed when timestamps tie: a zero-length
+# trade opens before anything closes, then exits free capital for later entries.
+_INSTANT_ENTRY, _EXIT, _ENTRY = 0, 1, 2
+
+
+@dataclass
+class EventSchedule:
+    """Every trade of a window as entry and exit events merged into one timeline.
+
+    Trade arrays hold all tickers' trades back to back; ``event_trade`` and
+    ``event_exit`` list, in processing order, the trade each event belongs to and
+    whether it closes it.
+    """
+
+    entry_ns: np.ndarray
+    exit_ns: np.ndarray
+    trade_return_pct: np.ndarray
+    frame: TradeFrame
+    event_ns: np.ndarray
+    event_trade: np.ndarray
+    event_exit: np.ndarray
+
+    @classmethod
+    def from_index(cls, index: BatchIndex, start: datetime | None, end: datetime | None) -> EventSchedule:
+        columns: dict[str, list[np.ndarray]] = {"entry_ns": [], "exit_ns": [], "trade_return_pct": []}
+        frames: list[TradeFrame] = []
+        for ticker in index.tickers:
+            lo, hi = ticker.bounds(start, end)
+            for name, parts in columns.items():
+                parts.append(ticker.columns[name][lo:hi])
+            frames.append(ticker.frame(lo, hi))
+        entry_ns, exit_ns, returns = (np.concatenate(parts) for parts in columns.values())
+        return cls.build(entry_ns, exit_ns, returns, TradeFrame.concat(frames))
+
+    @classmethod
+    def build(cls, entry_ns: np.ndarray, exit_ns: np.ndarray, trade_return_pct: np.ndarray, frame: TradeFrame) -> EventSchedule:
+        n = len(entry_ns)
+        exit_ns = np.maximum(exit_ns, entry_ns)
+        trade = np.arange(n)
+        event_ns = np.concatenate((entry_ns, exit_ns))
+        kind = np.concatenate((np.where(exit_ns == entry_ns, _INSTANT_ENTRY, _ENTRY), np.full(n, _EXIT)))
+        # One stable sort over all events is the k-way merge of the tickers' timelines.
+        order = np.lexsort((kind, event_ns))
+        return cls(
+            entry_ns=entry_ns,
+            exit_ns=exit_ns,
+            trade_return_pct=np.asarray(trade_return_pct, dtype=float),
+            frame=frame,
+            event_ns=event_ns[order],
+            event_trade=np.concatenate((trade, trade))[order],
+            event_exit=order >= n,
+        )
+
+    @property
+    def trade_count(self) -> int:
+        return len(self.entry_ns)
+
+    def open_positions(self, taken: np.ndarray | None = None) -> np.ndarray:
+        """Positions open after each event, counting only ``taken`` trades if given."""
+
+        step = np.where(self.event_exit, -1, 1)
+        if taken is not None:
+            step = step * taken[self.event_trade]
+        return np.cumsum(step)
+
+
+@dataclass
+class SharedCapitalResult:
+    """Outcome of trading every ticker from one cash balance."""
+
+    allocation: np.ndarray  # capital committed to each trade, 0 when it was skipped
+    equity: pd.Series  # cash plus capital at cost, after each event
+    invested: np.ndarray  # capital at cost in open positions, after each event
+    open_positions: np.ndarray
+    frame: TradeFrame  # taken trades, P&L scaled to their allocation
+
+    @property
+    def taken(self) -> np.ndarray:
+        return self.allocation > 0
+
+    @property
+    def skipped_trades(self) -> int:
+        return int((~self.taken).sum())
+
+    def exposure_pct(self) -> tuple[float, float]:
+        """Time-weighted average and peak share of equity held in open positions."""
+
+        if len(self.invested) == 0:
+            return 0.0, 0.0
+        equity = self.equity.to_numpy()
+        share = np.divide(self.invested, equity, out=np.zeros(len(equity)), where=equity > 0)
+        held = np.diff(self.equity.index.asi8)
+        average = float((share[:-1] * held).sum() / held.sum()) if held.sum() else float(share.mean())
+        return average * 100, float(share.max()) * 100
+
+
+def allocate_shared_capital(schedule: EventSchedule, total_capital: float, max_positions: int) -> np.ndarray:
+    """Capital committed to each trade when all tickers draw on one cash balance.
+
+    Entries and exits are replayed in time order. An entry takes an equal slice
+    (``1 / max_positions``) of equity at cost, capped by the cash on hand, and is
+    skipped when ``max_positions`` are already open or no cash is left; an exit
+    returns the slice grown by the trade's return. The loop touches only scalars
+    and flat arrays; equity, exposure and position counts are rebuilt from the
+    allocations with vectorized cumulative sums.
+    """
+
+    allocated = [0.0] * schedule.trade_count
+    growth = (1 + schedule.trade_return_pct).tolist()
+    cash, invested, open_count = float(total_capital), 0.0, 0
+    for trade, is_exit in zip(schedule.event_trade.tolist(), schedule.event_exit.tolist()):
+        if is_exit:
+            committed = allocated[trade]
+            if committed:
+                cash += committed * growth[trade]
+                invested -= committed
+                open_count -= 1
+        elif open_count < max_positions and cash > 0:
+            committed = min(cash, (cash + invested) / max_positions)
+            allocated[trade] = committed
+            cash -= committed
+            invested += committed
+            open_count += 1
+    return np.array(allocated)
+
+
+def simulate_shared_capital(schedule: EventSchedule, total_capital: float, max_positions: int) -> SharedCapitalResult:
+    allocation = allocate_shared_capital(schedule, total_capital, max_positions)
+    committed = allocation[schedule.event_trade]
+    exit_pnl = np.where(schedule.event_exit, committed * schedule.trade_return_pct[schedule.event_trade], 0.0)
+    invested = np.cumsum(np.where(schedule.event_exit, -committed, committed))
+    equity = pd.Series(
+        total_capital + np.cumsum(exit_pnl),
+        index=pd.DatetimeIndex(schedule.event_ns.view("datetime64[ns]")),
+    )
+    taken = allocation > 0
+    frame = schedule.frame
+    return SharedCapitalResult(
+        allocation=allocation,
+        equity=equity,
+        invested=invested,
+        open_positions=schedule.open_positions(taken),
+        frame=TradeFrame(
+            net_pnl=(allocation * schedule.trade_return_pct)[taken],
+            trade_return_pct=frame.trade_return_pct[taken],
+            duration_days=frame.duration_days[taken],
+            direction=frame.direction[taken],
+        ),
+    )
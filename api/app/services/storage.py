@@ -1,12 +1,20 @@
 from __future__ import annotations
 
-from typing import BinaryIO, Optional
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional, Protocol
 
 import boto3
 from botocore.client import Config
 from botocore.exceptions import BotoCoreError, ClientError, ParamValidationError
 
 from ..core.config import settings
+from .cache import ByteBudgetLRU, CacheStats, DiskCache, EvictionPolicy
 
 
 class StorageError(RuntimeError):
@@ -28,37 +36,360 @@ def _humanize_storage_error(exc: Exception) -> str:
     return f"Object storage error: {message}"
 
 
+# S3 rejects multipart parts below 5 MiB (except the last one).
+MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+class ObjectSink(Protocol):
+    """An object being written incrementally; nothing is visible until ``close``."""
+
+    key: str
+    size: int
+
+    def write(self, data: bytes) -> None: ...
+
+    def close(self) -> None: ...
+
+    def abort(self) -> None: ...
+
+
+class StorageBackend(Protocol):
+    """Where uploads and artifacts live; every method raises ``StorageError``."""
+
+    def ensure_bucket(self) -> None: ...
+
+    def put_object(self, key: str, fileobj: BinaryIO, content_type: str = "text/csv") -> None: ...
+
+    def open_writer(self, key: str, content_type: str = "text/csv", part_size: int = MIN_PART_BYTES) -> ObjectSink: ...
+
+    def get_object(self, key: str) -> bytes: ...
+
+    def get_buffer(self, key: str) -> bytes | mmap.mmap: ...
+
+    def delete_object(self, key: str) -> None: ...
+
+
+class ObjectWriter:
+    """Incremental object upload that holds at most one part in memory.
+
+    Bytes are buffered until ``part_size`` is reached and then sent as a multipart
+    upload part. Objects that never fill a part are written with a single
+    ``put_object`` on ``close``. Call ``abort`` to discard everything written.
+    """
+
+    def __init__(
+        self,
+        service: StorageService,
+        key: str,
+        content_type: str,
+        part_size: int,
+        put_object: Callable[..., None] | None = None,
+    ) -> None:
+        self._service = service
+        self._put_object = put_object or service.put_object
+        self.key = key
+        self._content_type = content_type
+        self._part_size = max(part_size, MIN_PART_BYTES)
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[dict] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self._part_size:
+            part = bytes(self._buffer[: self._part_size])
+            del self._buffer[: self._part_size]
+            self._upload_part(part)
+
+    def close(self) -> None:
+        if self._upload_id is None:
+            self._put_object(self.key, io.BytesIO(self._buffer), content_type=self._content_type)
+        else:
+            if self._buffer or not self._parts:
+                self._upload_part(bytes(self._buffer))
+            self._call(
+                "complete_multipart_upload",
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buffer = bytearray()
+
+    def abort(self) -> None:
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            try:
+                self._call("abort_multipart_upload", Key=self.key, UploadId=self._upload_id)
+            except StorageError:
+                pass
+            self._upload_id = None
+
+    def _upload_part(self, part: bytes) -> None:
+        if self._upload_id is None:
+            created = self._call("create_multipart_upload", Key=self.key, ContentType=self._content_type)
+            self._upload_id = created["UploadId"]
+        number = len(self._parts) + 1
+        response = self._call("upload_part", Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=part)
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def _call(self, operation: str, **params):
+        try:
+            return getattr(self._service.client, operation)(Bucket=self._service._bucket, **params)
+        except (BotoCoreError, ClientError, ParamValidationError) as exc:
+            raise StorageError(_humanize_storage_error(exc)) from exc
+
+
 class StorageService:
+    """S3 (or MinIO) storage backend.
+
+    The boto3 client is created on first use, so importing the app or running
+    with the local backend never needs S3 settings.
+    """
+
     def __init__(self, client: Optional[object] = None, bucket: Optional[str] = None) -> None:
-        self._client = client or boto3.client(
-            "s3",
-            endpoint_url=settings.s3_endpoint_url,
-            aws_access_key_id=settings.s3_access_key,
-            aws_secret_access_key=settings.s3_secret_key,
-            config=Config(signature_version="s3v4"),
-        )
+        self._client = client
+        self._client_lock = threading.Lock()
         self._bucket = bucket or settings.s3_bucket
 
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=settings.s3_endpoint_url,
+                        aws_access_key_id=settings.s3_access_key,
+                        aws_secret_access_key=settings.s3_secret_key,
+                        config=Config(signature_version="s3v4"),
+                    )
+        return self._client
+
     def ensure_bucket(self) -> None:
         try:
-            existing = self._client.list_buckets().get("Buckets", [])
+            existing = self.client.list_buckets().get("Buckets", [])
             if not any(b["Name"] == self._bucket for b in existing):
-                self._client.create_bucket(Bucket=self._bucket)
+                self.client.create_bucket(Bucket=self._bucket)
         except (BotoCoreError, ClientError, ParamValidationError) as exc:
             raise StorageError(_humanize_storage_error(exc)) from exc
 
     def put_object(self, key: str, fileobj: BinaryIO, content_type: str = "text/csv") -> None:
         try:
-            self._client.put_object(Bucket=self._bucket, Key=key, Body=fileobj, ContentType=content_type)
+            self.client.put_object(Bucket=self._bucket, Key=key, Body=fileobj, ContentType=content_type)
+        except (BotoCoreError, ClientError, ParamValidationError) as exc:
+            raise StorageError(_humanize_storage_error(exc)) from exc
+
+    def delete_object(self, key: str) -> None:
+        try:
+            self.client.delete_object(Bucket=self._bucket, Key=key)
         except (BotoCoreError, ClientError, ParamValidationError) as exc:
             raise StorageError(_humanize_storage_error(exc)) from exc
 
+    def open_writer(self, key: str, content_type: str = "text/csv", part_size: int = MIN_PART_BYTES) -> ObjectWriter:
+        """Start an incremental upload of ``key``; see :class:`ObjectWriter`."""
+
+        return ObjectWriter(self, key, content_type, part_size)
+
     def get_object(self, key: str) -> bytes:
         try:
-            response = self._client.get_object(Bucket=self._bucket, Key=key)
+            response = self.client.get_object(Bucket=self._bucket, Key=key)
             return response["Body"].read()
         except (BotoCoreError, ClientError, ParamValidationError) as exc:
             raise StorageError(_humanize_storage_error(exc)) from exc
 
+    def get_buffer(self, key: str) -> bytes | mmap.mmap:
+        """Like ``get_object`` but may return a read-only map; parse it in place."""
+
+        return self.get_object(key)
+
+
+class LocalObjectWriter:
+    """Incremental write to a temp file that is renamed into place on ``close``."""
+
+    def __init__(self, path: Path, key: str) -> None:
+        self.key = key
+        self.size = 0
+        self._path = path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {exc}") from exc
+        self._temp_path = temp_path
+        self._file = os.fdopen(handle, "wb")
+
+    def write(self, data: bytes) -> None:
+        try:
+            self._file.write(data)
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {exc}") from exc
+        self.size += len(data)
+
+    def close(self) -> None:
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._temp_path, self._path)
+        except OSError as exc:
+            self.abort()
+            raise StorageError(f"Object storage error: {exc}") from exc
+
+    def abort(self) -> None:
+        self._file.close()
+        Path(self._temp_path).unlink(missing_ok=True)
+
+
+class LocalStorageService:
+    """Storage backend on a local directory, for single-host deployments and tests.
+
+    Keys map to ``root/ab/cd/<sha256 of key>`` so no directory grows unbounded.
+    Writes go to a temp file in the target directory and are renamed into place,
+    so readers see either the whole object or nothing. ``get_buffer`` returns a
+    read-only ``mmap`` that pandas and Arrow parse without copying.
+    """
+
+    def __init__(self, root: str | os.PathLike[str]) -> None:
+        self._root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return self._root / name[:2] / name[2:4] / name
+
+    def ensure_bucket(self) -> None:
+        try:
+            self._root.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {exc}") from exc
+
+    def open_writer(self, key: str, content_type: str = "text/csv", part_size: int = MIN_PART_BYTES) -> LocalObjectWriter:
+        return LocalObjectWriter(self._path(key), key)
+
+    def put_object(self, key: str, fileobj: BinaryIO, content_type: str = "text/csv") -> None:
+        writer = self.open_writer(key, content_type)
+        try:
+            while chunk := fileobj.read(MIN_PART_BYTES):
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    def get_object(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {key}: {exc.strerror}") from exc
+
+    def get_buffer(self, key: str) -> bytes | mmap.mmap:
+        try:
+            with open(self._path(key), "rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b""  # mmap cannot map empty files
+                return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {key}: {exc.strerror}") from exc
+
+    def delete_object(self, key: str) -> None:
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError as exc:
+            raise StorageError(f"Object storage error: {exc}") from exc
+
+
+class CachedStorageService:
+    """Read-through cache in front of a :class:`StorageService`.
+
+    Stored objects are immutable, so nothing is ever invalidated on read. Lookups
+    try an in-memory byte-budgeted cache, then (when ``directory`` is set) a local
+    ``DiskCache`` served through ``mmap``, and only then the backend. Fetched
+    objects fill both tiers. Writes and deletes go straight to the backend.
+    """
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        memory_bytes: int,
+        directory: str | None = None,
+        disk_bytes: int = 0,
+        policy: EvictionPolicy = "lru",
+    ) -> None:
+        self.backend = backend
+        self._memory: ByteBudgetLRU[str, bytes] = ByteBudgetLRU(memory_bytes, policy)
+        self._disk = DiskCache(directory, disk_bytes, policy) if directory else None
+        self._fetches = 0
+        self._fetches_lock = threading.Lock()
+
+    def ensure_bucket(self) -> None:
+        self.backend.ensure_bucket()
+
+    def put_object(self, key: str, fileobj: BinaryIO, content_type: str = "text/csv") -> None:
+        self.backend.put_object(key, fileobj, content_type=content_type)
+
+    def open_writer(self, key: str, content_type: str = "text/csv", part_size: int = MIN_PART_BYTES) -> ObjectSink:
+        if isinstance(self.backend, StorageService):
+            # Whole small objects still go through ``self.put_object``.
+            return ObjectWriter(self.backend, key, content_type, part_size, put_object=self.put_object)
+        return self.backend.open_writer(key, content_type, part_size)
+
+    def delete_object(self, key: str) -> None:
+        self._memory.pop(key)
+        if self._disk is not None:
+            self._disk.pop(key)
+        self.backend.delete_object(key)
+
+    def get_object(self, key: str) -> bytes:
+        payload = self.get_buffer(key)
+        if isinstance(payload, mmap.mmap):
+            with payload:
+                payload = payload[:]
+            self._memory.put(key, payload, size=len(payload))
+        return payload
+
+    def get_buffer(self, key: str) -> bytes | mmap.mmap:
+        """The object from the nearest tier; disk hits come back as a read-only map."""
+
+        payload = self._memory.get(key)
+        if payload is not None:
+            return payload
+        if self._disk is not None:
+            mapped = self._disk.get(key)
+            if mapped is not None:
+                return mapped
+        payload = self.backend.get_buffer(key)
+        with self._fetches_lock:
+            self._fetches += 1
+        if isinstance(payload, mmap.mmap):
+            # Already a local file (the local backend); caching would only copy it.
+            return payload
+        if self._disk is not None:
+            self._disk.put(key, payload)
+        self._memory.put(key, payload, size=len(payload))
+        return payload
+
+    def stats(self) -> dict[str, object]:
+        """Hit/miss counters per tier plus the number of backend fetches."""
+
+        with self._fetches_lock:
+            fetches = self._fetches
+        disk = self._disk.stats() if self._disk is not None else CacheStats()
+        return {"memory": self._memory.stats().as_dict(), "disk": disk.as_dict(), "backend_fetches": fetches}
+
+
+def create_storage_backend() -> StorageBackend:
+    """The backend selected by ``settings.storage_backend``."""
+
+    if settings.storage_backend == "local":
+        return LocalStorageService(settings.storage_local_dir)
+    return StorageService()
+
 
-storage_service = StorageService()
+storage_service = CachedStorageService(
+    create_storage_backend(),
+    memory_bytes=settings.storage_cache_memory_bytes,
+    directory=settings.storage_cache_dir,
+    disk_bytes=settings.storage_cache_disk_bytes,
+    policy=settings.storage_cache_policy,
+)
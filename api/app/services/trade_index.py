@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .trades import TradeFrame, extract_trade_columns
+
+_NS_MIN = np.iinfo(np.int64).min
+_NS_MAX = np.iinfo(np.int64).max
+
+
+def to_ns(value: datetime | None, default: int) -> int:
+    """Convert a request bound to naive-UTC epoch nanoseconds (``default`` when open)."""
+
+    if value is None:
+        return default
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert("UTC").tz_localize(None)
+    return int(stamp.as_unit("ns").value)
+
+
+@dataclass
+class WindowStats:
+    ticker: str
+    trades: int
+    wins: int
+    pnl: float
+    final_equity: float
+
+
+@dataclass
+class TickerIndex:
+    """One ticker's trades sorted by exit time, with prefix sums for window queries.
+
+    ``*_prefix`` arrays have ``n + 1`` entries so the total over trades ``lo:hi`` is
+    ``prefix[hi] - prefix[lo]``. Compounded growth is kept as a prefix of
+    ``log|1 + r|`` plus counts of negative and zero growth factors, which recovers
+    the exact sign and any wipe-out of a window's product in O(1).
+    """
+
+    ticker: str
+    columns: dict[str, np.ndarray]
+    exit_ns: np.ndarray
+    log_growth_prefix: np.ndarray
+    negative_prefix: np.ndarray
+    zero_prefix: np.ndarray
+    pnl_prefix: np.ndarray
+    win_prefix: np.ndarray
+
+    @classmethod
+    def build(cls, ticker: str, df: pd.DataFrame) -> TickerIndex:
+        columns = extract_trade_columns(df)
+        growth = 1 + columns["trade_return_pct"]
+        magnitude = np.abs(growth)
+        with np.errstate(divide="ignore"):
+            log_growth = np.where(magnitude > 0, np.log(np.where(magnitude > 0, magnitude, 1.0)), 0.0)
+        return cls(
+            ticker=ticker,
+            columns=columns,
+            exit_ns=columns["exit_ns"],
+            log_growth_prefix=_prefix(log_growth),
+            negative_prefix=_prefix((growth < 0).astype(np.int64)),
+            zero_prefix=_prefix((growth == 0).astype(np.int64)),
+            pnl_prefix=_prefix(columns["net_pnl"]),
+            win_prefix=_prefix((columns["net_pnl"] > 0).astype(np.int64)),
+        )
+
+    @property
+    def trade_count(self) -> int:
+        return len(self.exit_ns)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [
+            *self.columns.values(),
+            self.log_growth_prefix,
+            self.negative_prefix,
+            self.zero_prefix,
+            self.pnl_prefix,
+            self.win_prefix,
+        ]
+        return sum(array.nbytes for array in arrays)
+
+    def bounds(self, start: datetime | None, end: datetime | None) -> tuple[int, int]:
+        """Slice of trades whose exit falls inside the inclusive window."""
+
+        lo = int(np.searchsorted(self.exit_ns, to_ns(start, _NS_MIN), side="left"))
+        hi = int(np.searchsorted(self.exit_ns, to_ns(end, _NS_MAX), side="right"))
+        return lo, max(lo, hi)
+
+    def window_stats(self, lo: int, hi: int, initial_capital: float) -> WindowStats:
+        if self.zero_prefix[hi] - self.zero_prefix[lo]:
+            growth = 0.0
+        else:
+            sign = -1.0 if (self.negative_prefix[hi] - self.negative_prefix[lo]) % 2 else 1.0
+            growth = sign * float(np.exp(self.log_growth_prefix[hi] - self.log_growth_prefix[lo]))
+        return WindowStats(
+            ticker=self.ticker,
+            trades=hi - lo,
+            wins=int(self.win_prefix[hi] - self.win_prefix[lo]),
+            pnl=float(self.pnl_prefix[hi] - self.pnl_prefix[lo]),
+            final_equity=initial_capital * growth,
+        )
+
+    def equity(self, lo: int, hi: int, initial_capital: float) -> pd.Series:
+        """Compounded equity at each exit in ``lo:hi``, anchored at the first trade's entry."""
+
+        if hi <= lo:
+            return pd.Series(dtype=float)
+        values = initial_capital * np.cumprod(1 + self.columns["trade_return_pct"][lo:hi])
+        series = pd.Series(values, index=pd.DatetimeIndex(self.exit_ns[lo:hi].view("datetime64[ns]")))
+        series = series[~series.index.duplicated(keep="last")]
+        start = pd.Timestamp(int(self.columns["entry_ns"][lo]))
+        if start not in series.index:
+            series.loc[start] = initial_capital
+        return series.sort_index()
+
+    def frame(self, lo: int, hi: int) -> TradeFrame:
+        return TradeFrame.from_columns(self.columns, lo, hi)
+
+
+@dataclass
+class BatchIndex:
+    tickers: list[TickerIndex]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ticker.nbytes for ticker in self.tickers)
+
+    def window_stats(self, start: datetime | None, end: datetime | None, per_ticker_capital: float) -> list[WindowStats]:
+        return [ticker.window_stats(*ticker.bounds(start, end), per_ticker_capital) for ticker in self.tickers]
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    prefix = np.zeros(len(values) + 1, dtype=values.dtype if values.dtype.kind in "iu" else float)
+    np.cumsum(values, out=prefix[1:])
+    return prefix
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from typing import Iterator, Literal
+
+import numpy as np
+
+from .trade_index import BatchIndex
+from .trades import DIRECTION_LABELS, Direction
+
+SortKey = Literal["exitTime", "entryTime", "netPnl", "returnPct"]
+# Public sort names mapped to trade columns.
+SORT_COLUMNS: dict[str, str] = {
+    "exitTime": "exit_ns",
+    "entryTime": "entry_ns",
+    "netPnl": "net_pnl",
+    "returnPct": "trade_return_pct",
+}
+
+PnlSign = Literal["positive", "negative"]
+
+
+@dataclass(frozen=True)
+class TradeQuery:
+    """A filtered, sorted view of a batch's trades plus a keyset position.
+
+    ``after`` is the ``(sort value, ticker position, trade row)`` of the last trade
+    already returned; rows are totally ordered by that tuple, so a page is just the
+    next ``limit`` rows past it and never shifts when earlier pages change.
+    """
+
+    batch_id: str
+    start: datetime | None = None
+    end: datetime | None = None
+    tickers: tuple[str, ...] = ()
+    direction: Direction | None = None
+    pnl: PnlSign | None = None
+    sort: SortKey = "exitTime"
+    descending: bool = False
+    after: tuple[float | int, int, int] | None = None
+
+    def __post_init__(self) -> None:
+        if self.sort not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort '{self.sort}'")
+        if self.pnl not in (None, "positive", "negative"):
+            raise ValueError(f"Unsupported pnl filter '{self.pnl}'")
+
+    def cursor(self) -> str:
+        """Opaque token that resumes this query (from the start when ``after`` is unset)."""
+
+        payload = asdict(self)
+        payload.update(
+            start=self.start.isoformat() if self.start else None,
+            end=self.end.isoformat() if self.end else None,
+            direction=int(self.direction) if self.direction is not None else None,
+        )
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def from_cursor(cls, token: str) -> TradeQuery:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            return cls(
+                batch_id=payload["batch_id"],
+                start=datetime.fromisoformat(payload["start"]) if payload["start"] else None,
+                end=datetime.fromisoformat(payload["end"]) if payload["end"] else None,
+                tickers=tuple(payload["tickers"]),
+                direction=Direction(payload["direction"]) if payload["direction"] is not None else None,
+                pnl=payload["pnl"],
+                sort=payload["sort"],
+                descending=bool(payload["descending"]),
+                after=tuple(payload["after"]) if payload["after"] else None,
+            )
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError("Malformed trades cursor") from exc
+
+
+@dataclass
+class TradePage:
+    rows: list[dict]
+    total: int
+    next_cursor: str | None
+
+
+@dataclass
+class _Selection:
+    """Matching trades in query order, as parallel arrays."""
+
+    keys: np.ndarray
+    ticker_pos: np.ndarray
+    row: np.ndarray
+    total: int
+
+
+def _select(index: BatchIndex, query: TradeQuery) -> _Selection:
+    column = SORT_COLUMNS[query.sort]
+    keys, ticker_pos, rows = [], [], []
+    for position, ticker in enumerate(index.tickers):
+        if query.tickers and ticker.ticker not in query.tickers:
+            continue
+        lo, hi = ticker.bounds(query.start, query.end)
+        mask = np.ones(hi - lo, dtype=bool)
+        if query.direction is not None:
+            mask &= ticker.columns["direction"][lo:hi] == query.direction
+        if query.pnl == "positive":
+            mask &= ticker.columns["net_pnl"][lo:hi] > 0
+        elif query.pnl == "negative":
+            mask &= ticker.columns["net_pnl"][lo:hi] <= 0
+        selected = lo + np.flatnonzero(mask)
+        keys.append(ticker.columns[column][selected])
+        ticker_pos.append(np.full(len(selected), position, dtype=np.int64))
+        rows.append(selected)
+
+    if not keys:
+        empty = np.empty(0, dtype=np.int64)
+        return _Selection(empty, empty, empty, 0)
+    key = np.concatenate(keys)
+    pos = np.concatenate(ticker_pos)
+    row = np.concatenate(rows)
+    total = len(key)
+
+    if query.after is not None:
+        after_key, after_pos, after_row = query.after
+        if query.descending:
+            beyond = (key < after_key) | ((key == after_key) & ((pos < after_pos) | ((pos == after_pos) & (row < after_row))))
+        else:
+            beyond = (key > after_key) | ((key == after_key) & ((pos > after_pos) | ((pos == after_pos) & (row > after_row))))
+        key, pos, row = key[beyond], pos[beyond], row[beyond]
+
+    order = np.lexsort((row, pos, key))
+    if query.descending:
+        order = order[::-1]
+    return _Selection(key[order], pos[order], row[order], total)
+
+
+def _gather(index: BatchIndex, selection: _Selection, start: int, stop: int) -> dict[str, np.ndarray]:
+    """Trade columns for selection rows ``start:stop``, plus each row's ticker position."""
+
+    positions = selection.ticker_pos[start:stop]
+    trade_rows = selection.row[start:stop]
+    gathered: dict[str, np.ndarray] = {"ticker_pos": positions}
+    if not len(positions):
+        return gathered
+    # Group the chunk by ticker so each ticker's columns are taken once, then scatter
+    # the values back into query order.
+    by_ticker = np.argsort(positions, kind="stable")
+    groups = np.split(by_ticker, np.flatnonzero(np.diff(positions[by_ticker])) + 1)
+    for group in groups:
+        columns = index.tickers[int(positions[group[0]])].columns
+        for name, values in columns.items():
+            if name not in gathered:
+                gathered[name] = np.empty(len(positions), dtype=values.dtype)
+            gathered[name][group] = values[trade_rows[group]]
+    return gathered
+
+
+def _records(index: BatchIndex, columns: dict[str, np.ndarray]) -> list[dict]:
+    if not len(columns["ticker_pos"]):
+        return []
+    names = [ticker.ticker for ticker in index.tickers]
+    return [
+        {
+            "ticker": names[position],
+            "tradeNumber": number,
+            "direction": direction,
+            "entryTime": entry,
+            "exitTime": exit_,
+            "netPnl": net_pnl,
+            "positionSize": position_size,
+            "returnPct": trade_return * 100,
+            "runup": runup,
+            "drawdown": drawdown,
+        }
+        for position, number, direction, entry, exit_, net_pnl, position_size, trade_return, runup, drawdown in zip(
+            columns["ticker_pos"].tolist(),
+            columns["trade_number"].tolist(),
+            DIRECTION_LABELS[columns["direction"]].tolist(),
+            np.datetime_as_string(columns["entry_ns"].view("datetime64[ns]"), unit="s").tolist(),
+            np.datetime_as_string(columns["exit_ns"].view("datetime64[ns]"), unit="s").tolist(),
+            columns["net_pnl"].tolist(),
+            columns["position_size"].tolist(),
+            columns["trade_return_pct"].tolist(),
+            columns["runup"].tolist(),
+            columns["drawdown"].tolist(),
+        )
+    ]
+
+
+def _position(selection: _Selection, offset: int) -> tuple[float | int, int, int]:
+    key = selection.keys[offset]
+    return (key.item(), int(selection.ticker_pos[offset]), int(selection.row[offset]))
+
+
+def page_trades(index: BatchIndex, query: TradeQuery, limit: int) -> TradePage:
+    """Return up to ``limit`` trades after ``query.after`` and the cursor for the next page."""
+
+    selection = _select(index, query)
+    count = min(limit, len(selection.row))
+    next_cursor = None
+    if count and count < len(selection.row):
+        next_cursor = replace(query, after=_position(selection, count - 1)).cursor()
+    rows = _records(index, _gather(index, selection, 0, count))
+    return TradePage(rows=rows, total=selection.total, next_cursor=next_cursor)
+
+
+def iter_trade_columns(index: BatchIndex, query: TradeQuery, chunk_size: int = 1_000) -> Iterator[dict[str, np.ndarray]]:
+    """Yield every trade after ``query.after`` in order, as column chunks of ``chunk_size`` rows."""
+
+    selection = _select(index, query)
+    for start in range(0, len(selection.row), chunk_size):
+        yield _gather(index, selection, start, start + chunk_size)
+
+
+def iter_trades(index: BatchIndex, query: TradeQuery, chunk_size: int = 1_000) -> Iterator[list[dict]]:
+    """Like ``iter_trade_columns`` but as JSON-ready row dicts."""
+
+    for columns in iter_trade_columns(index, query, chunk_size):
+        yield _records(index, columns)
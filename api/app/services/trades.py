@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class Direction(IntEnum):
+    """Trade side, stored as an ``int8`` code in trade columns."""
+
+    LONG = 0
+    SHORT = 1
+
+    @property
+    def label(self) -> str:
+        return self.name.title()
+
+
+DIRECTION_LABELS = np.array([direction.label for direction in Direction], dtype=object)
+
+
+def direction_codes(values: np.ndarray) -> np.ndarray:
+    """Encode ``Type (Long/Short)`` values; anything that isn't a short counts as long."""
+
+    labels, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+    is_short = np.char.find(np.char.lower(labels), "short") >= 0
+    return np.where(is_short, Direction.SHORT, Direction.LONG).astype(np.int8)[inverse]
+
+
+@dataclass(slots=True)
+class NormalizedTrade:
+    ticker: str
+    trade_number: int
+    entry_time: datetime
+    exit_time: datetime
+    net_pnl: float
+    position_size: float
+    trade_return_pct: float
+    runup: float
+    drawdown: float
+    direction: str
+
+    @property
+    def duration_days(self) -> float:
+        return max((self.exit_time - self.entry_time).total_seconds() / 86_400, 1e-9)
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Parse a ``Date/Time`` column in one vectorized call.
+
+    TradingView exports use a single consistent format, so the inferred fast path
+    almost always applies; mixed formats fall back to per-element inference.
+    """
+
+    try:
+        return pd.to_datetime(values)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values.astype(str), format="mixed")
+
+
+def _numeric_column(df: pd.DataFrame, column: str, default: float = 0.0) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def extract_trade_columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Collapse entry/exit rows into one record per trade, returned as columns.
+
+    Rows are ordered by trade number and timestamp with a single stable sort; the
+    first and last row of every trade are located from the group boundaries so no
+    per-trade Python work is needed. Columns are sorted by exit time.
+    """
+
+    df = df[df["Trade #"].notna()]
+    if df.empty:
+        return {
+            "trade_number": np.empty(0, dtype=np.int64),
+            "entry_ns": np.empty(0, dtype=np.int64),
+            "exit_ns": np.empty(0, dtype=np.int64),
+            "net_pnl": np.empty(0, dtype=float),
+            "position_size": np.empty(0, dtype=float),
+            "trade_return_pct": np.empty(0, dtype=float),
+            "runup": np.empty(0, dtype=float),
+            "drawdown": np.empty(0, dtype=float),
+            "direction": np.empty(0, dtype=np.int8),
+        }
+
+    times = parse_timestamps(df["Date/Time"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    numbers = df["Trade #"].to_numpy()
+    order = np.lexsort((times, numbers))
+    sorted_numbers = numbers[order]
+
+    boundaries = np.flatnonzero(sorted_numbers[1:] != sorted_numbers[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(order)]))
+    entry_idx = order[starts]
+    exit_idx = order[stops - 1]
+
+    # First non-zero position size per trade, in timestamp order.
+    sizes = _numeric_column(df, "Position size", default=np.nan)[order]
+    positions = np.arange(len(order))
+    candidates = np.where(np.isnan(sizes) | (sizes == 0), len(order), positions)
+    first_valid = np.minimum.reduceat(candidates, starts)
+    has_size = first_valid < stops
+    position_size = np.where(has_size, sizes[np.minimum(first_valid, len(order) - 1)], 0.0)
+
+    net_pnl = _numeric_column(df, "Net P&L")[exit_idx]
+    runup = _numeric_column(df, "Run-up")[exit_idx]
+    drawdown = _numeric_column(df, "Drawdown")[exit_idx]
+    if "Type (Long/Short)" in df.columns:
+        direction = direction_codes(df["Type (Long/Short)"].to_numpy()[exit_idx])
+    else:
+        direction = np.full(len(starts), Direction.LONG, dtype=np.int8)
+
+    # Without a usable position size, estimate the exposure from the trade excursion.
+    sized = np.abs(position_size) > 1e-9
+    magnitude = np.maximum(np.maximum(np.abs(runup), np.abs(drawdown)), 1e-6)
+    position_size = np.where(sized, position_size, np.abs(net_pnl) / magnitude)
+    trade_return_pct = np.divide(net_pnl, position_size, out=np.zeros_like(net_pnl), where=position_size != 0)
+
+    columns = {
+        "trade_number": sorted_numbers[starts].astype(np.int64),
+        "entry_ns": times[entry_idx],
+        "exit_ns": times[exit_idx],
+        "net_pnl": net_pnl,
+        "position_size": position_size,
+        "trade_return_pct": trade_return_pct,
+        "runup": runup,
+        "drawdown": drawdown,
+        "direction": direction,
+    }
+    by_exit = np.argsort(columns["exit_ns"], kind="stable")
+    return {name: values[by_exit] for name, values in columns.items()}
+
+
+def trades_from_columns(ticker: str, columns: dict[str, np.ndarray], start: int = 0, stop: int | None = None) -> list[NormalizedTrade]:
+    """Materialize ``NormalizedTrade`` objects for rows ``start:stop`` of trade columns.
+
+    Only the trades table needs objects; everything else reads the columns.
+    """
+
+    window = slice(start, stop)
+    entry_times = pd.DatetimeIndex(columns["entry_ns"][window].view("datetime64[ns]")).to_pydatetime()
+    exit_times = pd.DatetimeIndex(columns["exit_ns"][window].view("datetime64[ns]")).to_pydatetime()
+    return [
+        NormalizedTrade(
+            ticker=ticker,
+            trade_number=int(number),
+            entry_time=entry_time,
+            exit_time=exit_time,
+            net_pnl=float(net_pnl),
+            position_size=float(position_size),
+            trade_return_pct=float(trade_return_pct),
+            runup=float(runup),
+            drawdown=float(drawdown),
+            direction=direction,
+        )
+        for number, entry_time, exit_time, net_pnl, position_size, trade_return_pct, runup, drawdown, direction in zip(
+            columns["trade_number"][window],
+            entry_times,
+            exit_times,
+            columns["net_pnl"][window],
+            columns["position_size"][window],
+            columns["trade_return_pct"][window],
+            columns["runup"][window],
+            columns["drawdown"][window],
+            DIRECTION_LABELS[columns["direction"][window]],
+        )
+    ]
+
+
+@dataclass
+class TradeFrame:
+    """Struct-of-arrays view of the trade fields the metrics need.
+
+    Frames built from index columns are views, so slicing a window copies nothing
+    but the derived durations; ``direction`` holds ``Direction`` codes.
+    """
+
+    net_pnl: np.ndarray
+    trade_return_pct: np.ndarray
+    duration_days: np.ndarray
+    direction: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.net_pnl)
+
+    @classmethod
+    def empty(cls) -> TradeFrame:
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.int8))
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray], start: int = 0, stop: int | None = None) -> TradeFrame:
+        window = slice(start, stop)
+        held_ns = columns["exit_ns"][window] - columns["entry_ns"][window]
+        return cls(
+            net_pnl=columns["net_pnl"][window],
+            trade_return_pct=columns["trade_return_pct"][window],
+            duration_days=np.maximum(held_ns / 86_400e9, 1e-9),
+            direction=columns["direction"][window],
+        )
+
+    @classmethod
+    def from_trades(cls, trades: Sequence[NormalizedTrade]) -> TradeFrame:
+        return cls(
+            net_pnl=np.fromiter((t.net_pnl for t in trades), dtype=float, count=len(trades)),
+            trade_return_pct=np.fromiter((t.trade_return_pct for t in trades), dtype=float, count=len(trades)),
+            duration_days=np.fromiter((t.duration_days for t in trades), dtype=float, count=len(trades)),
+            direction=direction_codes(np.array([t.direction for t in trades], dtype=object)),
+        )
+
+    @classmethod
+    def concat(cls, frames: Sequence[TradeFrame]) -> TradeFrame:
+        if not frames:
+            return cls.empty()
+        return cls(
+            net_pnl=np.concatenate([f.net_pnl for f in frames]),
+            trade_return_pct=np.concatenate([f.trade_return_pct for f in frames]),
+            duration_days=np.concatenate([f.duration_days for f in frames]),
+            direction=np.concatenate([f.direction for f in frames]),
+        )
+
+
+@dataclass
+class TradeStats:
+    total_trades: int = 0
+    winning_trades: int = 0
+    losing_trades: int = 0
+    total_pnl: float = 0.0
+    gross_profit: float = 0.0
+    gross_loss: float = 0.0
+    avg_pnl: float = 0.0
+    avg_win: float = 0.0
+    avg_loss: float = 0.0
+    avg_return: float = 0.0
+    largest_win: float = 0.0
+    largest_loss: float = 0.0
+    largest_win_pct: float = 0.0
+    largest_loss_pct: float = 0.0
+    avg_days: float = 0.0
+    avg_days_win: float = 0.0
+    avg_days_loss: float = 0.0
+    total_days: float = 0.0
+
+
+def trade_stats(frame: TradeFrame) -> TradeStats:
+    """Every per-trade aggregate the KPIs and report sections use, in one sweep.
+
+    Winners are ``net_pnl > 0`` and everything else is a loser. Each side is summed
+    on its own, never as a remainder of the column total, so break-even losers add
+    up to an exact zero gross loss (which profit factor treats specially).
+    """
+
+    total = len(frame)
+    if not total:
+        return TradeStats()
+    wins = frame.net_pnl > 0
+    winners = int(np.count_nonzero(wins))
+    losses = total - winners
+    total_pnl = float(frame.net_pnl.sum())
+    total_days = float(frame.duration_days.sum())
+    # Masking rather than weighting: 0 * NaN would turn a sum NaN for every trade.
+    win_pnl = float(np.where(wins, frame.net_pnl, 0.0).sum())
+    win_days = float(np.where(wins, frame.duration_days, 0.0).sum())
+    loss_pnl = float(np.where(wins, 0.0, frame.net_pnl).sum())
+    loss_days = float(np.where(wins, 0.0, frame.duration_days).sum())
+    return TradeStats(
+        total_trades=total,
+        winning_trades=winners,
+        losing_trades=losses,
+        total_pnl=total_pnl,
+        gross_profit=win_pnl,
+        gross_loss=loss_pnl,
+        avg_pnl=total_pnl / total,
+        avg_win=win_pnl / winners if winners else 0.0,
+        avg_loss=loss_pnl / losses if losses else 0.0,
+        avg_return=float(frame.trade_return_pct.sum()) / total,
+        largest_win=float(np.where(wins, frame.net_pnl, -np.inf).max()) if winners else 0.0,
+        largest_loss=float(np.where(wins, np.inf, frame.net_pnl).min()) if losses else 0.0,
+        largest_win_pct=float(np.where(wins, frame.trade_return_pct, -np.inf).max()) * 100 if winners else 0.0,
+        largest_loss_pct=float(np.where(wins, np.inf, frame.trade_return_pct).min()) * 100 if losses else 0.0,
+        avg_days=total_days / total,
+        avg_days_win=win_days / winners if winners else 0.0,
+        avg_days_loss=loss_days / losses if losses else 0.0,
+        total_days=total_days,
+    )
@@ -0,0 +1,84 @@
+"""Peak memory and time of daily alignment: wide resample/concat vs the step accumulator.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.align_daily --tickers 500 --years 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.services.portfolio import EquitySeries, _align_daily
+
+
+def legacy_align_daily(equity_series: Sequence[EquitySeries]) -> pd.Series:
+    frames = []
+    for series in equity_series:
+        s = series.equity.copy()
+        if s.empty:
+            continue
+        s.index = pd.to_datetime(s.index)
+        s = s.resample("B").ffill()
+        frames.append(s.rename(series.ticker))
+    if not frames:
+        return pd.Series(dtype=float)
+    combined = pd.concat(frames, axis=1, sort=True).ffill()
+    return combined.sum(axis=1)
+
+
+def synthetic_series(n_tickers: int, years: int, trades_per_year: int = 40, seed: int = 3) -> list[EquitySeries]:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2014-01-01 09:30")
+    span_minutes = years * 365 * 24 * 60
+    series = []
+    for index in range(n_tickers):
+        count = max(2, int(trades_per_year * years * rng.uniform(0.5, 1.5)))
+        # Tickers start and stop at different times so the calendar has gaps and overlaps.
+        offset = rng.integers(0, span_minutes // 4)
+        length = rng.integers(span_minutes // 4, span_minutes - offset)
+        stamps = start + pd.to_timedelta(np.sort(rng.integers(offset, offset + length, count)), unit="min")
+        values = 10_000 * np.cumprod(1 + rng.normal(0.001, 0.02, count))
+        equity = pd.Series(values, index=pd.DatetimeIndex(stamps))
+        series.append(EquitySeries(ticker=f"T{index}", equity=equity[~equity.index.duplicated()], trades=[]))
+    return series
+
+
+def measure(fn: Callable[[Sequence[EquitySeries]], pd.Series], data: Sequence[EquitySeries]) -> tuple[pd.Series, float, int]:
+    # Time and peak memory come from separate calls; tracing distorts timings badly.
+    started = time.perf_counter()
+    result = fn(data)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--tickers", type=int, default=200)
+    args.add_argument("--years", type=int, default=10)
+    options = args.parse_args()
+
+    data = synthetic_series(options.tickers, options.years)
+    expected, legacy_seconds, legacy_peak = measure(legacy_align_daily, data)
+    actual, seconds, peak = measure(_align_daily, data)
+
+    assert expected.index.equals(actual.index.as_unit(expected.index.unit)), "calendars differ"
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+    print(f"tickers={options.tickers} days={len(actual)}")
+    print(f"legacy      {legacy_seconds * 1000:9.1f} ms  peak {legacy_peak / 2**20:8.1f} MiB")
+    print(f"accumulator {seconds * 1000:9.1f} ms  peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
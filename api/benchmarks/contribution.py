@@ -0,0 +1,61 @@
+"""Time leave-one-out contribution analysis against evaluating the full portfolio alone.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.contribution --tickers 500 --days 2520
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.contribution import analyze_contributions
+
+
+def synthetic_unit_equity(days: int, tickers: int, seed: int = 5) -> np.ndarray:
+    """Compounded unit-capital equity per ticker, with staggered starts."""
+
+    rng = np.random.default_rng(seed)
+    equity = np.cumprod(1 + rng.normal(0.0003, 0.01, (days, tickers)), axis=0)
+    starts = rng.integers(0, days // 4, tickers)
+    equity[np.arange(days)[:, None] < starts] = 0.0
+    return equity
+
+
+def _timed(label: str, **options):
+    start = time.perf_counter()
+    result = analyze_contributions(**options)
+    print(f"{label:<16} {(time.perf_counter() - start) * 1000:10.1f} ms  ({len(result.variants)} portfolios)")
+    return result
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--tickers", type=int, default=500)
+    args.add_argument("--days", type=int, default=2_520)
+    args.add_argument("--subsets", type=int, default=16)
+    options = args.parse_args()
+
+    unit = synthetic_unit_equity(options.days, options.tickers)
+    tickers = [f"T{i}" for i in range(options.tickers)]
+    rng = np.random.default_rng(1)
+    subsets = [rng.choice(tickers, options.tickers // 2, replace=False).tolist() for _ in range(options.subsets)]
+    shared = dict(
+        tickers=tickers,
+        unit_equity=unit,
+        trades=np.full(options.tickers, 100.0),
+        pnl=rng.normal(0, 1_000, options.tickers),
+        calendar_ns=np.arange(options.days, dtype=np.int64),
+        total_capital=1_000_000.0,
+    )
+    print(f"tickers={options.tickers} days={options.days}")
+    _timed("full only", leave_one_out=False, **shared)
+    _timed("leave-one-out", leave_one_out=True, **shared)
+    _timed("+ subsets", leave_one_out=True, subsets=subsets, **shared)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Time the shared-capital event simulator on a large synthetic batch.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.event_simulator --tickers 1000 --trades 1000 --max-positions 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.simulator import EventSchedule, simulate_shared_capital
+from app.services.trades import TradeFrame
+
+DAY_NS = 86_400 * 10**9
+
+
+def synthetic_schedule(tickers: int, trades: int, seed: int = 11) -> EventSchedule:
+    """``trades`` back-to-back trades per ticker over roughly ten years."""
+
+    rng = np.random.default_rng(seed)
+    held = rng.integers(DAY_NS // 24, 5 * DAY_NS, (tickers, trades))
+    gaps = rng.integers(0, 3 * DAY_NS, (tickers, trades))
+    entry = np.cumsum(held + gaps, axis=1) - held
+    exit_ = entry + held
+    returns = rng.normal(0.001, 0.02, tickers * trades)
+    frame = TradeFrame(
+        net_pnl=returns * 10_000,
+        trade_return_pct=returns,
+        duration_days=held.ravel() / DAY_NS,
+        direction=np.zeros(tickers * trades, dtype=np.int8),
+    )
+    return EventSchedule.build(entry.ravel(), exit_.ravel(), returns, frame)
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--tickers", type=int, default=1_000)
+    args.add_argument("--trades", type=int, default=1_000)
+    args.add_argument("--max-positions", type=int, default=50)
+    options = args.parse_args()
+
+    start = time.perf_counter()
+    schedule = synthetic_schedule(options.tickers, options.trades)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = simulate_shared_capital(schedule, 1_000_000, options.max_positions)
+    simulate_seconds = time.perf_counter() - start
+
+    average, peak = result.exposure_pct()
+    events = 2 * schedule.trade_count
+    print(f"tickers={options.tickers} trades={schedule.trade_count} events={events}")
+    print(f"merge    {build_seconds * 1000:10.1f} ms")
+    print(f"simulate {simulate_seconds * 1000:10.1f} ms  ({simulate_seconds / events * 1e9:.0f} ns/event)")
+    print(f"taken={schedule.trade_count - result.skipped_trades} skipped={result.skipped_trades}")
+    print(f"max open={int(result.open_positions.max())} exposure avg={average:.1f}% max={peak:.1f}%")
+    print(f"final equity={result.equity.iloc[-1]:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
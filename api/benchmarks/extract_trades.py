@@ -0,0 +1,101 @@
+"""Compare the vectorized trade extraction against the original per-group loop.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.extract_trades --trades 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+from app.services.portfolio import NormalizedTrade, _extract_trades
+
+
+def legacy_extract_trades(ticker: str, df: pd.DataFrame) -> list[NormalizedTrade]:
+    trades: list[NormalizedTrade] = []
+    for trade_number, group in df.groupby("Trade #"):
+        group_sorted = group.sort_values("Date/Time")
+        entry_row = group_sorted.iloc[0]
+        exit_row = group_sorted.iloc[-1]
+        positions = group_sorted["Position size"].replace(0, np.nan).dropna()
+        position_size = float(positions.iloc[0]) if not positions.empty else 0.0
+        net_pnl = float(exit_row["Net P&L"])
+        runup = float(exit_row.get("Run-up", 0))
+        drawdown = float(exit_row.get("Drawdown", 0))
+        if position_size and abs(position_size) > 1e-9:
+            trade_return_pct = net_pnl / position_size
+        else:
+            position_size = abs(net_pnl) / max(abs(runup), abs(drawdown), 1e-6)
+            trade_return_pct = net_pnl / position_size if position_size else 0.0
+        trades.append(
+            NormalizedTrade(
+                ticker=ticker,
+                trade_number=int(trade_number),
+                entry_time=parser.parse(str(entry_row["Date/Time"])),
+                exit_time=parser.parse(str(exit_row["Date/Time"])),
+                net_pnl=net_pnl,
+                position_size=position_size,
+                trade_return_pct=trade_return_pct,
+                runup=runup,
+                drawdown=drawdown,
+                direction=str(exit_row.get("Type (Long/Short)", "Long")),
+            )
+        )
+    trades.sort(key=lambda t: t.exit_time)
+    return trades
+
+
+def synthetic_export(n_trades: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    entry = pd.Timestamp("2015-01-01 09:15") + pd.to_timedelta(np.arange(n_trades) * 90, unit="min")
+    exit_ = entry + pd.to_timedelta(rng.integers(5, 600, n_trades), unit="min")
+    pnl = rng.normal(20, 150, n_trades).round(2)
+    size = np.where(rng.random(n_trades) < 0.1, 0, rng.uniform(1_000, 20_000, n_trades).round(2))
+    frame = pd.DataFrame(
+        {
+            "Trade #": np.repeat(np.arange(1, n_trades + 1), 2),
+            "Type (Long/Short)": np.repeat(rng.choice(["Long", "Short"], n_trades), 2),
+            "Date/Time": np.column_stack([entry.strftime("%Y-%m-%d %H:%M"), exit_.strftime("%Y-%m-%d %H:%M")]).ravel(),
+            "Signal": np.tile(["Entry", "Exit"], n_trades),
+            "Price": rng.uniform(50, 500, 2 * n_trades).round(2),
+            "Position size": np.repeat(size, 2),
+            "Net P&L": np.repeat(pnl, 2),
+            "Run-up": np.repeat(np.abs(pnl) + 10, 2),
+            "Drawdown": np.repeat(-np.abs(pnl) - 5, 2),
+            "Cumulative P&L": np.repeat(pnl.cumsum(), 2),
+        }
+    )
+    # Exports list exits before entries; shuffle so the sort order matters.
+    return frame.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--trades", type=int, default=20_000)
+    options = args.parse_args()
+
+    df = synthetic_export(options.trades)
+
+    start = time.perf_counter()
+    expected = legacy_extract_trades("BENCH", df)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = _extract_trades("BENCH", df)
+    vectorized_seconds = time.perf_counter() - start
+
+    assert actual == expected, "vectorized extraction diverged from the legacy loop"
+    print(f"trades={options.trades} rows={len(df)}")
+    print(f"legacy     {legacy_seconds * 1000:10.1f} ms")
+    print(f"vectorized {vectorized_seconds * 1000:10.1f} ms")
+    print(f"speedup    {legacy_seconds / vectorized_seconds:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
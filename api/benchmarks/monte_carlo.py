@@ -0,0 +1,61 @@
+"""Time the Monte Carlo resampler inline and across a process pool.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.monte_carlo --paths 10000 --trades 5000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.services.montecarlo import TradeSchedule, run_monte_carlo
+
+DAY_NS = 86_400 * 10**9
+
+
+def synthetic_schedule(tickers: int, trades: int, seed: int = 11) -> TradeSchedule:
+    rng = np.random.default_rng(seed)
+    owner = rng.integers(0, tickers, trades)
+    return TradeSchedule(
+        returns=[rng.normal(0.002, 0.02, int((owner == i).sum())) for i in range(tickers)],
+        slots=[np.flatnonzero(owner == i) for i in range(tickers)],
+        times_ns=np.arange(trades + 1) * DAY_NS,
+        per_ticker_capital=100_000 / tickers,
+        total_capital=100_000,
+    )
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--paths", type=int, default=10_000)
+    args.add_argument("--trades", type=int, default=5_000)
+    args.add_argument("--tickers", type=int, default=50)
+    args.add_argument("--workers", type=int, default=4)
+    options = args.parse_args()
+
+    schedule = synthetic_schedule(options.tickers, options.trades)
+
+    start = time.perf_counter()
+    inline = run_monte_carlo(schedule, "bootstrap", options.paths, seed=1)
+    inline_seconds = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=options.workers) as executor:
+        run_monte_carlo(schedule, "bootstrap", options.workers, seed=1, executor=executor)  # start the workers
+        start = time.perf_counter()
+        pooled = run_monte_carlo(schedule, "bootstrap", options.paths, seed=1, executor=executor)
+        pooled_seconds = time.perf_counter() - start
+
+    assert np.array_equal(inline.metrics.final_equity, pooled.metrics.final_equity)
+    print(f"paths={options.paths} trades={options.trades} tickers={options.tickers}")
+    print(f"inline {inline_seconds * 1000:10.1f} ms")
+    print(f"pool   {pooled_seconds * 1000:10.1f} ms  ({options.workers} workers)")
+    print(f"final equity p5/p50/p95 {inline.percentiles(inline.metrics.final_equity)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare JSON and Arrow IPC encoding of run curves and trade rows.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.response_encoding --days 7800 --tickers 200 --trades 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from app.models.schemas import PortfolioRunResponse
+from app.services.columnar import RunCurves, encode_run, encode_run_json, stream_trades
+from app.services.downsample import build_pyramid
+from app.services.trade_index import BatchIndex, TickerIndex
+from app.services.trade_table import TradeQuery, iter_trade_columns, iter_trades
+
+from .extract_trades import synthetic_export
+
+
+def timed(fn: Callable[[], bytes], repeat: int = 3) -> tuple[bytes, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        best = min(best, time.perf_counter() - start)
+    return payload, best
+
+
+def report(label: str, payload: bytes, seconds: float) -> None:
+    print(f"{label:15} {seconds * 1000:9.1f} ms {len(payload) / 1024:10.1f} KiB {len(gzip.compress(payload, 6)) / 1024:10.1f} KiB gz")
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--days", type=int, default=7_800)
+    args.add_argument("--tickers", type=int, default=50)
+    args.add_argument("--trades", type=int, default=2_000)
+    options = args.parse_args()
+
+    rng = np.random.default_rng(5)
+    index = pd.bdate_range("1995-01-02", periods=options.days)
+    equity = pd.Series(100_000 + np.cumsum(rng.normal(10, 500, options.days)), index=index)
+    drawdown = equity - equity.cummax()
+
+    def json_run() -> bytes:
+        response = PortfolioRunResponse(
+            equityCurve=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in equity.items()],
+            buyHoldCurve=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in equity.items()],
+            drawdown=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in drawdown.items()],
+            kpis={},
+            sections={},
+        )
+        return response.model_dump_json().encode()
+
+    summary = {"kpis": {}, "sections": {}, "tradesCount": 0, "tradesCursor": None}
+    curves = RunCurves.from_series(equity, equity, drawdown)
+    pyramid = build_pyramid(curves.values())
+
+    print(f"curves: {options.days} business days x 3")
+    report("pydantic json", *timed(json_run))
+    report("orjson", *timed(lambda: encode_run_json(summary, RunCurves.from_series(equity, equity, drawdown))))
+    report("orjson 1000pts", *timed(lambda: encode_run_json(summary, curves, pyramid, 1000)))
+    report("arrow", *timed(lambda: encode_run(summary, RunCurves.from_series(equity, equity, drawdown), pyramid)))
+    report("arrow 1000pts", *timed(lambda: encode_run(summary, curves, pyramid, 1000)))
+
+    batch = BatchIndex([TickerIndex.build(f"T{i}", synthetic_export(options.trades, seed=i)) for i in range(options.tickers)])
+    query = TradeQuery(batch_id="bench")
+    print(f"trades: {options.tickers} tickers x {options.trades}")
+    report("ndjson", *timed(lambda: "".join(json.dumps(row) + "\n" for chunk in iter_trades(batch, query, 10_000) for row in chunk).encode(), 1))
+    report("arrow", *timed(lambda: b"".join(stream_trades(batch, iter_trade_columns(batch, query, 10_000))), 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure resident trade memory: legacy dataclass objects vs slotted objects vs columns.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.trade_memory --trades 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+
+from app.services.trades import extract_trade_columns, trades_from_columns
+
+from .extract_trades import synthetic_export
+
+
+@dataclass
+class LegacyTrade:
+    ticker: str
+    trade_number: int
+    entry_time: datetime
+    exit_time: datetime
+    net_pnl: float
+    position_size: float
+    trade_return_pct: float
+    runup: float
+    drawdown: float
+    direction: str
+
+
+FIELDS = [name for name in LegacyTrade.__dataclass_fields__ if name != "ticker"]
+
+
+def legacy_trades(ticker: str, columns: dict[str, np.ndarray]) -> list[LegacyTrade]:
+    """The pre-columnar layout: one ``__dict__``-backed object per trade."""
+
+    return [
+        LegacyTrade(ticker=ticker, **{field: getattr(trade, field) for field in FIELDS})
+        for trade in trades_from_columns(ticker, columns)
+    ]
+
+
+def retained_bytes(build: Callable[[], object]) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        value = build()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return value, retained
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--trades", type=int, default=500_000)
+    options = args.parse_args()
+
+    columns = extract_trade_columns(synthetic_export(options.trades))
+    # Copy the columns so the measurement owns every byte it reports.
+    owned, columnar = retained_bytes(lambda: {name: values.copy() for name, values in columns.items()})
+    _, slotted_bytes = retained_bytes(lambda: trades_from_columns("BENCH", owned))
+    _, legacy_bytes = retained_bytes(lambda: legacy_trades("BENCH", owned))
+
+    n = len(columns["net_pnl"])
+    print(f"trades={n}")
+    for label, size in (("legacy dataclass", legacy_bytes), ("slotted objects", slotted_bytes), ("columns", columnar)):
+        print(f"{label:17} {size / 2**20:9.1f} MiB {size / n:7.1f} B/trade")
+
+
+if __name__ == "__main__":
+    main()
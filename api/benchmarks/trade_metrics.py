@@ -0,0 +1,82 @@
+"""Compare the single-pass trade metrics kernel against the original list passes.
+
+Run from the ``api`` directory::
+
+    python -m benchmarks.trade_metrics --trades 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import statistics
+import time
+
+import numpy as np
+
+from app.services.trades import TradeFrame, TradeStats, direction_codes, trade_stats
+
+
+def legacy_stats(pnl: list[float], returns: list[float], days: list[float]) -> TradeStats:
+    trades = list(zip(pnl, returns, days))
+    wins = [t for t in trades if t[0] > 0]
+    losses = [t for t in trades if t[0] <= 0]
+    return TradeStats(
+        total_trades=len(trades),
+        winning_trades=len(wins),
+        losing_trades=len(losses),
+        total_pnl=sum(t[0] for t in trades),
+        gross_profit=sum(t[0] for t in wins),
+        gross_loss=sum(t[0] for t in losses),
+        avg_pnl=statistics.fmean(t[0] for t in trades),
+        avg_win=statistics.fmean(t[0] for t in wins) if wins else 0,
+        avg_loss=statistics.fmean(t[0] for t in losses) if losses else 0,
+        avg_return=statistics.fmean(t[1] for t in trades),
+        largest_win=max((t[0] for t in wins), default=0),
+        largest_loss=min((t[0] for t in losses), default=0),
+        largest_win_pct=max((t[1] for t in wins), default=0) * 100,
+        largest_loss_pct=min((t[1] for t in losses), default=0) * 100,
+        avg_days=statistics.fmean(t[2] for t in trades),
+        avg_days_win=statistics.fmean(t[2] for t in wins) if wins else 0,
+        avg_days_loss=statistics.fmean(t[2] for t in losses) if losses else 0,
+        total_days=sum(t[2] for t in trades),
+    )
+
+
+def synthetic_frame(n_trades: int, seed: int = 11) -> TradeFrame:
+    rng = np.random.default_rng(seed)
+    pnl = rng.normal(20, 150, n_trades).round(2)
+    return TradeFrame(
+        net_pnl=pnl,
+        trade_return_pct=pnl / rng.uniform(1_000, 20_000, n_trades),
+        duration_days=rng.uniform(0.01, 30, n_trades),
+        direction=direction_codes(np.where(rng.random(n_trades) < 0.5, "Long", "Short")),
+    )
+
+
+def main() -> None:
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--trades", type=int, default=1_000_000)
+    options = args.parse_args()
+
+    frame = synthetic_frame(options.trades)
+    columns = (frame.net_pnl.tolist(), frame.trade_return_pct.tolist(), frame.duration_days.tolist())
+
+    start = time.perf_counter()
+    expected = legacy_stats(*columns)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = trade_stats(frame)
+    kernel_seconds = time.perf_counter() - start
+
+    for name, value in vars(expected).items():
+        assert math.isclose(getattr(actual, name), value, rel_tol=1e-9, abs_tol=1e-6), name
+    print(f"trades={options.trades}")
+    print(f"legacy {legacy_seconds * 1000:10.1f} ms")
+    print(f"kernel {kernel_seconds * 1000:10.1f} ms")
+    print(f"speedup {legacy_seconds / kernel_seconds:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
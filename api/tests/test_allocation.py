@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.allocation import (
+    _project_simplex,
+    inverse_volatility,
+    max_sharpe,
+    risk_parity,
+    shrunk_covariance,
+)
+
+
+def _returns(days: int = 400, assets: int = 12, seed: int = 4) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (days, 1))
+    return 0.0005 + factor * rng.uniform(0.2, 1.5, assets) + rng.normal(0, 0.01, (days, assets)) * rng.uniform(0.5, 2, assets)
+
+
+def test_shrinkage_matches_per_observation_formula() -> None:
+    returns = _returns(days=60, assets=30)
+
+    covariance, shrinkage = shrunk_covariance(returns)
+
+    centred = returns - returns.mean(axis=0)
+    sample = centred.T @ centred / len(returns)
+    target = np.trace(sample) / sample.shape[0]
+    spread = np.mean([((np.outer(row, row) - sample) ** 2).sum() for row in centred]) / len(returns)
+    expected = min(1.0, spread / ((sample - target * np.eye(len(sample))) ** 2).sum())
+    assert shrinkage == pytest.approx(expected)
+    np.testing.assert_allclose(covariance, (1 - expected) * sample + expected * target * np.eye(len(sample)))
+    # Fewer days than assets: the sample covariance is singular, the shrunk one is not.
+    assert np.linalg.eigvalsh(covariance).min() > 0
+
+
+def test_risk_parity_equalizes_risk_contributions() -> None:
+    covariance, _ = shrunk_covariance(_returns())
+
+    weights = risk_parity(covariance)
+
+    contributions = weights * (covariance @ weights)
+    assert weights.sum() == pytest.approx(1)
+    np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-8)
+    # Less volatile assets carry more weight, as with inverse volatility.
+    assert np.corrcoef(weights, inverse_volatility(covariance))[0, 1] > 0.8
+
+
+def test_max_sharpe_matches_tangency_and_stays_long_only() -> None:
+    covariance = np.array([[0.04, 0.006, 0.0], [0.006, 0.09, 0.01], [0.0, 0.01, 0.16]])
+    mean = np.array([0.08, 0.10, 0.12])
+
+    weights = max_sharpe(mean, covariance)
+
+    tangency = np.linalg.solve(covariance, mean)
+    np.testing.assert_allclose(weights, tangency / tangency.sum(), atol=1e-6)
+
+    weights = max_sharpe(np.array([0.08, 0.10, -0.05]), covariance)
+    assert weights[2] == 0
+    assert weights.sum() == pytest.approx(1)
+    with pytest.raises(ValueError, match="positive mean"):
+        max_sharpe(-mean, covariance)
+
+
+def test_simplex_projection() -> None:
+    np.testing.assert_allclose(_project_simplex(np.array([0.5, 0.2, 0.3])), [0.5, 0.2, 0.3])
+    np.testing.assert_allclose(_project_simplex(np.array([2.0, 0.0, -1.0])), [1.0, 0.0, 0.0])
+    np.testing.assert_allclose(_project_simplex(np.array([0.6, 0.6, 0.0])), [0.5, 0.5, 0.0])
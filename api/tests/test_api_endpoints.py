@@ -2,27 +2,58 @@ import sys
 from pathlib import Path
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from api.app.core.config import settings
 from api.app.core.ratelimit import limiter
-from api.app.deps import get_backtest_service, get_feedback_service, get_user_service
+from api.app.deps import (
+    get_backtest_service,
+    get_backtest_workers,
+    get_current_user,
+    get_db_session,
+    get_feedback_service,
+    get_user_service,
+)
 from api.app.main import app
+from api.app.models import tables
+from api.app.models.base import Base
 
 
 @pytest.fixture()
-def client() -> TestClient:
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
     user_service = get_user_service()
     user_service.clear()
     user_service.seed_user(email="user@example.com", password="CorrectPassword123!", name="Demo User")
-    get_backtest_service().clear()
+    monkeypatch.setattr(settings, "backtest_jobs_url", f"sqlite:///{tmp_path / 'jobs.db'}")
+    get_backtest_service.cache_clear()
+    get_backtest_workers.cache_clear()
     get_feedback_service().clear()
     limiter.reset()
-    with TestClient(app) as test_client:
-        yield test_client
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:", future=True, poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+
+    def db_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_db_session] = db_session
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_db_session, None)
+        get_backtest_service.cache_clear()
+        get_backtest_workers.cache_clear()
 
 
 def test_register_user_success(client: TestClient) -> None:
@@ -73,7 +104,15 @@ def test_login_invalid_credentials(client: TestClient) -> None:
     assert response.json()["detail"] == "Invalid email or password"
 
 
+def _seed_batch(client: TestClient, batch_id: str = "batch-1", owner: str = "demo-user") -> None:
+    with next(client.app.dependency_overrides[get_db_session]()) as session:
+        session.add(tables.User(id=owner, plan="pro"))
+        session.add(tables.Batch(id=batch_id, user_id=owner, strategy_name="Momentum"))
+        session.commit()
+
+
 def test_backtest_creation_returns_id(client: TestClient) -> None:
+    _seed_batch(client)
     response = client.post(
         "/api/backtests",
         json={
@@ -82,6 +121,7 @@ def test_backtest_creation_returns_id(client: TestClient) -> None:
             "start_date": "2024-01-01",
             "end_date": "2024-02-01",
             "parameters": {"lookback": 14},
+            "batchId": "batch-1",
         },
     )
     assert response.status_code == 202
@@ -91,6 +131,76 @@ def test_backtest_creation_returns_id(client: TestClient) -> None:
     assert isinstance(payload["backtest_id"], str)
 
 
+def test_backtest_status_can_be_polled(client: TestClient) -> None:
+    _seed_batch(client)
+    created = client.post(
+        "/api/backtests",
+        json={
+            "strategy": "Momentum",
+            "symbols": ["AAPL"],
+            "start_date": "2024-01-01",
+            "end_date": "2024-02-01",
+            "batchId": "batch-1",
+        },
+    ).json()
+
+    response = client.get(f"/api/backtests/{created['backtest_id']}")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["backtest_id"] == created["backtest_id"]
+    assert payload["status"] in {"queued", "running", "failed"}
+
+    assert client.get("/api/backtests/missing").status_code == 404
+    # Jobs are visible to the user who queued them only.
+    other = client.get(f"/api/backtests/{created['backtest_id']}", headers={"X-User-Id": "someone-else"})
+    assert other.status_code == 404
+
+
+def test_backtest_requires_an_owned_batch(client: TestClient) -> None:
+    body = {"strategy": "Momentum", "symbols": ["AAPL"], "start_date": "2024-01-01", "end_date": "2024-02-01"}
+    _seed_batch(client, owner="owner")
+
+    missing = client.post("/api/backtests", json=body, headers={"X-User-Id": "owner"})
+    assert missing.status_code == 400
+    response = client.post("/api/backtests", json={**body, "batchId": "batch-1"}, headers={"X-User-Id": "intruder"})
+    assert response.status_code == 404
+    created = client.post("/api/backtests", json={**body, "batchId": "batch-1"}, headers={"X-User-Id": "owner"})
+    assert created.status_code == 202
+    assert get_backtest_service().get(created.json()["backtest_id"]).user_id == "owner"
+    # Rejected requests never reached the daily run quota.
+    with next(client.app.dependency_overrides[get_db_session]()) as session:
+        assert session.query(tables.UsageLog).filter_by(user_id="owner").one().runs == 1
+
+
+def test_monte_carlo_runs_count_against_the_daily_quota(client: TestClient) -> None:
+    headers = {"X-User-Id": "free-user", "X-User-Plan": "free"}
+    body = {"batchId": "missing", "totalCapital": 10_000}
+
+    assert client.post("/api/portfolio/montecarlo", json=body, headers=headers).status_code == 404
+    assert client.post("/api/portfolio/montecarlo", json=body, headers=headers).status_code == 402
+
+
+def test_contribution_runs_count_against_the_daily_quota(client: TestClient) -> None:
+    headers = {"X-User-Id": "free-user", "X-User-Plan": "free"}
+    body = {"batchId": "missing", "totalCapital": 10_000}
+
+    assert client.post("/api/portfolio/contribution", json=body, headers=headers).status_code == 404
+    assert client.post("/api/portfolio/contribution", json=body, headers=headers).status_code == 402
+
+
+def test_cache_stats_require_a_user(client: TestClient) -> None:
+    assert client.get("/api/portfolio/cache/stats").status_code == 200
+
+    def anonymous():
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    client.app.dependency_overrides[get_current_user] = anonymous
+    try:
+        assert client.get("/api/portfolio/cache/stats").status_code == 401
+    finally:
+        client.app.dependency_overrides.pop(get_current_user)
+
+
 def test_feedback_requires_message(client: TestClient) -> None:
     response = client.post("/api/feedback", json={"message": "Great product!", "rating": 5})
     assert response.status_code == 200
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models import tables
+from app.services.backtests import BacktestService, PermanentJobError, process_next
+
+
+@pytest.fixture()
+def service(tmp_path) -> BacktestService:
+    return BacktestService(f"sqlite:///{tmp_path / 'jobs.db'}", max_attempts=2, backoff_seconds=60)
+
+
+def _create(service: BacktestService, **overrides):
+    fields = {
+        "strategy": "Momentum",
+        "symbols": ["AAPL"],
+        "start_date": date(2024, 1, 1),
+        "end_date": date(2024, 2, 1),
+    }
+    fields.update(overrides)
+    return service.create(**fields)
+
+
+def test_job_lifecycle_is_shared_between_service_instances(service: BacktestService) -> None:
+    job = _create(service, batch_id="batch-1")
+    other_process_view = BacktestService(service.url)
+
+    assert other_process_view.get(job.id).status == "queued"
+
+    assert process_next(other_process_view, "worker-a", handler=lambda claimed: {"batch": claimed.batch_id})
+    finished = service.get(job.id)
+    assert finished.status == "succeeded"
+    assert finished.result == {"batch": "batch-1"}
+    assert finished.attempts == 1
+    assert not process_next(service, "worker-a", handler=lambda claimed: {})
+
+
+def test_failed_attempt_is_retried_with_backoff(service: BacktestService) -> None:
+    job = _create(service)
+
+    def flaky(_):
+        raise ConnectionError("storage unavailable")
+
+    assert process_next(service, "worker-a", handler=flaky)
+    retried = service.get(job.id)
+    assert retried.status == "queued"
+    assert retried.error == "storage unavailable"
+    # Backoff keeps the job invisible to workers until it is due again.
+    assert service.claim("worker-b") is None
+
+    with service._sessions() as session:
+        session.get(tables.BacktestJob, job.id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+
+    assert process_next(service, "worker-b", handler=flaky)
+    assert service.get(job.id).status == "failed"
+    assert service.get(job.id).attempts == 2
+
+
+def test_permanent_errors_fail_without_retry(service: BacktestService) -> None:
+    job = _create(service)
+
+    def missing_batch(_):
+        raise PermanentJobError("Batch not found")
+
+    process_next(service, "worker-a", handler=missing_batch)
+
+    failed = service.get(job.id)
+    assert failed.status == "failed"
+    assert failed.attempts == 1
+
+
+def test_job_with_expired_lease_can_be_reclaimed(service: BacktestService) -> None:
+    job = _create(service)
+    assert service.claim("worker-a").id == job.id
+    assert service.claim("worker-b") is None
+
+    with service._sessions() as session:
+        session.get(tables.BacktestJob, job.id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+
+    reclaimed = service.claim("worker-b")
+    assert reclaimed is not None and reclaimed.status == "running"
+
+
+def test_stale_worker_cannot_record_a_reclaimed_job(service: BacktestService) -> None:
+    job = _create(service)
+    service.claim("worker-a")
+    with service._sessions() as session:
+        session.get(tables.BacktestJob, job.id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+    service.claim("worker-b")
+
+    assert not service.complete(job.id, "worker-a", {"stale": True})
+    assert service.fail(job.id, "worker-a", "stale") is None
+    assert not service.renew(job.id, "worker-a")
+    assert service.complete(job.id, "worker-b", {"fresh": True})
+    finished = service.get(job.id)
+    assert (finished.status, finished.result, finished.attempts) == ("succeeded", {"fresh": True}, 1)
+
+
+def test_lease_is_renewed_while_a_job_runs(tmp_path) -> None:
+    service = BacktestService(f"sqlite:///{tmp_path / 'jobs.db'}", lease_seconds=0.3)
+    job = _create(service)
+    seen = []
+
+    def slow(_):
+        time.sleep(0.8)  # well past the original lease
+        seen.append(service.claim("worker-b"))
+        return {}
+
+    assert process_next(service, "worker-a", handler=slow)
+    assert seen == [None]
+    assert service.get(job.id).status == "succeeded"
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import errno
+import mmap
+import os
+
+from app.services.cache import ByteBudgetLRU, DiskCache
+
+
+def test_lru_evicts_least_recent_entries_over_budget() -> None:
+    cache: ByteBudgetLRU[str, str] = ByteBudgetLRU(max_bytes=10)
+    cache.put("a", "A", size=4)
+    cache.put("b", "B", size=4)
+    assert cache.get("a") == "A"
+
+    cache.put("c", "C", size=4)
+
+    assert "b" not in cache
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats.bytes == 8
+    assert stats.evictions == 1
+
+
+def test_lru_skips_entries_larger_than_budget_and_counts_lookups() -> None:
+    cache: ByteBudgetLRU[str, bytes] = ByteBudgetLRU(max_bytes=10)
+    cache.put("huge", b"x" * 11, size=11)
+
+    assert cache.get("huge") is None
+    assert cache.get("missing") is None
+    cache.put("small", b"x", size=1)
+    assert cache.get("small") == b"x"
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert stats.as_dict()["hit_rate"] == round(1 / 3, 4)
+
+
+def test_peek_neither_counts_nor_refreshes() -> None:
+    cache: ByteBudgetLRU[str, str] = ByteBudgetLRU(max_bytes=8)
+    cache.put("a", "A", size=4)
+    cache.put("b", "B", size=4)
+
+    assert cache.peek("a") == "A"
+    assert cache.peek("missing") is None
+    cache.put("c", "C", size=4)
+
+    assert "a" not in cache
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (0, 0)
+
+
+def test_fifo_policy_ignores_hits_when_evicting() -> None:
+    cache: ByteBudgetLRU[str, str] = ByteBudgetLRU(max_bytes=8, policy="fifo")
+    cache.put("a", "A", size=4)
+    cache.put("b", "B", size=4)
+    assert cache.get("a") == "A"
+
+    cache.put("c", "C", size=4)
+
+    assert "a" not in cache
+    assert "b" in cache
+
+
+def test_disk_cache_maps_files_and_evicts_over_budget(tmp_path) -> None:
+    cache = DiskCache(tmp_path, max_bytes=10)
+    cache.put("batch/a.csv", b"aaaa")
+    cache.put("batch/b.csv", b"bbbb")
+    mapped = cache.get("batch/a.csv")
+    assert isinstance(mapped, mmap.mmap) and mapped[:] == b"aaaa"
+
+    cache.put("batch/c.csv", b"cccc")
+
+    assert cache.get("batch/b.csv") is None
+    assert mapped[:] == b"aaaa"  # maps outlive eviction
+    stats = cache.stats()
+    assert (stats.entries, stats.bytes, stats.evictions) == (2, 8, 1)
+
+    # A new process finds the surviving files again.
+    reopened = DiskCache(tmp_path, max_bytes=10)
+    assert reopened.get("batch/c.csv")[:] == b"cccc"
+    assert reopened.stats().bytes == 8
+
+
+def test_disk_cache_skips_writes_the_disk_refuses(tmp_path, monkeypatch) -> None:
+    cache = DiskCache(tmp_path, max_bytes=10)
+
+    def full(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", full)
+    cache.put("batch/a.csv", b"aaaa")
+
+    assert cache.get("batch/a.csv") is None
+    assert cache.stats().bytes == 0
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []  # no temp file left behind
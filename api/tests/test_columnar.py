@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.models.schemas import PortfolioRunResponse
+from app.services.columnar import RUN_METADATA_KEY, RunCurves, encode_run, encode_run_json, stream_trades
+from app.services.downsample import build_pyramid, select_points
+from app.services.trade_index import BatchIndex, TickerIndex
+from app.services.trade_table import TradeQuery, iter_trade_columns, iter_trades
+
+
+def _trades(rows: list[tuple[int, str, str, float]]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"Trade #": number, "Type (Long/Short)": side, "Date/Time": when, "Position size": 1000, "Net P&L": pnl,
+             "Run-up": 0, "Drawdown": 0}
+            for number, side, when, pnl in rows
+        ]
+    )
+
+
+def test_run_stream_round_trips_curves_and_kpis() -> None:
+    index = pd.bdate_range("2020-01-01", periods=2_000)
+    equity = pd.Series(1_000 + np.cumsum(np.random.default_rng(2).normal(size=2_000)), index=index)
+    drawdown = equity - equity.cummax()
+    curves = RunCurves.from_series(equity, equity, drawdown)
+    response = PortfolioRunResponse(
+        equityCurve=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in equity.items()],
+        buyHoldCurve=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in equity.items()],
+        drawdown=[{"timestamp": ts.to_pydatetime(), "value": float(v)} for ts, v in drawdown.items()],
+        kpis={"total_trades": 7},
+        sections={},
+        tradesCount=7,
+    )
+
+    summary = {"kpis": {"total_trades": 7}, "sections": {}, "tradesCount": 7, "tradesCursor": None}
+    table = pa.ipc.open_stream(encode_run(summary, curves, {})).read_all()
+    assert table.column_names == ["timestamp", "equity", "buyHold", "drawdown"]
+    assert table.num_rows == 2_000
+    np.testing.assert_array_equal(table["equity"].to_numpy(), equity.to_numpy())
+    assert pd.Timestamp(table["timestamp"][0].as_py()) == index[0]
+    assert b'"tradesCount":7' in table.schema.metadata[RUN_METADATA_KEY]
+
+    rebuilt = RunCurves.from_response(response)
+    np.testing.assert_array_equal(rebuilt.timestamp_ns, curves.timestamp_ns)
+    reduced = pa.ipc.open_stream(encode_run(summary, curves, build_pyramid(curves.values()), points=100)).read_all()
+    assert 100 <= reduced.num_rows <= 300
+
+
+def test_run_json_conforms_to_response_schema() -> None:
+    index = pd.bdate_range("2020-01-01", periods=1_500)
+    equity = pd.Series(1_000 + np.cumsum(np.random.default_rng(4).normal(size=1_500)), index=index)
+    equity.iloc[10] = np.nan
+    drawdown = equity - equity.cummax()
+    curves = RunCurves.from_series(equity, equity * 1.5, drawdown)
+    summary = {
+        "kpis": {"total_trades": 3, "profit_factor": None, "total_pnl": 1234.5678901234},
+        "sections": {"overview": {"title": "Overview", "metrics": [{"label": "Ratio", "value": 1e-7}, {"label": "Trades", "value": 3}]}},
+        "tradesCount": 3,
+        "tradesCursor": "abc",
+    }
+    pyramid = build_pyramid(curves.values())
+
+    body = encode_run_json(summary, curves, pyramid)
+    response = PortfolioRunResponse.model_validate_json(body)
+    assert response.model_dump_json().encode() == body
+    assert response.equityCurve[10].value is None
+
+    reduced = encode_run_json(summary, curves, pyramid, points=100)
+    expected = response.model_copy(
+        update={
+            curve: [getattr(response, curve)[i] for i in select_points(values, pyramid, curve, 100)]
+            for curve, values in curves.values().items()
+        }
+    )
+    assert PortfolioRunResponse.model_validate_json(reduced).model_dump_json().encode() == reduced
+    assert reduced == expected.model_dump_json().encode()
+
+
+def test_trade_stream_matches_json_rows() -> None:
+    batch = BatchIndex(
+        [
+            TickerIndex.build("AAA", _trades([(1, "Long", "2024-01-02 09:30", 5.0), (1, "Long", "2024-01-03 15:00", 5.0),
+                                              (2, "Short", "2024-01-04 09:30", -3.0), (2, "Short", "2024-01-05 15:00", -3.0)])),
+            TickerIndex.build("BBB", _trades([(1, "Long", "2024-01-02 10:00", 2.0), (1, "Long", "2024-01-04 15:00", 2.0)])),
+        ]
+    )
+    query = TradeQuery(batch_id="b", sort="netPnl", descending=True)
+    payload = b"".join(stream_trades(batch, iter_trade_columns(batch, query, chunk_size=2)))
+    table = pa.ipc.open_stream(payload).read_all()
+    expected = [row for chunk in iter_trades(batch, query) for row in chunk]
+
+    assert table.num_rows == 3
+    assert table["ticker"].to_pylist() == [row["ticker"] for row in expected] == ["AAA", "BBB", "AAA"]
+    assert table["direction"].to_pylist() == [row["direction"] for row in expected]
+    assert table["netPnl"].to_pylist() == [row["netPnl"] for row in expected]
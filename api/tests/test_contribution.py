@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.contribution import VariantPlan, bucket_drawdowns, curve_kpis
+from app.services.portfolio import _sharpe_ratio, _sortino_ratio, _summarize_metrics
+from app.services.trades import TradeStats
+
+
+def _curves(days: int = 300, width: int = 4, seed: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    curves = 10_000 * np.cumprod(1 + rng.normal(0.0005, 0.015, (days, width)), axis=0)
+    curves[:40, 1] = 0.0  # starts late, like a subset without the earliest tickers
+    return curves
+
+
+def test_curve_kpis_match_run_kpis_per_column() -> None:
+    curves = _curves()
+
+    kpis, drawdown = curve_kpis(curves)
+
+    for column in range(curves.shape[1]):
+        values = pd.Series(curves[:, column])
+        expected = _summarize_metrics(TradeStats(), values[values != 0], "USD")
+        assert kpis["total_return_pct"][column] == pytest.approx(expected["total_return_pct"])
+        assert kpis["max_drawdown_pct"][column] == pytest.approx(expected["max_drawdown_pct"])
+        assert kpis["max_drawdown_abs"][column] == pytest.approx(expected["max_drawdown_abs"])
+        assert kpis["sharpe"][column] == pytest.approx(_sharpe_ratio(values))
+        assert kpis["sortino"][column] == pytest.approx(_sortino_ratio(values))
+    assert np.isnan(drawdown[:40, 1]).all()
+    np.testing.assert_allclose(drawdown[:, 0], (curves[:, 0] / np.maximum.accumulate(curves[:, 0]) - 1) * 100)
+
+
+def test_variant_plan_sums_each_variants_tickers() -> None:
+    tickers = ["A", "B", "C", "D"]
+    values = np.random.default_rng(2).normal(size=(5, 4))
+
+    plan = VariantPlan.build(tickers, [["B", "D"], ["C"]], leave_one_out=True)
+
+    sums = plan.sums(values)
+    variants = plan.variants()
+    assert [variant.kind for variant in variants] == ["full", *["leaveOneOut"] * 4, "subset", "subset"]
+    for column, variant in enumerate(variants):
+        held = [tickers.index(ticker) for ticker in variant.tickers]
+        np.testing.assert_allclose(sums[:, column], values[:, held].sum(axis=1))
+    assert variants[2].excluded == "B"
+    assert len(VariantPlan.build(["A"], [], leave_one_out=True).variants()) == 1
+    with pytest.raises(ValueError, match="not in the batch"):
+        VariantPlan.build(tickers, [["A", "Z"]], leave_one_out=False)
+
+
+def test_bucketed_drawdowns_keep_each_trough() -> None:
+    calendar = np.arange(10, dtype=np.int64)
+    drawdown = np.array([[np.nan, 0], [np.nan, -1], [0, -5], [-2, 0], [-1, -1], [0, 0], [-7, 0], [0, -3], [0, 0], [-1, 0]])
+
+    stamps, buckets = bucket_drawdowns(calendar, drawdown, 4)
+
+    np.testing.assert_array_equal(stamps, [0, 2, 5, 7])
+    np.testing.assert_array_equal(buckets, [[np.nan, -1], [-2, -5], [-7, 0], [-1, -3]])
+    assert bucket_drawdowns(calendar, drawdown, None)[1] is drawdown
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.models.schemas import PortfolioRunResponse
+from app.services.columnar import RunCurves
+from app.services.downsample import build_pyramid, lttb, select_points
+from app.services.portfolio import CachedRun
+
+
+def test_lttb_keeps_endpoints_and_spikes() -> None:
+    y = np.sin(np.linspace(0, 20, 5_000))
+    y[1234] = 50.0
+    y[3210] = -50.0
+    kept = lttb(np.arange(len(y)), y, 200)
+
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert {1234, 3210} <= set(kept.tolist())
+
+
+def test_lttb_skips_non_finite_values() -> None:
+    y = np.arange(100, dtype=float)
+    y[10:20] = np.nan
+    kept = lttb(np.arange(100), y, 10)
+    assert np.isfinite(y[kept]).all()
+
+
+def test_downsample_uses_pyramid_and_point_budget() -> None:
+    index = pd.bdate_range("2000-01-03", periods=6_000)
+    equity = pd.Series(np.cumsum(np.random.default_rng(1).normal(size=6_000)) + 1_000, index=index)
+    curves = RunCurves.from_series(equity, equity, equity - equity.cummax())
+    pyramid = build_pyramid(curves.values())
+
+    assert sorted(pyramid, key=int) == ["250", "1000", "4000"]
+    assert len(pyramid["1000"]["equityCurve"]) == 1000
+    kept = select_points(curves.equity, pyramid, "equityCurve", 600)
+    assert len(kept) == 600
+    assert set(kept.tolist()) <= set(pyramid["1000"]["equityCurve"])
+
+    run = CachedRun.build({"kpis": {}, "sections": {}, "tradesCount": 0, "tradesCursor": None}, curves, pyramid)
+    reduced = PortfolioRunResponse.model_validate_json(run.json(600))
+    assert len(reduced.equityCurve) == 600
+    assert reduced.equityCurve[0] == run.response.equityCurve[0]
+    assert reduced.equityCurve[-1] == run.response.equityCurve[-1]
+    assert run.json(None) is run.body
+    assert len(PortfolioRunResponse.model_validate_json(run.json(10_000)).drawdown) == 6_000
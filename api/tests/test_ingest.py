@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import pandas as pd
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 
+from app.models import tables
+from app.models.base import Base
 from app.services import ingest
+from app.services.artifacts import decode_trades_frame, trades_artifact_key
+from app.services.storage import StorageService
 
 
 def test_normalize_columns_tradingview_export_headers() -> None:
@@ -30,3 +40,186 @@ def test_normalize_columns_tradingview_export_headers() -> None:
 
     for column in ingest.REQUIRED_COLUMNS:
         assert column in normalized.columns
+
+
+class _MemoryClient:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.puts = 0
+
+    def list_buckets(self):
+        return {"Buckets": [{"Name": "bucket"}]}
+
+    def put_object(self, Bucket: str, Key: str, Body, ContentType: str = "text/csv"):
+        self.puts += 1
+        self.objects[Key] = Body.read()
+
+    def delete_object(self, Bucket: str, Key: str):
+        del self.objects[Key]
+
+
+@pytest.fixture()
+def client(monkeypatch) -> _MemoryClient:
+    client = _MemoryClient()
+    monkeypatch.setattr(ingest, "storage_service", StorageService(client=client, bucket="bucket"))
+    return client
+
+
+@pytest.fixture()
+def session() -> Session:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(tables.User(id="u"))
+        session.flush()
+        yield session
+
+
+def _export(rows: int) -> bytes:
+    lines = [",".join(ingest.REQUIRED_COLUMNS) + ",Comment"]
+    for number in range(1, rows + 1):
+        # The optional comment column is empty for the first rows only.
+        comment = "late" if number > 4 else ""
+        for signal, when in (("Entry", "2024-01-02 09:30"), ("Exit", "2024-01-03 15:00")):
+            lines.append(f"{number},Long,{when},{signal},100,1000,5,6,-2,{5 * number},{comment}")
+    lines.append(lines[-1])  # duplicated leg
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _upload(payload: bytes, ticker: str = "AAA") -> UploadFile:
+    return UploadFile(file=io.BytesIO(payload), filename=f"Demo_{ticker}_2024-01-01.csv")
+
+
+def test_ingest_streams_chunks_to_storage(monkeypatch, client: _MemoryClient, session: Session) -> None:
+    monkeypatch.setattr(ingest.settings, "ingest_chunk_rows", 3)
+    payload = _export(5)
+
+    batch, reports = ingest.ingest_files(session, session.get(tables.User, "u"), [_upload(payload)])
+
+    (record,) = batch.files
+    assert client.objects[record.object_key] == payload
+    assert record.content_sha256 == hashlib.sha256(payload).hexdigest()
+    assert reports[0].rows_parsed == 10
+    artifact = decode_trades_frame(client.objects[record.artifact_key])
+    expected = ingest.normalize_columns(pd.read_csv(io.BytesIO(payload)))
+    pd.testing.assert_frame_equal(artifact, expected, check_dtype=False)
+    assert artifact.dtypes.to_dict() == expected.dtypes.to_dict()
+    assert batch.strategy_name == "Demo"
+
+
+def test_ingest_reads_columns_that_turn_to_text_in_later_chunks(monkeypatch, client: _MemoryClient, session: Session) -> None:
+    monkeypatch.setattr(ingest.settings, "ingest_chunk_rows", 4)
+    lines = _export(5).decode().splitlines()
+    # Position size parses as int64 in the first chunk and as text once thousands separators appear.
+    lines[7:] = [line.replace(",1000,", ',"1,000.5",') for line in lines[7:]]
+    payload = ("\n".join(lines) + "\n").encode()
+
+    batch, _ = ingest.ingest_files(session, session.get(tables.User, "u"), [_upload(payload)])
+
+    artifact = decode_trades_frame(client.objects[batch.files[0].artifact_key])
+    expected = ingest.normalize_columns(pd.read_csv(io.BytesIO(payload)))
+    assert not pd.api.types.is_numeric_dtype(expected["Position size"])
+    pd.testing.assert_frame_equal(artifact, expected, check_dtype=False)
+    assert artifact["Position size"].tolist() == expected["Position size"].tolist()
+
+
+def test_ingest_rejects_bad_headers_before_storing(client: _MemoryClient, session: Session) -> None:
+    upload = _upload(b"Trade #,Signal\n1,Entry\n")
+
+    with pytest.raises(ValueError, match="Missing required columns"):
+        ingest.ingest_files(session, session.get(tables.User, "u"), [upload])
+    assert client.objects == {}
+
+
+def test_ingest_keeps_upload_order_and_fails_atomically(monkeypatch, client: _MemoryClient, session: Session) -> None:
+    monkeypatch.setattr(ingest.settings, "ingest_workers", 4)
+    user = session.get(tables.User, "u")
+    tickers = [f"T{i}" for i in range(8)]
+
+    _, reports = ingest.ingest_files(session, user, [_upload(_export(i + 1), t) for i, t in enumerate(tickers)])
+
+    assert [report.ticker for report in reports] == tickers
+    assert [report.rows_parsed for report in reports] == [2 * (i + 1) for i in range(8)]
+    assert len(client.objects) == 16
+    session.rollback()
+    client.objects.clear()
+
+    broken = [_upload(_export(10 + i), t) for i, t in enumerate(tickers)]
+    broken[5] = _upload(b"Trade #\n1\n", "BAD")
+    with pytest.raises(ValueError, match="Missing required columns"):
+        ingest.ingest_files(session, user, broken)
+    assert client.objects == {}
+    assert session.query(tables.UploadFileRecord).count() == 0
+
+
+def test_identical_uploads_share_objects_until_released(client: _MemoryClient, session: Session) -> None:
+    user = session.get(tables.User, "u")
+    payload = _export(3)
+
+    first, _ = ingest.ingest_files(session, user, [_upload(payload, "AAA"), _upload(payload, "BBB")])
+    puts = client.puts
+    second, reports = ingest.ingest_files(session, user, [_upload(payload, "AAA")])
+
+    assert client.puts == puts == 2  # one CSV and one artifact
+    assert reports[0].rows_parsed == 6
+    assert {record.object_key for record in first.files + second.files} == {ingest.content_object_key(hashlib.sha256(payload).hexdigest())}
+    stored = session.get(tables.StoredObject, hashlib.sha256(payload).hexdigest())
+    assert stored.ref_count == 3
+
+    with pytest.raises(LookupError):
+        ingest.delete_batch(session, tables.User(id="other"), first.id)
+    assert ingest.delete_batch(session, user, first.id) == []
+    session.refresh(stored)
+    assert stored.ref_count == 1
+    released = ingest.delete_batch(session, user, second.id)
+    assert sorted(released) == sorted([stored.object_key, stored.artifact_key])
+    assert session.get(tables.StoredObject, stored.content_sha256) is None
+
+
+def test_ingest_does_not_pin_content_being_released(client: _MemoryClient, session: Session) -> None:
+    user = session.get(tables.User, "u")
+    payload = _export(3)
+    content_sha256 = hashlib.sha256(payload).hexdigest()
+    # A concurrent delete_batch has dropped the last reference but not yet removed the row.
+    session.add(tables.StoredObject(
+        content_sha256=content_sha256,
+        object_key=ingest.content_object_key(content_sha256),
+        artifact_key=trades_artifact_key(ingest.content_object_key(content_sha256)),
+        size_bytes=1,
+        rows_parsed=1,
+        ref_count=0,
+    ))
+    session.flush()
+
+    batch, reports = ingest.ingest_files(session, user, [_upload(payload)])
+
+    # The content is written again rather than referenced from the row being released.
+    assert client.puts == 2
+    assert reports[0].rows_parsed == 6
+    stored = session.get(tables.StoredObject, content_sha256)
+    session.refresh(stored)
+    assert stored.ref_count == 1
+    assert ingest.is_referenced(session, batch.files[0].object_key)
+    assert sorted(ingest.delete_batch(session, user, batch.id)) == sorted([stored.object_key, stored.artifact_key])
+    assert not ingest.is_referenced(session, batch.files[0].object_key)
+
+
+def test_released_objects_are_swept_after_the_grace_period(client: _MemoryClient, session: Session) -> None:
+    user = session.get(tables.User, "u")
+    payload = _export(3)
+    first, _ = ingest.ingest_files(session, user, [_upload(payload)])
+    keys = sorted(client.objects)
+
+    assert sorted(ingest.delete_batch(session, user, first.id)) == keys
+    assert ingest.sweep_released(session, grace_seconds=60) == []
+    assert sorted(client.objects) == keys
+
+    # Storing the same content again takes its keys back from the sweep.
+    second, _ = ingest.ingest_files(session, user, [_upload(payload)])
+    assert ingest.sweep_released(session, grace_seconds=0) == []
+    assert sorted(client.objects) == keys
+
+    ingest.delete_batch(session, user, second.id)
+    assert sorted(ingest.sweep_released(session, grace_seconds=0)) == keys
+    assert client.objects == {}
+    assert session.query(tables.PendingDelete).count() == 0
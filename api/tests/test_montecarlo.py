@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.schemas import MonteCarloRequest
+from app.services.montecarlo import TradeSchedule, run_monte_carlo
+from app.services.trade_index import BatchIndex, TickerIndex
+
+DAY_NS = 86_400 * 10**9
+
+
+def _ticker(name: str, trades: list[tuple[str, str, float]]) -> TickerIndex:
+    rows = []
+    for number, (entry, exit_, pnl) in enumerate(trades, start=1):
+        for stamp in (entry, exit_):
+            rows.append({
+                "Trade #": number, "Type (Long/Short)": "Long", "Date/Time": f"{stamp} 09:30", "Signal": "x",
+                "Price": 100, "Position size": 10_000, "Net P&L": pnl, "Run-up": 0, "Drawdown": 0, "Cumulative P&L": 0,
+            })
+    return TickerIndex.build(name, pd.DataFrame(rows))
+
+
+def _random_schedule(tickers: int = 6, trades: int = 40) -> TradeSchedule:
+    rng = np.random.default_rng(7)
+    exits = np.sort(rng.choice(np.arange(1, 10_000), tickers * trades, replace=False)) * DAY_NS
+    owner = rng.permutation(tickers * trades) % tickers
+    return TradeSchedule(
+        returns=[rng.normal(0.001, 0.03, trades) for _ in range(tickers)],
+        slots=[np.flatnonzero(owner == i) for i in range(tickers)],
+        times_ns=np.concatenate(([0], exits)),
+        per_ticker_capital=10_000 / tickers,
+        total_capital=10_000,
+    )
+
+
+def test_schedule_places_window_trades_on_exit_timeline() -> None:
+    index = BatchIndex([
+        _ticker("AAA", [("2024-01-02", "2024-01-05", 200), ("2024-02-01", "2024-02-10", -300)]),
+        _ticker("BBB", [("2024-01-03", "2024-01-08", 100), ("2024-03-01", "2024-03-04", 500)]),
+    ])
+
+    schedule = TradeSchedule.from_index(index, None, datetime(2024, 2, 28), 20_000)
+
+    assert schedule.trade_count == 3
+    np.testing.assert_allclose(schedule.returns[0], [0.02, -0.03])
+    assert [slots.tolist() for slots in schedule.slots] == [[0, 2], [1]]
+    assert schedule.times_ns[0] == pd.Timestamp("2024-01-02 09:30").value
+    assert schedule.per_ticker_capital == 10_000
+    with pytest.raises(ValueError, match="No trades"):
+        TradeSchedule.from_index(index, datetime(2025, 1, 1), None, 20_000)
+
+
+def test_fixed_path_metrics() -> None:
+    # Shuffling identical returns leaves a single possible path.
+    schedule = TradeSchedule(
+        returns=[np.full(2, -0.1), np.full(2, 0.2)],
+        slots=[np.array([0, 1]), np.array([2, 3])],
+        times_ns=np.array([0, 1, 3, 6, 10]) * DAY_NS,
+        per_ticker_capital=1_000,
+        total_capital=2_000,
+    )
+
+    result = run_monte_carlo(schedule, "shuffle", 3, seed=1)
+
+    # Equity: 2000 -> 1900 -> 1810 -> 2010 -> 2250.
+    np.testing.assert_allclose(result.metrics.final_equity, 2_250)
+    np.testing.assert_allclose(result.metrics.max_drawdown_pct, (1_810 / 2_000 - 1) * 100)
+    np.testing.assert_allclose(result.metrics.recovery_days, 3)
+    assert result.probability_of_loss == 0
+
+
+def test_seeded_runs_repeat_across_executors_and_chunking() -> None:
+    schedule = _random_schedule()
+
+    inline = run_monte_carlo(schedule, "bootstrap", 500, seed=42, chunk_bytes=64 * 1024)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        pooled = run_monte_carlo(schedule, "bootstrap", 500, seed=42, executor=executor, chunk_bytes=64 * 1024)
+    one_chunk = run_monte_carlo(schedule, "bootstrap", 500, seed=42)
+    unseeded = run_monte_carlo(schedule, "bootstrap", 500)
+
+    np.testing.assert_array_equal(inline.metrics.final_equity, pooled.metrics.final_equity)
+    np.testing.assert_array_equal(inline.metrics.recovery_days, pooled.metrics.recovery_days)
+    assert len(one_chunk.metrics.final_equity) == 500
+    assert not np.array_equal(inline.metrics.final_equity, one_chunk.metrics.final_equity)
+    repeat = run_monte_carlo(schedule, "bootstrap", 500, seed=unseeded.seed)
+    np.testing.assert_array_equal(repeat.metrics.max_drawdown_pct, unseeded.metrics.max_drawdown_pct)
+
+
+def test_shuffle_keeps_final_equity_and_varies_drawdown() -> None:
+    schedule = _random_schedule()
+    expected = schedule.total_capital + sum(
+        schedule.per_ticker_capital * (np.prod(1 + returns) - 1) for returns in schedule.returns
+    )
+
+    result = run_monte_carlo(schedule, "shuffle", 200, seed=3)
+
+    np.testing.assert_allclose(result.metrics.final_equity, expected)
+    assert np.ptp(result.metrics.max_drawdown_pct) > 0
+    assert (result.metrics.max_drawdown_pct <= 0).all()
+    percentiles = result.percentiles(result.metrics.max_drawdown_pct)
+    assert list(percentiles) == ["p5", "p25", "p50", "p75", "p95"]
+    assert sorted(percentiles.values()) == list(percentiles.values())
+
+
+def test_path_count_is_capped() -> None:
+    limit = settings.montecarlo_max_paths
+
+    assert MonteCarloRequest(batchId="b", totalCapital=1, paths=limit).paths == limit
+    with pytest.raises(ValidationError):
+        MonteCarloRequest(batchId="b", totalCapital=1, paths=limit + 1)
+    with pytest.raises(ValidationError):
+        MonteCarloRequest(batchId="b", totalCapital=1, paths=10**9)
+    with pytest.raises(ValueError, match="paths per request"):
+        run_monte_carlo(_random_schedule(), "bootstrap", limit + 1)
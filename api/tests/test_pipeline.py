@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.services.pipeline import run_pipeline
+
+
+def _square(item: int, payload: int) -> int:
+    return item * payload
+
+
+def test_pipeline_preserves_order_and_overlaps_fetches() -> None:
+    delays = [0.2, 0.05, 0.15, 0.0, 0.1]
+
+    def fetch(index: int) -> int:
+        time.sleep(delays[index])
+        return index
+
+    results, timings = run_pipeline(list(range(len(delays))), fetch, lambda item, payload: item + payload, io_workers=8)
+
+    assert results == [0, 2, 4, 6, 8]
+    assert timings.wall_seconds < sum(delays)
+    assert timings.as_dict()["files"] == len(delays)
+
+
+def test_pipeline_bounds_items_in_flight() -> None:
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fetch(item: int) -> int:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        return item
+
+    def process(item: int, payload: int) -> int:
+        nonlocal active
+        with lock:
+            active -= 1
+        return payload
+
+    results, _ = run_pipeline(list(range(20)), fetch, process, io_workers=8, max_in_flight=3)
+
+    assert results == list(range(20))
+    assert peak <= 3
+
+
+def test_pipeline_runs_processing_on_process_pool() -> None:
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        results, _ = run_pipeline([1, 2, 3], lambda item: item + 1, _square, cpu_executor=pool)
+
+    assert results == [2, 6, 12]
+
+
+def test_pipeline_propagates_failures() -> None:
+    def fetch(item: int) -> int:
+        if item == 2:
+            raise ValueError("bad file")
+        return item
+
+    with pytest.raises(ValueError, match="bad file"):
+        run_pipeline([1, 2, 3], fetch, lambda item, payload: payload)
@@ -5,8 +5,10 @@ from datetime import datetime
 from pathlib import Path
 import sys
 
+import numpy as np
 import pandas as pd
 import pytest
+from fastapi import UploadFile
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
@@ -16,9 +18,9 @@ if str(ROOT) not in sys.path:
 
 from api.app.models.base import Base
 from api.app.models import tables
-from api.app.services import portfolio
+from api.app.services import allocation, contribution, ingest, portfolio
 from api.app.services.portfolio import NormalizedTrade, _annualized_metrics
-from api.app.models.schemas import PortfolioRunRequest
+from api.app.models.schemas import AllocationRequest, PortfolioRunRequest
 
 
 @pytest.fixture()
@@ -38,6 +40,8 @@ def in_memory_session(monkeypatch) -> Session:
     monkeypatch.setattr(portfolio.storage_service, "put_object", fake_put)
     monkeypatch.setattr(portfolio.storage_service, "get_object", fake_get)
     monkeypatch.setattr(portfolio.storage_service, "ensure_bucket", lambda: None)
+    portfolio.result_cache.clear()
+    portfolio.index_cache.clear()
 
     yield session
     session.close()
@@ -134,7 +138,40 @@ def test_equal_capital_aggregation(in_memory_session: Session) -> None:
     response = portfolio.run_portfolio(in_memory_session, tables.User(id="user-1"), request)
 
     assert response.equityCurve[-1].value == pytest.approx(100_000, rel=1e-3)
-    assert len(response.tradesTable) == 4
+    assert response.tradesCount == 2
+
+
+def _trade_rows(entry: str, exit_: str, pnl: float, size: float = 10_000) -> list[dict[str, object]]:
+    return [
+        {
+            "Trade #": 1, "Type (Long/Short)": "Long", "Date/Time": stamp, "Signal": "x", "Price": 100,
+            "Position size": size, "Net P&L": pnl, "Run-up": 0, "Drawdown": 0, "Cumulative P&L": pnl,
+        }
+        for stamp in (entry, exit_)
+    ]
+
+
+def test_shared_capital_run_skips_trades_beyond_position_limit(in_memory_session: Session) -> None:
+    seed_batch(in_memory_session, "TICK1", "key-a", create_csv(_trade_rows("2024-01-02 09:30", "2024-01-05 09:30", 500)))
+    seed_batch(in_memory_session, "TICK2", "key-b", create_csv(_trade_rows("2024-01-03 09:30", "2024-01-04 09:30", -250, 5_000)))
+    user = tables.User(id="user-1")
+
+    split = portfolio.run_portfolio(
+        in_memory_session, user, PortfolioRunRequest(batchId="batch-1", totalCapital=100_000)
+    )
+    shared = portfolio.run_portfolio(
+        in_memory_session, user, PortfolioRunRequest(batchId="batch-1", totalCapital=100_000, maxPositions=1)
+    )
+
+    assert split.kpis["max_concurrent_positions"] == 2
+    assert shared.kpis["max_concurrent_positions"] == 1
+    assert shared.tradesCount == 1
+    assert shared.kpis["skipped_trades"] == 1
+    assert shared.kpis["max_exposure_pct"] == pytest.approx(100)
+    # The whole balance rode TICK1's +5% trade.
+    assert shared.kpis["total_pnl"] == pytest.approx(5_000)
+    performance = {metric["label"]: metric["value"] for metric in shared.sections["performance"].metrics}
+    assert performance["Max contracts held"] == 1
 
 
 def test_annualized_matches_hand_calc() -> None:
@@ -233,5 +270,401 @@ def test_date_filter_limits_trades(in_memory_session: Session) -> None:
         dateRange=(datetime(2024, 1, 1), datetime(2024, 1, 31)),
     )
     response = portfolio.run_portfolio(in_memory_session, tables.User(id="user-1"), request)
-    assert len(response.tradesTable) == 2
+    assert response.tradesCount == 1
+    assert response.kpis["total_trades"] == 1
+
+
+def test_extract_trades_orders_rows_and_estimates_missing_size() -> None:
+    df = pd.DataFrame(
+        [
+            {"Trade #": 2, "Type (Long/Short)": "Short", "Date/Time": "2024-01-09 15:00", "Position size": 0, "Net P&L": -50, "Run-up": 20, "Drawdown": -100},
+            {"Trade #": 1, "Type (Long/Short)": "Long", "Date/Time": "2024-01-03 15:00", "Position size": 2000, "Net P&L": 100, "Run-up": 150, "Drawdown": -30},
+            {"Trade #": 2, "Type (Long/Short)": "Short", "Date/Time": "2024-01-04 09:30", "Position size": 0, "Net P&L": 0, "Run-up": 0, "Drawdown": 0},
+            {"Trade #": 1, "Type (Long/Short)": "Long", "Date/Time": "2024-01-02 09:30", "Position size": 0, "Net P&L": 0, "Run-up": 0, "Drawdown": 0},
+        ]
+    )
+
+    trades = portfolio._extract_trades("TICK", df)
+
+    assert [t.trade_number for t in trades] == [1, 2]
+    first, second = trades
+    assert first.entry_time == datetime(2024, 1, 2, 9, 30)
+    assert first.exit_time == datetime(2024, 1, 3, 15, 0)
+    assert first.position_size == 2000
+    assert first.trade_return_pct == pytest.approx(0.05)
+    assert second.direction == "Short"
+    assert not hasattr(first, "__dict__")
+
+    columns = portfolio.extract_trade_columns(df)
+    assert columns["exit_ns"].dtype == np.int64
+    assert columns["direction"].tolist() == [0, 1]
+    assert second.position_size == pytest.approx(0.5)
+    assert second.trade_return_pct == pytest.approx(-100)
+
+
+def test_run_reads_columnar_artifact_written_at_ingest(in_memory_session: Session, monkeypatch) -> None:
+    csv = create_csv([
+        {
+            "Trade #": 1,
+            "Type (Long/Short)": "Long",
+            "Date/Time": "2024-01-02 09:30",
+            "Signal": "Entry",
+            "Price": 100,
+            "Position size": 10000,
+            "Net P&L": 500,
+            "Run-up": 600,
+            "Drawdown": -200,
+            "Cumulative P&L": 500,
+        },
+        {
+            "Trade #": 1,
+            "Type (Long/Short)": "Long",
+            "Date/Time": "2024-01-05 09:30",
+            "Signal": "Exit",
+            "Price": 105,
+            "Position size": 10000,
+            "Net P&L": 500,
+            "Run-up": 600,
+            "Drawdown": -200,
+            "Cumulative P&L": 500,
+        },
+    ])
+    user = tables.User(id="user-1", plan="pro")
+    in_memory_session.add(user)
+    upload = UploadFile(file=io.BytesIO(csv), filename="Demo_TICK_2024-01-01.csv")
+    batch, _ = ingest.ingest_files(in_memory_session, user, [upload])
+    in_memory_session.commit()
+
+    record = batch.files[0]
+    assert record.artifact_key
+
+    fetched: list[str] = []
+    original_get = portfolio.storage_service.get_object
+
+    def tracking_get(key: str) -> bytes:
+        fetched.append(key)
+        return original_get(key)
+
+    monkeypatch.setattr(portfolio.storage_service, "get_object", tracking_get)
+    request = PortfolioRunRequest(batchId=batch.id, totalCapital=10_000, currency="USD", dateRange=None)
+    response = portfolio.run_portfolio(in_memory_session, user, request)
+
+    assert fetched == [record.artifact_key]
     assert response.kpis["total_trades"] == 1
+    assert response.tradesCount == 1
+
+
+def test_repeat_runs_are_served_from_result_cache(in_memory_session: Session) -> None:
+    csv = create_csv([
+        {"Trade #": 1, "Type (Long/Short)": "Long", "Date/Time": "2024-01-02 09:30", "Signal": "Entry", "Price": 100,
+         "Position size": 10000, "Net P&L": 500, "Run-up": 600, "Drawdown": -200, "Cumulative P&L": 500},
+        {"Trade #": 1, "Type (Long/Short)": "Long", "Date/Time": "2024-01-05 09:30", "Signal": "Exit", "Price": 105,
+         "Position size": 10000, "Net P&L": 500, "Run-up": 600, "Drawdown": -200, "Cumulative P&L": 500},
+    ])
+    seed_batch(in_memory_session, "CACHE", "key-cache", csv)
+    user = tables.User(id="user-1")
+    request = PortfolioRunRequest(batchId="batch-1", totalCapital=10_000, currency="USD", dateRange=None)
+
+    first = portfolio.run_portfolio(in_memory_session, user, request)
+    in_memory_session.commit()
+    second = portfolio.run_portfolio(in_memory_session, user, request)
+    assert second is first
+    # The served bytes are encoded without pydantic, so check them against the schema here.
+    cached = portfolio.compute_run(in_memory_session, user, request)
+    assert cached.body == first.model_dump_json().encode()
+    assert in_memory_session.query(tables.PortfolioRun).count() == 1
+
+    # A cold process falls back to the persisted run instead of recomputing.
+    portfolio.result_cache.clear()
+    third = portfolio.run_portfolio(in_memory_session, user, request)
+    assert third.model_dump_json() == first.model_dump_json()
+    assert in_memory_session.query(tables.PortfolioRun).count() == 1
+
+    changed = request.model_copy(update={"totalCapital": 20_000})
+    portfolio.run_portfolio(in_memory_session, user, changed)
+    assert in_memory_session.query(tables.PortfolioRun).count() == 2
+
+    stats = portfolio.result_cache_stats()
+    assert stats["persisted_hits"] >= 1
+    assert stats["memory"]["hits"] >= 1
+
+
+def _daily_trades(seed: int, volatility: float, count: int = 60) -> bytes:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for number, day in enumerate(pd.bdate_range("2024-01-02", periods=count), start=1):
+        pnl = float(rng.normal(20, volatility))
+        for stamp in (day, day + pd.Timedelta(hours=6)):
+            rows.append({
+                "Trade #": number, "Type (Long/Short)": "Long", "Date/Time": stamp.strftime("%Y-%m-%d %H:%M"),
+                "Signal": "x", "Price": 100, "Position size": 10_000, "Net P&L": pnl, "Run-up": 0, "Drawdown": 0,
+                "Cumulative P&L": 0,
+            })
+    return create_csv(rows)
+
+
+def test_weighted_runs_and_cached_allocation_models(in_memory_session: Session) -> None:
+    for seed, (ticker, volatility) in enumerate([("CALM", 50), ("MID", 150), ("WILD", 400)]):
+        seed_batch(in_memory_session, ticker, f"key-{ticker}", _daily_trades(seed, volatility))
+    user = tables.User(id="user-1")
+    allocation.model_cache.clear()
+
+    index = portfolio._load_batch_index(in_memory_session.get(tables.Batch, "batch-1"))
+    series = [portfolio.EquitySeries(t.ticker, t.equity(0, t.trade_count, 1_000.0), t.frame(0, t.trade_count)) for t in index.tickers]
+    calendar, columns = portfolio.align_daily_columns(series)
+    np.testing.assert_allclose(columns.sum(axis=1), portfolio._align_daily(series).to_numpy())
+
+    only_calm = portfolio.run_portfolio(
+        in_memory_session, user, PortfolioRunRequest(batchId="batch-1", totalCapital=30_000, weights={"CALM": 2})
+    )
+    assert only_calm.tradesCount == 60
+    with pytest.raises(ValueError, match="not in the batch"):
+        portfolio.run_portfolio(in_memory_session, user, PortfolioRunRequest(batchId="batch-1", totalCapital=1, weights={"NOPE": 1}))
+
+    request = AllocationRequest(batchId="batch-1", totalCapital=30_000, method="riskParity")
+    parity, run = allocation.optimize_allocation(in_memory_session, user, request)
+    inverse, _ = allocation.optimize_allocation(in_memory_session, user, request.model_copy(update={"method": "inverseVol"}))
+
+    assert sum(parity.weights.values()) == pytest.approx(1)
+    assert parity.weights["CALM"] > parity.weights["MID"] > parity.weights["WILD"]
+    assert sum(parity.risk_contributions.values()) == pytest.approx(1)
+    assert inverse.weights != parity.weights
+    assert run.response.tradesCount == 180
+    stats = allocation.model_cache.stats()
+    assert (stats.misses, stats.hits) == (1, 1)
+    stored = in_memory_session.query(tables.PortfolioRun).filter(tables.PortfolioRun.weights.isnot(None)).all()
+    assert {tuple(sorted(row.weights)) for row in stored} >= {("CALM", "MID", "WILD")}
+
+
+def test_contribution_variants_match_separate_runs(in_memory_session: Session) -> None:
+    for seed, (ticker, volatility) in enumerate([("CALM", 50), ("MID", 150), ("WILD", 400)]):
+        seed_batch(in_memory_session, ticker, f"key-{ticker}", _daily_trades(seed, volatility))
+    user = tables.User(id="user-1")
+
+    result = contribution.contribution_analysis(in_memory_session, user, "batch-1", 30_000, None, None, [["MID"]])
+
+    kinds = [(variant.kind, variant.excluded) for variant in result.variants]
+    assert kinds == [("full", None), ("leaveOneOut", "CALM"), ("leaveOneOut", "MID"), ("leaveOneOut", "WILD"), ("subset", None)]
+    # Each variant is the run of its tickers with the capital split evenly between them.
+    for column, weights in enumerate([None, {"MID": 1, "WILD": 1}, {"CALM": 1, "WILD": 1}, {"CALM": 1, "MID": 1}, {"MID": 1}]):
+        run = portfolio.run_portfolio(
+            in_memory_session, user, PortfolioRunRequest(batchId="batch-1", totalCapital=30_000, weights=weights)
+        )
+        ratios = {metric["label"]: metric["value"] for metric in run.sections["riskRatios"].metrics}
+        assert result.kpis.trades[column] == run.tradesCount
+        assert result.kpis.pnl[column] == pytest.approx(run.kpis["total_pnl"])
+        for field in ("total_return_pct", "max_drawdown_pct", "max_drawdown_abs"):
+            assert getattr(result.kpis, field)[column] == pytest.approx(run.kpis[field])
+        assert result.kpis.sharpe[column] == pytest.approx(ratios["Sharpe ratio"])
+        np.testing.assert_allclose(result.drawdown_pct[:, column], [point.value * 100 for point in run.drawdown])
+
+    with pytest.raises(ValueError, match="not in the batch"):
+        contribution.contribution_analysis(in_memory_session, user, "batch-1", 30_000, None, None, [["NOPE"]])
+    with pytest.raises(LookupError):
+        contribution.contribution_analysis(in_memory_session, tables.User(id="other"), "batch-1", 30_000, None, None)
+
+
+def test_window_stats_match_filtered_trades(in_memory_session: Session) -> None:
+    rows = []
+    for number, (entry, exit_, pnl) in enumerate(
+        [("2024-01-02", "2024-01-05", 200), ("2024-02-01", "2024-02-10", -300), ("2024-03-01", "2024-03-04", 100)],
+        start=1,
+    ):
+        for stamp in (entry, exit_):
+            rows.append({
+                "Trade #": number, "Type (Long/Short)": "Long", "Date/Time": f"{stamp} 09:30", "Signal": "x",
+                "Price": 100, "Position size": 10000, "Net P&L": pnl, "Run-up": 0, "Drawdown": 0, "Cumulative P&L": 0,
+            })
+    seed_batch(in_memory_session, "WIN", "key-window", create_csv(rows))
+
+    capital, stats = portfolio.summarize_window(
+        in_memory_session, tables.User(id="user-1"), "batch-1", 10_000, datetime(2024, 1, 10), datetime(2024, 3, 31)
+    )
+
+    assert capital == 10_000
+    (window,) = stats
+    assert (window.trades, window.wins) == (2, 1)
+    assert window.pnl == pytest.approx(-200)
+    assert window.final_equity == pytest.approx(10_000 * (1 - 0.03) * (1 + 0.01))
+
+    with pytest.raises(LookupError):
+        portfolio.summarize_window(in_memory_session, tables.User(id="someone-else"), "batch-1", None, None, None)
+
+
+def test_align_daily_uses_business_day_union_calendar() -> None:
+    def series(ticker: str, points: dict[str, float]) -> portfolio.EquitySeries:
+        equity = pd.Series(list(points.values()), index=pd.to_datetime(list(points.keys())))
+        return portfolio.EquitySeries(ticker=ticker, equity=equity, trades=[])
+
+    aligned = portfolio._align_daily([
+        series("A", {"2024-01-02 09:30": 100, "2024-01-04 09:30": 110}),
+        # Starts on a Saturday, so its first label rolls back to Friday.
+        series("B", {"2024-01-06 09:30": 50, "2024-01-09 09:30": 60}),
+        # Disjoint from the others: the days in between are not on the calendar.
+        series("C", {"2024-01-22 00:00": 10, "2024-01-24 12:00": 20}),
+    ])
+
+    expected = {
+        "2024-01-02": 0, "2024-01-03": 100, "2024-01-04": 100, "2024-01-05": 100, "2024-01-08": 150,
+        "2024-01-09": 150, "2024-01-22": 160, "2024-01-23": 160, "2024-01-24": 160,
+    }
+    assert list(aligned.index.strftime("%Y-%m-%d")) == list(expected)
+    assert aligned.tolist() == pytest.approx(list(expected.values()))
+
+
+def test_trade_stats_matches_list_aggregates() -> None:
+    from api.app.services.trades import TradeFrame, direction_codes, trade_stats
+
+    frame = TradeFrame(
+        net_pnl=np.array([120.0, -40.0, 0.0, 60.0]),
+        trade_return_pct=np.array([0.12, -0.04, 0.0, 0.03]),
+        duration_days=np.array([2.0, 1.0, 3.0, 4.0]),
+        direction=direction_codes(np.array(["Long", "Short", "Long", "Long"])),
+    )
+    stats = trade_stats(frame)
+    assert (stats.winning_trades, stats.losing_trades) == (2, 2)
+    assert stats.gross_profit == pytest.approx(180.0)
+    assert stats.gross_loss == pytest.approx(-40.0)
+    assert stats.avg_loss == pytest.approx(-20.0)
+    assert (stats.largest_win, stats.largest_loss) == (120.0, -40.0)
+    assert (stats.largest_win_pct, stats.largest_loss_pct) == pytest.approx((12.0, -4.0))
+    assert (stats.avg_days_win, stats.avg_days_loss) == pytest.approx((3.0, 2.0))
+
+    winners_only = trade_stats(TradeFrame(frame.net_pnl[[0, 3]], frame.trade_return_pct[[0, 3]], frame.duration_days[[0, 3]], frame.direction[[0, 3]]))
+    assert winners_only.gross_loss == 0.0
+    assert trade_stats(TradeFrame.empty()).total_trades == 0
+
+
+def test_break_even_losers_leave_no_gross_loss() -> None:
+    from api.app.services.trades import TradeFrame, direction_codes, trade_stats
+
+    # Winner sums that don't round-trip exactly through a subtraction from the total.
+    pnl = np.array([71.84, 143.24, 69.57, 0.01, 155.8, 86.96, 0.01, 107.17, 0.0, 0.0])
+    assert pnl.sum() - pnl @ (pnl > 0) != 0  # the old remainder-of-total residue
+    frame = TradeFrame(
+        net_pnl=pnl,
+        trade_return_pct=pnl / 1_000,
+        duration_days=np.array([0.1, 0.2, 0.3, 1.1, 0.5, 0.6, 0.7, 0.8, 2.0, 4.0]),
+        direction=direction_codes(np.array(["Long"] * len(pnl))),
+    )
+
+    stats = trade_stats(frame)
+
+    assert stats.losing_trades == 2
+    assert stats.gross_loss == 0.0
+    assert stats.avg_days_loss == 3.0
+    kpis = portfolio._summarize_metrics(stats, pd.Series([100.0, 101.0]), "USD")
+    assert kpis["profit_factor"] == float("inf")
+
+
+def test_missing_pnl_rows_leave_winner_sums_intact() -> None:
+    from api.app.services.trades import TradeFrame, direction_codes, trade_stats
+
+    pnl = np.array([120.0, np.nan, 30.0, -50.0])
+    frame = TradeFrame(
+        net_pnl=pnl,
+        trade_return_pct=np.nan_to_num(pnl) / 1_000,
+        duration_days=np.array([1.0, np.nan, 3.0, 2.0]),
+        direction=direction_codes(np.array(["Long"] * len(pnl))),
+    )
+
+    stats = trade_stats(frame)
+
+    assert stats.winning_trades == 2
+    assert stats.gross_profit == 150.0
+    assert stats.avg_win == 75.0
+    assert stats.avg_days_win == 2.0
+    assert stats.largest_win == 120.0
+
+
+def _round_trips(trades: list[tuple[str, str, str, float]]) -> bytes:
+    rows = []
+    for number, (direction, entry, exit_, pnl) in enumerate(trades, start=1):
+        for when in (entry, exit_):
+            rows.append({"Trade #": number, "Type (Long/Short)": direction, "Date/Time": when, "Position size": 1000,
+                         "Net P&L": pnl, "Run-up": 0, "Drawdown": 0})
+    return create_csv(rows)
+
+
+def test_run_cursor_pages_trades_with_keyset_and_filters(in_memory_session: Session) -> None:
+    from api.app.services.trade_table import TradeQuery, iter_trades, page_trades
+    from api.app.services.trades import Direction
+
+    seed_batch(in_memory_session, "AAA", "key-aaa", _round_trips([
+        ("Long", "2024-01-02 09:30", "2024-01-03 15:00", 10.0),
+        ("Short", "2024-01-04 09:30", "2024-01-05 15:00", -5.0),
+        ("Long", "2024-01-08 09:30", "2024-01-09 15:00", 10.0),
+    ]))
+    seed_batch(in_memory_session, "BBB", "key-bbb", _round_trips([
+        ("Long", "2024-01-02 09:30", "2024-01-03 15:00", 7.0),
+        ("Short", "2024-01-10 09:30", "2024-01-11 15:00", -2.0),
+    ]))
+    user = tables.User(id="user-1")
+    request = PortfolioRunRequest(batchId="batch-1", totalCapital=10_000, currency="USD", dateRange=None)
+    response = portfolio.run_portfolio(in_memory_session, user, request)
+    assert response.tradesCount == 5
+
+    index = portfolio.load_trade_index(in_memory_session, user, "batch-1")
+    query = TradeQuery.from_cursor(response.tradesCursor)
+    seen = []
+    while True:
+        page = page_trades(index, query, limit=2)
+        assert page.total == 5
+        seen.extend((row["ticker"], row["tradeNumber"]) for row in page.rows)
+        if page.next_cursor is None:
+            break
+        query = TradeQuery.from_cursor(page.next_cursor)
+    # Ties on exit time break by ticker position, then trade.
+    assert seen == [("AAA", 1), ("BBB", 1), ("AAA", 2), ("AAA", 3), ("BBB", 2)]
+
+    by_pnl = TradeQuery(batch_id="batch-1", sort="netPnl", descending=True, pnl="positive")
+    rows = [row for chunk in iter_trades(index, by_pnl, chunk_size=1) for row in chunk]
+    assert [(row["ticker"], row["netPnl"]) for row in rows] == [("AAA", 10.0), ("AAA", 10.0), ("BBB", 7.0)]
+
+    shorts = page_trades(index, TradeQuery(batch_id="batch-1", direction=Direction.SHORT, tickers=("BBB",)), limit=10)
+    assert [(row["ticker"], row["direction"], row["exitTime"]) for row in shorts.rows] == [("BBB", "Short", "2024-01-11T15:00:00")]
+
+    with pytest.raises(ValueError):
+        TradeQuery.from_cursor("not-a-cursor")
+
+
+def test_runs_list_summaries_and_load_curves_on_demand(in_memory_session: Session) -> None:
+    seed_batch(in_memory_session, "LIST", "key-list", _round_trips([
+        ("Long", "2024-01-02 09:30", "2024-01-03 15:00", 10.0),
+        ("Long", "2024-02-02 09:30", "2024-02-05 15:00", -4.0),
+    ]))
+    user = tables.User(id="user-1")
+    responses = {}
+    for capital in (10_000, 20_000, 30_000):
+        request = PortfolioRunRequest(batchId="batch-1", totalCapital=capital, currency="USD", dateRange=None)
+        responses[capital] = portfolio.run_portfolio(in_memory_session, user, request)
+        in_memory_session.commit()
+
+    stored = in_memory_session.query(tables.PortfolioRun).first()
+    assert "equityCurve" not in stored.metrics
+    assert stored.curves_blob and stored.trades_count == 2
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = portfolio.list_runs(in_memory_session, user, "batch-1", limit=2, cursor=cursor)
+        seen.extend(rows)
+        if cursor is None:
+            break
+    assert len({row.id for row in seen}) == 3
+    assert [row.created_at for row in seen] == sorted((row.created_at for row in seen), reverse=True)
+    assert all(row.kpis["total_trades"] == 2 for row in seen)
+
+    before = portfolio.result_cache.stats()
+    portfolio.get_run(in_memory_session, user, "batch-1", seen[0].id)  # served from memory
+    portfolio.result_cache.clear()
+    run, detail = portfolio.get_run(in_memory_session, user, "batch-1", seen[0].id)
+    original = responses[run.total_capital]
+    assert detail.response.model_dump_json() == original.model_dump_json()
+    # Fetching stored runs doesn't count as run-cache lookups.
+    after = portfolio.result_cache.stats()
+    assert (after.hits, after.misses) == (before.hits, before.misses)
+
+    with pytest.raises(LookupError):
+        portfolio.get_run(in_memory_session, tables.User(id="someone-else"), "batch-1", run.id)
+    with pytest.raises(ValueError):
+        portfolio.list_runs(in_memory_session, user, "batch-1", limit=2, cursor="%%%")
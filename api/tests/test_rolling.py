@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.portfolio import _sharpe_ratio, _sortino_ratio
+from app.services.rolling import rolling_analytics, trailing_max
+
+
+def _curve(n: int = 600, seed: int = 3) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = 100_000 * np.cumprod(1 + rng.normal(0.0004, 0.012, n))
+    return pd.Series(values, index=pd.bdate_range("2020-01-01", periods=n))
+
+
+def _run(curve: pd.Series, windows: list[int], splits: list[str] = (), segment_points: int | None = None):
+    splits_ns = [pd.Timestamp(split).value for split in splits]
+    return rolling_analytics(curve.index.as_unit("ns").asi8, curve.to_numpy(), windows, splits_ns, segment_points)
+
+
+def test_full_window_matches_whole_curve_ratios() -> None:
+    curve = _curve()
+    curve.iloc[100] = np.nan  # a gap drops its returns, as pct_change + dropna would
+
+    (series,), _ = _run(curve, [len(curve) - 1])
+
+    assert series.sharpe[-1] == pytest.approx(_sharpe_ratio(curve))
+    assert series.sortino[-1] == pytest.approx(_sortino_ratio(curve))
+    assert np.isnan(series.sharpe[:-1]).all()
+
+
+def test_rolling_series_match_window_by_window_recomputation() -> None:
+    curve = _curve()
+    returns = curve.pct_change()
+
+    series, _ = _run(curve, [63, 252])
+
+    for item in series:
+        window = item.window
+        expected_sharpe = returns.rolling(window).mean() / returns.rolling(window).std() * np.sqrt(252)
+        np.testing.assert_allclose(item.sharpe[window:], expected_sharpe.to_numpy()[window:], rtol=1e-9)
+        expected_return = (curve / curve.shift(window) - 1) * 100
+        np.testing.assert_allclose(item.return_pct[window:], expected_return.to_numpy()[window:], rtol=1e-9)
+        expected_drawdown = (curve / curve.rolling(window + 1, min_periods=1).max() - 1) * 100
+        np.testing.assert_allclose(item.drawdown_pct[window:], expected_drawdown.to_numpy()[window:])
+        for end in (window, 400, len(curve) - 1):
+            losing = returns.iloc[end - window + 1 : end + 1]
+            losing = losing[losing < 0]
+            expected = returns.iloc[end - window + 1 : end + 1].mean() / losing.std() * np.sqrt(252)
+            assert item.sortino[end] == pytest.approx(expected)
+
+
+def test_walk_forward_segments_partition_the_curve() -> None:
+    curve = _curve()
+
+    _, segments = _run(curve, [63], splits=["2020-06-01", "2021-01-01"], segment_points=250)
+
+    assert [segment.start for segment in segments] == [0, 108, 250, 262, 500]
+    assert segments[-1].stop == len(curve)
+    growth = np.prod([1 + segment.return_pct / 100 for segment in segments])
+    assert growth == pytest.approx(curve.iloc[-1] / curve.iloc[0])
+    second = curve.iloc[107:250]
+    assert segments[1].max_drawdown_pct == pytest.approx(((second / second.cummax()) - 1).min() * 100)
+    assert segments[1].sharpe == pytest.approx(_sharpe_ratio(second))
+
+
+def test_trailing_max_skips_gaps() -> None:
+    values = np.array([3.0, 1.0, np.nan, 2.0, 0.5, np.nan, np.nan, 0.1])
+
+    np.testing.assert_array_equal(trailing_max(values, 2), [3, 3, 3, 2, 2, 2, 0.5, 0.1])
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.services.runpool import PoolSaturated, PortfolioRunPool
+
+BLOCKING_SECONDS = 0.6
+
+
+def _blocking_run() -> str:
+    time.sleep(BLOCKING_SECONDS)  # stands in for a synchronous run and its database work
+    return "done"
+
+
+def test_run_pool_rejects_work_beyond_capacity() -> None:
+    pool = PortfolioRunPool(max_workers=1, max_queued=1)
+    release = threading.Event()
+    try:
+        running = pool.submit(release.wait)
+        queued = pool.submit(lambda: "queued")
+        with pytest.raises(PoolSaturated):
+            pool.submit(lambda: "rejected")
+        assert pool.pending == 2
+
+        release.set()
+        assert running.result(timeout=1) is True
+        assert queued.result(timeout=1) == "queued"
+        assert pool.submit(lambda: "accepted").result(timeout=1) == "accepted"
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def _health_latency(slow_route: Callable[[], Awaitable[str]]) -> float:
+    """Seconds a health check takes while ``slow_route`` is serving another request."""
+
+    app = FastAPI()
+    app.get("/slow")(slow_route)
+    app.get("/health")(lambda: {"status": "ok"})
+
+    async def scenario() -> float:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            slow = asyncio.ensure_future(client.get("/slow"))
+            started = time.perf_counter()
+            await asyncio.sleep(0.05)  # let the slow request start; a blocked loop overshoots this
+            assert (await client.get("/health")).status_code == 200
+            latency = time.perf_counter() - started - 0.05
+            assert (await slow).status_code == 200
+            return latency
+
+    return asyncio.run(scenario())
+
+
+def test_run_pool_keeps_health_checks_responsive_during_a_run() -> None:
+    pool = PortfolioRunPool(max_workers=1)
+
+    async def pooled() -> str:
+        return await pool.run(_blocking_run)
+
+    async def inline() -> str:
+        return _blocking_run()
+
+    try:
+        assert _health_latency(pooled) < BLOCKING_SECONDS / 4
+    finally:
+        pool.shutdown()
+    # Without the pool the same run holds the event loop and the health check waits it out.
+    assert _health_latency(inline) > BLOCKING_SECONDS / 2
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.simulator import EventSchedule, simulate_shared_capital
+from app.services.trades import TradeFrame
+
+DAY_NS = 86_400 * 10**9
+
+
+def _schedule(trades: list[tuple[int, int, float]]) -> EventSchedule:
+    entry, exit_, returns = (np.array(column) for column in zip(*trades))
+    frame = TradeFrame(
+        net_pnl=returns * 1_000,
+        trade_return_pct=returns.astype(float),
+        duration_days=np.maximum(exit_ - entry, 1e-9).astype(float),
+        direction=np.zeros(len(trades), dtype=np.int8),
+    )
+    return EventSchedule.build(entry * DAY_NS, exit_ * DAY_NS, returns, frame)
+
+
+def test_shared_cash_limits_positions_and_compounds() -> None:
+    schedule = _schedule([(1, 5, 0.10), (2, 4, -0.10), (3, 6, 0.20), (5, 7, 0.50)])
+
+    result = simulate_shared_capital(schedule, 1_000, max_positions=2)
+
+    # A and B take half the cash each; C finds both slots taken; D enters as A's
+    # exit at the same moment frees cash, sized on equity at cost (1000 / 2).
+    np.testing.assert_allclose(result.allocation, [500, 500, 0, 500])
+    assert result.skipped_trades == 1
+    assert result.open_positions.max() == 2
+    assert result.equity.iloc[-1] == pytest.approx(1_000 + 50 - 50 + 250)
+    np.testing.assert_allclose(result.frame.net_pnl, [50, -50, 250])
+    average, peak = result.exposure_pct()
+    assert peak == pytest.approx(100)
+    assert 0 < average < 100
+
+
+def test_unconstrained_counts_match_brute_force_overlap() -> None:
+    rng = np.random.default_rng(5)
+    entry = rng.integers(0, 200, 300)
+    trades = [(int(e), int(e + d), 0.01) for e, d in zip(entry, rng.integers(0, 20, 300))]
+    schedule = _schedule(trades)
+
+    counts = schedule.open_positions()
+
+    expected = max(sum(e <= t < x or e == x == t for e, x, _ in trades) for t in range(0, 240))
+    assert counts.max() == expected
+    assert counts[-1] == 0
+    unlimited = simulate_shared_capital(schedule, 1_000_000, max_positions=10_000)
+    assert unlimited.skipped_trades == 0
+
+
+def test_losses_beyond_cash_stop_new_entries() -> None:
+    schedule = _schedule([(1, 2, -1.5), (3, 4, 0.10)])
+
+    result = simulate_shared_capital(schedule, 1_000, max_positions=1)
+
+    np.testing.assert_allclose(result.allocation, [1_000, 0])
+    assert result.equity.iloc[-1] == pytest.approx(-500)
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import io
+import mmap
+
 import pytest
-from botocore.exceptions import ParamValidationError
+from botocore.exceptions import ClientError, ParamValidationError
 
-from app.services.storage import StorageError, StorageService
+from app.services.storage import (
+    MIN_PART_BYTES,
+    CachedStorageService,
+    LocalStorageService,
+    StorageError,
+    StorageService,
+)
 
 
 class DummyClient:
@@ -26,9 +35,12 @@ class DummyClient:
 
     def get_object(self, Bucket: str, Key: str):
         if Key not in self.objects:
-            raise KeyError(Key)
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not found"}}, "GetObject")
         return {"Body": DummyBody(self.objects[Key])}
 
+    def delete_object(self, Bucket: str, Key: str):
+        self.objects.pop(Key, None)
+
 
 class DummyBody:
     def __init__(self, payload: bytes):
@@ -60,3 +72,110 @@ def test_storage_error_surface_from_put_object():
     message = str(excinfo.value)
     assert message.startswith("Object storage error:")
     assert "expected pattern" in message
+
+
+class MultipartClient(DummyClient):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.parts: dict[int, bytes] = {}
+        self.aborted = False
+
+    def create_multipart_upload(self, Bucket: str, Key: str, ContentType: str):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes):
+        self.parts[PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict):
+        self.objects[Key] = b"".join(self.parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str):
+        self.aborted = True
+
+
+def test_object_writer_uploads_parts_and_small_objects():
+    client = MultipartClient()
+    service = StorageService(client=client, bucket="valid-bucket")
+    payload = bytes(range(256)) * (12 * 1024 * 1024 // 256 + 3)
+
+    writer = service.open_writer("big.csv")
+    for start in range(0, len(payload), 1_000_000):
+        writer.write(payload[start:start + 1_000_000])
+    writer.close()
+    assert client.objects["big.csv"] == payload
+    assert [len(part) for part in client.parts.values()][:2] == [MIN_PART_BYTES, MIN_PART_BYTES]
+
+    small = service.open_writer("small.csv")
+    small.write(b"data")
+    small.close()
+    assert client.objects["small.csv"] == b"data"
+
+
+def test_object_writer_abort_discards_upload():
+    client = MultipartClient()
+    writer = StorageService(client=client, bucket="valid-bucket").open_writer("big.csv")
+    writer.write(b"x" * (MIN_PART_BYTES + 1))
+    writer.abort()
+    assert client.aborted
+    assert "big.csv" not in client.objects
+
+
+def test_cached_storage_reads_through_memory_and_disk_tiers(tmp_path):
+    client = DummyClient()
+    client.objects["batch/a.csv"] = b"trades"
+    backend = StorageService(client=client, bucket="valid-bucket")
+    cached = CachedStorageService(backend, memory_bytes=1024, directory=str(tmp_path), disk_bytes=1024)
+
+    assert cached.get_object("batch/a.csv") == b"trades"
+    assert cached.get_object("batch/a.csv") == b"trades"
+    # A fresh process with a cold memory tier maps the disk copy instead of refetching.
+    restarted = CachedStorageService(backend, memory_bytes=1024, directory=str(tmp_path), disk_bytes=1024)
+    assert restarted.get_buffer("batch/a.csv")[:] == b"trades"
+
+    stats, restarted_stats = cached.stats(), restarted.stats()
+    assert stats["backend_fetches"] == 1 and stats["memory"]["hits"] == 1
+    assert restarted_stats["backend_fetches"] == 0 and restarted_stats["disk"]["hits"] == 1
+
+
+@pytest.fixture(params=["s3", "local"])
+def backend(request, tmp_path):
+    if request.param == "s3":
+        return StorageService(client=MultipartClient(), bucket="valid-bucket")
+    return LocalStorageService(tmp_path / "objects")
+
+
+def test_backend_round_trips_objects(backend):
+    backend.ensure_bucket()
+    backend.put_object("batch/a.csv", io.BytesIO(b"trades"))
+    writer = backend.open_writer("batch/b.arrow", content_type="application/octet-stream")
+    writer.write(b"col")
+    writer.write(b"umns")
+    writer.close()
+
+    assert backend.get_object("batch/a.csv") == b"trades"
+    assert backend.get_buffer("batch/b.arrow")[:] == b"columns"
+
+    backend.delete_object("batch/a.csv")
+    with pytest.raises(StorageError) as excinfo:
+        backend.get_object("batch/a.csv")
+    assert str(excinfo.value).startswith("Object storage error:")
+
+
+def test_backend_aborted_writes_leave_nothing(backend):
+    backend.ensure_bucket()
+    writer = backend.open_writer("batch/partial.csv")
+    writer.write(b"half a file")
+    writer.abort()
+
+    with pytest.raises(StorageError):
+        backend.get_object("batch/partial.csv")
+
+
+def test_local_backend_shards_keys_and_maps_reads(tmp_path):
+    backend = LocalStorageService(tmp_path)
+    backend.put_object("batch/a.csv", io.BytesIO(b"trades"))
+
+    (stored,) = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert len(stored.relative_to(tmp_path).parts) == 3
+    assert isinstance(backend.get_buffer("batch/a.csv"), mmap.mmap)
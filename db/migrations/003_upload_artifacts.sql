@@ -0,0 +1,3 @@
+-- Columnar (Arrow IPC) copy of each upload's normalized trades, written at ingest time.
+-- NULL for uploads that predate the artifact; portfolio runs fall back to the raw CSV.
+ALTER TABLE uploadfilerecord ADD COLUMN IF NOT EXISTS artifact_key VARCHAR(255);
@@ -0,0 +1,24 @@
+-- Durable queue for asynchronous backtest jobs (see api/app/services/backtests.py).
+CREATE TABLE IF NOT EXISTS backtestjob (
+  id VARCHAR(36) PRIMARY KEY,
+  strategy VARCHAR(255) NOT NULL,
+  symbols JSONB DEFAULT '[]'::jsonb,
+  start_date DATE NOT NULL,
+  end_date DATE NOT NULL,
+  parameters JSONB DEFAULT '{}'::jsonb,
+  batch_id VARCHAR(36),
+  total_capital DOUBLE PRECISION,
+  currency VARCHAR(8) DEFAULT 'USD',
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 3,
+  next_attempt_at TIMESTAMPTZ DEFAULT NOW(),
+  locked_by VARCHAR(64),
+  locked_until TIMESTAMPTZ,
+  error TEXT,
+  result JSONB,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_backtestjob_status ON backtestjob(status, next_attempt_at);
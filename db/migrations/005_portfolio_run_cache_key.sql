@@ -0,0 +1,3 @@
+-- Fingerprint of batch contents + normalized run request; repeat runs reuse the stored row.
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS cache_key VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_portfoliorun_cache_key ON portfoliorun(cache_key);
@@ -0,0 +1,2 @@
+-- LTTB indices per point budget for each stored curve; equity_curve keeps only the coarsest level.
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS curve_pyramid JSONB;
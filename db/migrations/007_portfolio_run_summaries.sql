@@ -0,0 +1,12 @@
+-- Run listing reads summary columns only; curves move to a zstd-compressed Arrow blob
+-- and metrics keeps just the small non-curve part of the response.
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS kpis JSONB;
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS trades_count INTEGER;
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS curves_blob BYTEA;
+CREATE INDEX IF NOT EXISTS ix_portfoliorun_batch_created ON portfoliorun(batch_id, created_at, id);
+
+-- Backfill summaries for runs stored before this migration; their curves stay in metrics.
+UPDATE portfoliorun
+SET kpis = metrics->'kpis',
+    trades_count = COALESCE((metrics->>'tradesCount')::INTEGER, (metrics->'kpis'->>'total_trades')::INTEGER)
+WHERE kpis IS NULL;
@@ -0,0 +1,3 @@
+-- SHA-256 of each upload's raw CSV, computed while it streams to object storage.
+-- NULL for uploads ingested before streaming ingest.
+ALTER TABLE uploadfilerecord ADD COLUMN IF NOT EXISTS content_sha256 VARCHAR(64);
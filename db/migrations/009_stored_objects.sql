@@ -0,0 +1,11 @@
+-- Uploads are stored once per SHA-256 of their bytes and shared across batches and
+-- users. ref_count tracks the uploadfilerecord rows pointing at each object.
+CREATE TABLE IF NOT EXISTS storedobject (
+    content_sha256 VARCHAR(64) PRIMARY KEY,
+    object_key VARCHAR(255) NOT NULL,
+    artifact_key VARCHAR(255) NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    rows_parsed INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
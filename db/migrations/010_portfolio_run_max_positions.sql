@@ -0,0 +1,2 @@
+-- Shared-capital runs record their position limit; NULL keeps the even per-ticker split.
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS max_positions INTEGER;
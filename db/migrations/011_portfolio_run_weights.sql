@@ -0,0 +1,2 @@
+-- Runs with explicit per-ticker capital weights record them; NULL is the even split.
+ALTER TABLE portfoliorun ADD COLUMN IF NOT EXISTS weights JSONB;
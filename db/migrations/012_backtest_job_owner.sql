@@ -0,0 +1,3 @@
+-- Backtest jobs record who queued them; workers run them only against that user's batch.
+ALTER TABLE backtestjob ADD COLUMN IF NOT EXISTS user_id VARCHAR(36);
+CREATE INDEX IF NOT EXISTS idx_backtestjob_user ON backtestjob(user_id);
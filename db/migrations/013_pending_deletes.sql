@@ -0,0 +1,7 @@
+-- Storage keys released by deleted batches wait here until a sweep deletes them
+-- from object storage; an ingest of the same content removes the row instead.
+CREATE TABLE IF NOT EXISTS pendingdelete (
+    object_key VARCHAR(255) PRIMARY KEY,
+    released_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_pendingdelete_released_at ON pendingdelete(released_at);